@@ -0,0 +1,82 @@
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from migrador.excel2json import excel2json
+from migrador.grafo import GrafoRelacoes
+from migrador.motor import MotorInvariantes, ordemRelatorio
+from migrador.report import Report
+from migrador.termos import IndiceTermos
+from migrador import checkInvariantes as c
+from utils.workspace_utils import Workspace
+
+
+def prepara(ficheiro,ws: Workspace):
+    """
+    Passos da migração anteriores à verificação dos invariantes
+    (ver `migra`). Devolve o Report e os dados de que o motor precisa.
+    """
+    rep = Report()
+    excel2json(rep,ficheiro,ws,usarCache=False)
+    classes, harmonizacao, _, hier = c.processClasses(rep,ws)
+    rep.fixMissingRels(classes)
+    grafo = GrafoRelacoes(classes)
+    with open(os.path.join(ws.filesDir,"ti.json")) as f:
+        termosIndice = IndiceTermos(json.load(f))
+    return rep, classes, harmonizacao, termosIndice, hier, grafo
+
+
+def verifica(rep,classes,harmonizacao,termosIndice,hier,grafo,nomes,workers):
+    """
+    Verificação dos invariantes `nomes` com `workers` processos.
+    Devolve o tempo e as chaves das falhas, pela ordem do Report.
+    """
+    parcial = rep.reportParcial()
+    motor = MotorInvariantes(classes,harmonizacao,termosIndice,hier,grafo)
+    inicio = time.perf_counter()
+    motor.verificar(nomes,parcial,workers)
+    tempo = time.perf_counter() - inicio
+    chaves = [(inv,[e.chave() for e in erros]) for inv,erros in parcial.globalErrors["erroInv"].items()]
+    return tempo, chaves
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Compara o tempo da verificação dos invariantes em série e em paralelo.")
+    parser.add_argument("ficheiro", help="ficheiro Excel usado na comparação")
+    parser.add_argument("-w", "--workers", type=int, nargs="+", default=[os.cpu_count() or 1],
+                        help="números de processos a comparar com a verificação em série (por omissão, o número de CPUs)")
+    parser.add_argument("-r", "--repeticoes", type=int, default=3, help="número de repetições de cada medição (por omissão 3)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as raiz:
+        ws = Workspace(raiz).criar()
+        dados = prepara(args.ficheiro,ws)
+
+    nomes = ordemRelatorio()
+    print(f"{len(dados[1])} classes, {len(nomes)} invariantes, {os.cpu_count()} CPUs")
+
+    referencia = None
+    base = None
+    for workers in [1] + [w for w in args.workers if w != 1]:
+        tempos = []
+        for _ in range(args.repeticoes):
+            tempo, chaves = verifica(*dados,nomes,workers)
+            tempos.append(tempo)
+            if referencia is None:
+                referencia = chaves
+            elif chaves != referencia:
+                print(f"As falhas com {workers} processos são diferentes das da verificação em série", file=sys.stderr)
+                return 1
+        mediana = statistics.median(tempos)
+        if base is None:
+            base = mediana
+        print(f"{workers:>3} processos: {mediana:.3f}s (mediana de {args.repeticoes}), {base / mediana:.2f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
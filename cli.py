@@ -0,0 +1,49 @@
+import argparse
+import logging
+import os
+import sys
+from datetime import datetime
+from migrador.migrador import migra
+from migrador.genTTL import genFinalOntology, FORMATOS
+from utils.config_utils import OUTPUT_FORMAT, ZIP_LEVEL, KEEP_FINAL_OUTPUT
+from utils.path_utils import LOG_DIR, OUTPUT_DIR, criarDiretorias
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Migração de um ficheiro Excel do CLAV para a ontologia final, sem a aplicação web.")
+    parser.add_argument("ficheiro", help="ficheiro Excel a migrar")
+    parser.add_argument("-f", "--formato", choices=FORMATOS, default=OUTPUT_FORMAT,
+                        help=f"formato da ontologia final (por omissão {OUTPUT_FORMAT})")
+    parser.add_argument("-z", "--nivel-compressao", type=int, choices=range(10), default=ZIP_LEVEL, metavar="0-9",
+                        help=f"nível de compressão do zip (por omissão {ZIP_LEVEL})")
+    parser.add_argument("-c", "--copia", action="store_true", default=KEEP_FINAL_OUTPUT,
+                        help="escreve também a ontologia final não comprimida em output/")
+    args = parser.parse_args()
+
+    if not os.path.isfile(args.ficheiro):
+        parser.error(f"ficheiro não encontrado: {args.ficheiro}")
+
+    criarDiretorias()
+    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    logFile = os.path.join(LOG_DIR, f"clav_{timestamp}.log")
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s.%(msecs)03d | %(name)s | %(levelname)s | %(message)s",
+        datefmt='%Y-%m-%d %H:%M:%S',
+        filename=logFile,
+        filemode="w",
+    )
+
+    _, ok, _ = migra(args.ficheiro)
+    if not ok:
+        print(f"A ontologia não foi criada devido à existência de erros graves (ver {logFile})", file=sys.stderr)
+        return 1
+
+    zipedOutputFile = genFinalOntology(args.formato, args.nivel_compressao, args.copia)
+    print(os.path.join(OUTPUT_DIR, zipedOutputFile))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,53 @@
+import hashlib
+import json
+import logging
+import os
+from utils.log_utils import PROC
+
+
+class Catalogos:
+    """
+    Catálogos de entidades, tipologias e legislação extraídos
+    do Excel. São construídos uma única vez por migração e
+    passados às fases seguintes (extração das classes e geração
+    da ontologia), que os consultam com frequência.
+
+    Cada catálogo é um `dict` {sigla/código: [linhas]} e por isso
+    as verificações de pertença (`x in cat.entidades`) são O(1).
+    """
+
+    def __init__(self):
+        self.entidades = {} # {"ENT1": [2]}
+        self.tipologias = {} # {"TIP1": [2]}
+        self.legislacao = {} # {"Lei_1_2010": [2, 10]}
+
+
+    def digest(self):
+        """
+        Hash do conteúdo dos catálogos. A extração das classes só
+        consulta a pertença aos catálogos, por isso apenas as
+        chaves (e não as linhas) contam para o hash.
+        """
+        h = hashlib.sha256()
+        for catalogo in [self.entidades, self.tipologias, self.legislacao]:
+            h.update(json.dumps(sorted(catalogo.keys()), ensure_ascii=False).encode("utf-8"))
+        return h.hexdigest()
+
+
+    def dump(self,dir):
+        """
+        Escreve os catálogos em `dir` (entCatalog.json, tipCatalog.json
+        e legCatalog.json). Só é usado para efeitos de debug, o resto
+        da migração usa sempre os catálogos em memória.
+        """
+        logger = logging.getLogger(PROC)
+        ficheiros = {
+            "entCatalog.json": self.entidades,
+            "tipCatalog.json": self.tipologias,
+            "legCatalog.json": self.legislacao
+        }
+        for nome,catalogo in ficheiros.items():
+            catalogPath = os.path.join(dir,nome)
+            with open(catalogPath,"w",encoding="utf-8") as f:
+                json.dump(list(catalogo.keys()), f, indent = 4, ensure_ascii=False)
+            logger.info(f"Catálogo escrito em {catalogPath}")
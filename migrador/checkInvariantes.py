@@ -1,13 +1,15 @@
 import json
-import re
 from .report import Report
+from .hierarquia import Hierarquia
+from .grafo import GrafoRelacoes
+from .termos import IndiceTermos
+from .motor import MotorInvariantes, Falhas, visitaClasse, visitaAresta, visitaFinal
 from collections import Counter
 import os
-from utils.path_utils import FILES_DIR, DUMP_DIR
-from utils.log_utils import INV, PROC
+from utils.workspace_utils import Workspace, PADRAO
+from utils.log_utils import PROC
 import logging
 
-logger = logging.getLogger(INV)
 loggerProc = logging.getLogger(PROC)
 
 relsSimetricas = ["eCruzadoCom","eComplementarDe"]
@@ -21,7 +23,7 @@ relsInverseOf = {
 }
 
 
-def processClasses(rep: Report):
+def processClasses(rep: Report,ws: Workspace = PADRAO):
     """
     Função que verifica se existem códigos de classe repetidas
     e se todas as classes mencionadas (em relações) existem de facto.
@@ -30,20 +32,28 @@ def processClasses(rep: Report):
 
     No final a função produz um relatório em que contam os erros
     encontrados, warnings e possíveis inferências a aplicar aos dados.
-    A função retorna três dicionários:
+    A função retorna três dicionários e o índice da hierarquia:
 
     * um dicionário com os dados, que exclui os processos em
     harmonização;
     * um dicionário com os processos em harmonização;
     * um dicionário com os processos com códigos inválidos;
+    * a `Hierarquia` de todos os códigos declarados;
+
+    Os ficheiros JSON das classes são lidos do workspace `ws`,
+    onde também é escrito o dump das classes.
     """
 
     data = {}
     for sheet in rep.classesN1:
-        with open(os.path.join(FILES_DIR,f"{sheet}.json")) as f:
+        with open(os.path.join(ws.filesDir,f"{sheet}.json")) as f:
             x = json.load(f)
             data.update(x)
 
+    # Índice da hierarquia, construído numa só passagem por todos
+    # os códigos (incluindo os processos em harmonização)
+    hier = Hierarquia(data)
+
     classes = {}
     harmonizacao = {}
     outros = {}
@@ -61,12 +71,11 @@ def processClasses(rep: Report):
             if classe["estado"] == "I":
                 rep.addInativo(cod)
             if classe["nivel"] == 3:
-                filhos = [c for c,_ in data.items() if c.startswith(cod + ".")]
-                classe["filhos"] = filhos
+                classe["filhos"] = list(hier.descendentes(cod))
             elif classe["nivel"] == 4:
                 # É feita uma verificação sobre as de nível 4 para garantir que
                 # o pai de cada uma é válido e está ativo
-                pai = re.search(r'^(\d{3}\.\d{1,3}\.\d{1,3})\.\d{1,4}$', cod).group(1)
+                pai = hier.pai(cod)
                 classePai = data.get(pai)
                 if not classePai:
                     # Não tem pai
@@ -142,55 +151,48 @@ def processClasses(rep: Report):
 
     loggerProc.info(f"Foram encontrados {len(harmonizacao)} processos em harmonização")
     loggerProc.info(f"Foram encontradas {len(classes)} processos em ativos/inativos")
-    with open(os.path.join(DUMP_DIR,f"allClasses.json"),'w',encoding='utf-8') as f:
+    with open(os.path.join(ws.dumpDir,f"allClasses.json"),'w',encoding='utf-8') as f:
         json.dump(classes,f,ensure_ascii=False,indent=4)
 
-    return classes, harmonizacao, outros
+    return classes, harmonizacao, outros, hier
 
 
-def checkAntissimetrico(allClasses,rel,rep: Report,invName):
+def checkAntissimetrico(m,cod,proc,rel,rep: Falhas,invName):
     """
-    Verifica para todas as classes se uma dada
-    relação `rel` é antissimétrica.
+    Verifica, para a relação "`cod` `rel` `proc`", se
+    a relação `rel` é antissimétrica, isto é, se `proc`
+    não tem também a relação `rel` com `cod`.
 
     Os casos em que tal não acontece são guardados
     em `rep`.
     """
 
-    erros = []
-    for cod,classe in allClasses.items():
-        proRels = classe.get("proRel")
-        proRelCods = classe.get("processosRelacionados")
-        if proRels and proRelCods:
-            relacoes = [c for c,r in zip(proRelCods,proRels) if r==rel]
-            for c in relacoes:
-                relacao = allClasses.get(c)
-
-                # Caso a relação em questão mencione um processo em harmonização
-                # ou um processo com código inválido, não é feita a verificação
-                # do invariante.
-                if not relacao:
-                    continue
-
-                proRels2 = relacao.get("proRel",[])
-                proRelCods2 = relacao.get("processosRelacionados",[])
-                if proRelCods2 and proRels2:
-                    relacoes2 = [c for c,r in zip(proRelCods2,proRels2) if r==rel]
-                    # Se existe a relação `rel` aqui também, não cumpre com o invariante
-                    if cod in relacoes2:
-                        # Evita-se guardar 2 erros iguais, por exemplo
-                        # A :x B e B :x A apontam o mesmo erro
-                        if (c,rel,cod) not in erros:
-                            erros.append((cod,rel,c))
+    # Caso a relação em questão mencione um processo em harmonização
+    # ou um processo com código inválido, não é feita a verificação
+    # do invariante.
+    if proc not in m.allClasses:
+        return
 
-    for (cod,rel,c) in erros:
-        rep.addFalhaInv(invName,cod,{"rel": rel,"c": c})
+    # Se existe a relação `rel` aqui também, não cumpre com o invariante
+    if m.grafo.temRelacao(proc,rel,cod):
+        # Evita-se guardar 2 erros iguais, por exemplo
+        # A :x B e B :x A apontam o mesmo erro, que fica
+        # registado na classe que é visitada primeiro
+        if m.posicao[proc] < m.posicao[cod]:
+            return
+        # Uma classe relacionada consigo própria só é registada uma vez
+        if proc == cod:
+            registados = m.estado.setdefault(invName,set())
+            if (cod,rel) in registados:
+                return
+            registados.add((cod,rel))
+        rep.addFalhaInv(invName,cod,{"rel": rel,"c": proc})
 
 
-def checkJustRef(allClasses,nivel,rep: Report,invName):
+def checkJustRef(m,cod,classe,nivel,rep: Falhas,invName):
     """
-    Verifica se as classes do `nível` passado por input (3 ou 4)
-    referenciam as legislações mencionadas nas justificações de pca e df.
+    Verifica se a classe `cod`, do `nível` passado por input (3 ou 4),
+    referencia as legislações mencionadas nas justificações de pca e df.
 
     No caso da classe ser de nível 4 a legislação é mencionada
     apenas na classe pai.
@@ -198,53 +200,68 @@ def checkJustRef(allClasses,nivel,rep: Report,invName):
     A função guarda em `rep` todos os casos em que falha.
     """
 
-    for cod,classe in allClasses.items():
-        if classe["nivel"] == nivel:
-            # verificação no pca
-            justificacaoPca = classe.get("pca",{}).get("justificacao")
-            if justificacaoPca:
-                pcaLegRefs = [x["legRefs"] for x in justificacaoPca if x["tipo"]=="legal"]
-                # Concatenar lista de listas e remover repetidos
-                pcaLegRefs = set(sum(pcaLegRefs,[]))
-                for leg in pcaLegRefs:
-                    # Se a legislação mencionada no pca não se encontra
-                    # na lista de legislação associada à classe,
-                    # então não cumpre com o invariante
-                    if nivel == 3 and (leg not in classe.get("legislacao",[])):
-                        rep.addFalhaInv(invName,cod,{"leg":leg,"tipo": "PCA"})
-
-                    # Se a classe for de nível 4 verifica-se se
-                    # a legislação é mencionada no pai
-                    elif nivel == 4:
-                        pai = re.search(r'^(\d{3}\.\d{1,3}\.\d{1,3})\.\d{1,4}$', cod).group(1)
-                        classePai = allClasses.get(pai)
-                        # Tem pai ativo
-                        if classePai:
-                            if leg not in classePai.get("legislacao",[]):
-                                rep.addFalhaInv(invName,cod,{"leg":leg,"tipo": "PCA", "pai": pai})
-
-            # verificação no df
-            justificacaoDf = classe.get("df",{}).get("justificacao")
-            if justificacaoDf:
-                dfLegRefs = [x["legRefs"] for x in justificacaoDf if x["tipo"]=="legal"]
-                # Concatenar lista de listas e remover repetidos
-                dfLegRefs = set(sum(dfLegRefs,[]))
-                for leg in dfLegRefs:
-                    # Se a legislação mencionada no df não se encontra
-                    # na lista de legislação associada à classe,
-                    # então não cumpre com o invariante
-                    if nivel == 3 and (leg not in classe.get("legislacao",[])):
-                        rep.addFalhaInv(invName,cod,{"leg":leg,"tipo": "DF"})
-
-                    # Se a classe for de nível 4 verifica-se se
-                    # a legislação é mencionada no pai
-                    if nivel == 4:
-                        pai = re.search(r'^(\d{3}\.\d{1,3}\.\d{1,3})\.\d{1,4}$', cod).group(1)
-                        classePai = allClasses.get(pai)
-                        # Tem pai ativo
-                        if classePai:
-                            if leg not in classePai.get("legislacao",[]):
-                                rep.addFalhaInv(invName,cod,{"leg":leg,"tipo": "DF", "pai": pai})
+    # verificação no pca
+    justificacaoPca = classe.get("pca",{}).get("justificacao")
+    if justificacaoPca:
+        pcaLegRefs = [x["legRefs"] for x in justificacaoPca if x["tipo"]=="legal"]
+        # Concatenar lista de listas e remover repetidos, pela
+        # ordem em que aparecem (um set não tem ordem fixa)
+        pcaLegRefs = dict.fromkeys(sum(pcaLegRefs,[]))
+        for leg in pcaLegRefs:
+            # Se a legislação mencionada no pca não se encontra
+            # na lista de legislação associada à classe,
+            # então não cumpre com o invariante
+            if nivel == 3 and (leg not in classe.get("legislacao",[])):
+                rep.addFalhaInv(invName,cod,{"leg":leg,"tipo": "PCA"})
+
+            # Se a classe for de nível 4 verifica-se se
+            # a legislação é mencionada no pai
+            elif nivel == 4:
+                pai = m.hier.pai(cod)
+                classePai = m.allClasses.get(pai)
+                # Tem pai ativo
+                if classePai:
+                    if leg not in classePai.get("legislacao",[]):
+                        rep.addFalhaInv(invName,cod,{"leg":leg,"tipo": "PCA", "pai": pai})
+
+    # verificação no df
+    justificacaoDf = classe.get("df",{}).get("justificacao")
+    if justificacaoDf:
+        dfLegRefs = [x["legRefs"] for x in justificacaoDf if x["tipo"]=="legal"]
+        # Concatenar lista de listas e remover repetidos, pela
+        # ordem em que aparecem (um set não tem ordem fixa)
+        dfLegRefs = dict.fromkeys(sum(dfLegRefs,[]))
+        for leg in dfLegRefs:
+            # Se a legislação mencionada no df não se encontra
+            # na lista de legislação associada à classe,
+            # então não cumpre com o invariante
+            if nivel == 3 and (leg not in classe.get("legislacao",[])):
+                rep.addFalhaInv(invName,cod,{"leg":leg,"tipo": "DF"})
+
+            # Se a classe for de nível 4 verifica-se se
+            # a legislação é mencionada no pai
+            if nivel == 4:
+                pai = m.hier.pai(cod)
+                classePai = m.allClasses.get(pai)
+                # Tem pai ativo
+                if classePai:
+                    if leg not in classePai.get("legislacao",[]):
+                        rep.addFalhaInv(invName,cod,{"leg":leg,"tipo": "DF", "pai": pai})
+
+
+def checkCriteriosRepetidos(cod,just,rep: Falhas,invName):
+    """
+    Verifica se a justificação `just` contém mais do
+    que um critério do mesmo tipo.
+    """
+
+    tiposSet = set()
+    tipos = [x["tipo"] for x in just if "tipo" in x]
+    for t in tipos:
+        if t in tiposSet:
+            rep.addFalhaInv(invName,cod,{"tipo":t})
+        else:
+            tiposSet.add(t)
 
 
 def rel_2_inv_1(allClasses,rep: Report):
@@ -256,23 +273,21 @@ def rel_2_inv_1(allClasses,rep: Report):
     tem de ter uma justificação associada ao PCA"
     """
 
-    logger.info("Verificação do invariante rel_2_inv_1")
+    MotorInvariantes(allClasses).verificar(["rel_2_inv_1"],rep)
 
-    for cod,classe in allClasses.items():
-        if classe["nivel"] == 3:
-            if not classe.get("filhos"):
-                pca = classe.get("pca")
-                just = pca.get("justificacao")
-                if not just:
-                    rep.addFalhaInv("rel_2_inv_1",cod)
-                elif not pca:
-                    rep.addFalhaInv("rel_2_inv_1",cod,extra="Neste caso nem tem PCA")
 
-    err = len(rep.globalErrors["erroInv"].get("rel_2_inv_1",[]))
-    logger.info(f"Foram encontradas {err} falhas no invariante rel_2_inv_1")
+@visitaClasse("rel_2_inv_1",ordem=100,niveis=[3],campos=["filhos","pca"])
+def rel_2_inv_1_classe(m,cod,classe,rep: Falhas):
+    if not classe.get("filhos"):
+        pca = classe.get("pca")
+        just = pca.get("justificacao")
+        if not just:
+            rep.addFalhaInv("rel_2_inv_1",cod)
+        elif not pca:
+            rep.addFalhaInv("rel_2_inv_1",cod,extra="Neste caso nem tem PCA")
 
 
-def rel_2_inv_4(allClasses,rep: Report):
+def rel_2_inv_4(allClasses,rep: Report,grafo: GrafoRelacoes = None):
     """
     A função testa o seguinte invariante e guarda
     em `rep` os casos em que falha:
@@ -280,15 +295,15 @@ def rel_2_inv_4(allClasses,rep: Report):
     "A relação <b>eSintetizadoPor</b> é antissimétrica"
     """
 
-    logger.info("Verificação do invariante rel_2_inv_4")
+    MotorInvariantes(allClasses,grafo=grafo).verificar(["rel_2_inv_4"],rep)
 
-    checkAntissimetrico(allClasses,"eSintetizadoPor",rep,"rel_2_inv_4")
 
-    err = len(rep.globalErrors["erroInv"].get("rel_2_inv_4",[]))
-    logger.info(f"Foram encontradas {err} falhas no invariante rel_2_inv_4")
+@visitaAresta("rel_2_inv_4",ordem=20,rels=["eSintetizadoPor"],campos=["proRel"])
+def rel_2_inv_4_aresta(m,cod,classe,proc,rel,rep: Falhas):
+    checkAntissimetrico(m,cod,proc,rel,rep,"rel_2_inv_4")
 
 
-def rel_2_inv_5(allClasses,rep: Report):
+def rel_2_inv_5(allClasses,rep: Report,grafo: GrafoRelacoes = None):
     """
     A função testa o seguinte invariante e guarda
     em `rep` os casos em que falha:
@@ -296,15 +311,15 @@ def rel_2_inv_5(allClasses,rep: Report):
     "A relação <b>eSucessorDe</b> é antissimétrica"
     """
 
-    logger.info("Verificação do invariante rel_2_inv_5")
+    MotorInvariantes(allClasses,grafo=grafo).verificar(["rel_2_inv_5"],rep)
 
-    checkAntissimetrico(allClasses,"eSucessorDe",rep,"rel_2_inv_5")
 
-    err = len(rep.globalErrors["erroInv"].get("rel_2_inv_5",[]))
-    logger.info(f"Foram encontradas {err} falhas no invariante rel_2_inv_5")
+@visitaAresta("rel_2_inv_5",ordem=30,rels=["eSucessorDe"],campos=["proRel"])
+def rel_2_inv_5_aresta(m,cod,classe,proc,rel,rep: Falhas):
+    checkAntissimetrico(m,cod,proc,rel,rep,"rel_2_inv_5")
 
 
-def rel_2_inv_11(allClasses,rep: Report):
+def rel_2_inv_11(allClasses,rep: Report,grafo: GrafoRelacoes = None):
     """
     A função testa o seguinte invariante e guarda
     em `rep` os casos em que falha:
@@ -313,23 +328,21 @@ def rel_2_inv_11(allClasses,rep: Report):
     <b>eSinteseDe</b> e <b>eSintetizadoPor</b> com outros PNs"
     """
 
-    logger.info("Verificação do invariante rel_2_inv_11")
+    MotorInvariantes(allClasses,grafo=grafo).verificar(["rel_2_inv_11"],rep)
 
-    for cod,classe in allClasses.items():
-        if classe["nivel"] == 3:
-            proRels = classe.get("proRel")
-            proRelCods = classe.get("processosRelacionados")
-            # Se a classe contém ambas as relações, não cumpre com o invariante
-            if proRels and proRelCods:
-                if "eSinteseDe" in proRels and "eSintetizadoPor" in proRels:
-                    sinteses = [(c,r) for (c,r) in zip(proRelCods,proRels) if r in ["eSinteseDe","eSintetizadoPor"]]
-                    rep.addFalhaInv("rel_2_inv_11",cod,{"sinteses":sinteses})
 
-    err = len(rep.globalErrors["erroInv"].get("rel_2_inv_11",[]))
-    logger.info(f"Foram encontradas {err} falhas no invariante rel_2_inv_11")
+@visitaClasse("rel_2_inv_11",ordem=180,niveis=[3],campos=["proRel"])
+def rel_2_inv_11_classe(m,cod,classe,rep: Falhas):
+    proRels = classe.get("proRel")
+    proRelCods = classe.get("processosRelacionados")
+    # Se a classe contém ambas as relações, não cumpre com o invariante
+    if proRels and proRelCods:
+        if "eSinteseDe" in proRels and "eSintetizadoPor" in proRels:
+            sinteses = m.grafo.relacoes(cod,"eSinteseDe","eSintetizadoPor")
+            rep.addFalhaInv("rel_2_inv_11",cod,{"sinteses":sinteses})
 
 
-def rel_2_inv_12(allClasses,rep: Report):
+def rel_2_inv_12(allClasses,rep: Report,hier: Hierarquia = None):
     """
     A função testa o seguinte invariante e guarda
     em `rep` os casos em que falha:
@@ -339,15 +352,15 @@ def rel_2_inv_12(allClasses,rep: Report):
     contexto do processo"
     """
 
-    logger.info("Verificação do invariante rel_2_inv_12")
+    MotorInvariantes(allClasses,hier=hier).verificar(["rel_2_inv_12"],rep)
 
-    checkJustRef(allClasses,3,rep,"rel_2_inv_12")
 
-    err = len(rep.globalErrors["erroInv"].get("rel_2_inv_12",[]))
-    logger.info(f"Foram encontradas {err} falhas no invariante rel_2_inv_12")
+@visitaClasse("rel_2_inv_12",ordem=40,niveis=[3],campos=["pca","df","legislacao"])
+def rel_2_inv_12_classe(m,cod,classe,rep: Falhas):
+    checkJustRef(m,cod,classe,3,rep,"rel_2_inv_12")
 
 
-def rel_2_inv_13(allClasses,rep: Report):
+def rel_2_inv_13(allClasses,rep: Report,hier: Hierarquia = None):
     """
     A função testa o seguinte invariante e guarda
     em `rep` os casos em que falha:
@@ -357,15 +370,15 @@ def rel_2_inv_13(allClasses,rep: Report):
     na zona de contexto do processo pai"
     """
 
-    logger.info("Verificação do invariante rel_2_inv_13")
+    MotorInvariantes(allClasses,hier=hier).verificar(["rel_2_inv_13"],rep)
 
-    checkJustRef(allClasses,4,rep,"rel_2_inv_13")
 
-    err = len(rep.globalErrors["erroInv"].get("rel_2_inv_13",[]))
-    logger.info(f"Foram encontradas {err} falhas no invariante rel_2_inv_13")
+@visitaClasse("rel_2_inv_13",ordem=50,niveis=[4],campos=["pca","df","legislacao"])
+def rel_2_inv_13_classe(m,cod,classe,rep: Falhas):
+    checkJustRef(m,cod,classe,4,rep,"rel_2_inv_13")
 
 
-def rel_2_inv_6(allClasses,rep: Report):
+def rel_2_inv_6(allClasses,rep: Report,grafo: GrafoRelacoes = None):
     """
     A função testa o seguinte invariante e guarda
     em `rep` os casos em que falha:
@@ -373,15 +386,15 @@ def rel_2_inv_6(allClasses,rep: Report):
     "A relação <b>eSuplementoDe</b> é antissimétrica"
     """
 
-    logger.info("Verificação do invariante rel_2_inv_6")
+    MotorInvariantes(allClasses,grafo=grafo).verificar(["rel_2_inv_6"],rep)
 
-    checkAntissimetrico(allClasses,"eSuplementoDe",rep,"rel_2_inv_6")
 
-    err = len(rep.globalErrors["erroInv"].get("rel_2_inv_6",[]))
-    logger.info(f"Foram encontradas {err} falhas no invariante rel_2_inv_6")
+@visitaAresta("rel_2_inv_6",ordem=160,rels=["eSuplementoDe"],campos=["proRel"])
+def rel_2_inv_6_aresta(m,cod,classe,proc,rel,rep: Falhas):
+    checkAntissimetrico(m,cod,proc,rel,rep,"rel_2_inv_6")
 
 
-def rel_2_inv_7(allClasses,rep: Report):
+def rel_2_inv_7(allClasses,rep: Report,grafo: GrafoRelacoes = None):
     """
     A função testa o seguinte invariante e guarda
     em `rep` os casos em que falha:
@@ -389,15 +402,15 @@ def rel_2_inv_7(allClasses,rep: Report):
     "A relação <b>eSuplementoPara</b> é antissimétrica"
     """
 
-    logger.info("Verificação do invariante rel_2_inv_7")
+    MotorInvariantes(allClasses,grafo=grafo).verificar(["rel_2_inv_7"],rep)
 
-    checkAntissimetrico(allClasses,"eSuplementoPara",rep,"rel_2_inv_7")
 
-    err = len(rep.globalErrors["erroInv"].get("rel_2_inv_7",[]))
-    logger.info(f"Foram encontradas {err} falhas no invariante rel_2_inv_7")
+@visitaAresta("rel_2_inv_7",ordem=170,rels=["eSuplementoPara"],campos=["proRel"])
+def rel_2_inv_7_aresta(m,cod,classe,proc,rel,rep: Falhas):
+    checkAntissimetrico(m,cod,proc,rel,rep,"rel_2_inv_7")
 
 
-def rel_2_inv_3(allClasses,rep: Report):
+def rel_2_inv_3(allClasses,rep: Report,grafo: GrafoRelacoes = None):
     """
     A função testa o seguinte invariante e guarda
     em `rep` os casos em que falha:
@@ -405,12 +418,12 @@ def rel_2_inv_3(allClasses,rep: Report):
     "A relação <b>eSinteseDe</b> é antissimétrica"
     """
 
-    logger.info("Verificação do invariante rel_2_inv_3")
+    MotorInvariantes(allClasses,grafo=grafo).verificar(["rel_2_inv_3"],rep)
 
-    checkAntissimetrico(allClasses,"eSinteseDe",rep,"rel_2_inv_3")
 
-    err = len(rep.globalErrors["erroInv"].get("rel_2_inv_3",[]))
-    logger.info(f"Foram encontradas {err} falhas no invariante rel_2_inv_3")
+@visitaAresta("rel_2_inv_3",ordem=10,rels=["eSinteseDe"],campos=["proRel"])
+def rel_2_inv_3_aresta(m,cod,classe,proc,rel,rep: Falhas):
+    checkAntissimetrico(m,cod,proc,rel,rep,"rel_2_inv_3")
 
 
 def rel_1_inv_5(allClasses,rep: Report):
@@ -422,21 +435,19 @@ def rel_1_inv_5(allClasses,rep: Report):
     DF e PCA se esta não tiver desdobramento"
     """
 
-    logger.info("Verificação do invariante rel_1_inv_5")
+    MotorInvariantes(allClasses).verificar(["rel_1_inv_5"],rep)
 
-    for cod,classe in allClasses.items():
-        if classe["nivel"] == 3:
-            if not classe.get("filhos"):
-                temPca = bool(classe.get("pca"))
-                temDf = bool(classe.get("df"))
-                if not temPca or not temDf:
-                    rep.addFalhaInv("rel_1_inv_5",cod,{"temPca":temPca,"temDf":temDf})
 
-    err = len(rep.globalErrors["erroInv"].get("rel_1_inv_5",[]))
-    logger.info(f"Foram encontradas {err} falhas no invariante rel_1_inv_5")
+@visitaClasse("rel_1_inv_5",ordem=190,niveis=[3],campos=["filhos","pca","df"])
+def rel_1_inv_5_classe(m,cod,classe,rep: Falhas):
+    if not classe.get("filhos"):
+        temPca = bool(classe.get("pca"))
+        temDf = bool(classe.get("df"))
+        if not temPca or not temDf:
+            rep.addFalhaInv("rel_1_inv_5",cod,{"temPca":temPca,"temDf":temDf})
 
 
-def rel_1_inv_2(allClasses,rep: Report):
+def rel_1_inv_2(allClasses,rep: Report,grafo: GrafoRelacoes = None):
     """
     A função testa o seguinte invariante e guarda
     em `rep` os casos em que falha:
@@ -446,39 +457,37 @@ def rel_1_inv_2(allClasses,rep: Report):
     síntese (de ou por) entre eles"
     """
 
-    logger.info("Verificação do invariante rel_1_inv_2")
-
-    for cod,classe in allClasses.items():
-        if classe["nivel"] == 3:
-            codFilhos = classe.get("filhos",[])
-            # Assume-se aqui que se tiver filhos, tem 2
-            if len(codFilhos) == 2:
-                codF1 = codFilhos[0]
-                codF2 = codFilhos[1]
-                f1 = allClasses.get(codF1)
-                f2 = allClasses.get(codF2)
-                df1 = f1.get("df",{}).get("valor")
-                df2 = f2.get("df",{}).get("valor")
-
-                # Aqui só interessam os que têm DFs distintos
-                if df1 and df2 and df1 != df2:
-                    f1Rels = f1.get("proRel")
-                    f1RelCods = f1.get("processosRelacionados")
-
-                    # A relação de "eSinteseDe" é inversa de "eSintetizadoPor",
-                    # e são feitas inferências iniciais que tornam este tipo de
-                    # situações explícitas, por isso basta verificar do processo
-                    # A para B, e verificar B para A torna-se redundante.
-                    if f1Rels and f1RelCods:
-                        relacoesF1 = zip(f1Rels,f1RelCods)
-                        if ("eSinteseDe",codF2) not in relacoesF1 or ("eSintetizadoPor",codF2) not in relacoesF1:
-                            rep.addFalhaInv("rel_1_inv_2",cod,{"codF1":codF1,"codF2":codF2})
-                    else:
-                        # Se algum não tem relações então já está mal
-                        rep.addFalhaInv("rel_1_inv_2",cod,{"codF1":codF1,"codF2":codF2})
-
-    err = len(rep.globalErrors["erroInv"].get("rel_1_inv_2",[]))
-    logger.info(f"Foram encontradas {err} falhas no invariante rel_1_inv_2")
+    MotorInvariantes(allClasses,grafo=grafo).verificar(["rel_1_inv_2"],rep)
+
+
+@visitaClasse("rel_1_inv_2",ordem=130,niveis=[3],campos=["filhos","df","proRel"])
+def rel_1_inv_2_classe(m,cod,classe,rep: Falhas):
+    codFilhos = classe.get("filhos",[])
+    # Assume-se aqui que se tiver filhos, tem 2
+    if len(codFilhos) == 2:
+        codF1 = codFilhos[0]
+        codF2 = codFilhos[1]
+        f1 = m.allClasses.get(codF1)
+        f2 = m.allClasses.get(codF2)
+        df1 = f1.get("df",{}).get("valor")
+        df2 = f2.get("df",{}).get("valor")
+
+        # Aqui só interessam os que têm DFs distintos
+        if df1 and df2 and df1 != df2:
+            f1Rels = f1.get("proRel")
+            f1RelCods = f1.get("processosRelacionados")
+
+            # A relação de "eSinteseDe" é inversa de "eSintetizadoPor",
+            # e são feitas inferências iniciais que tornam este tipo de
+            # situações explícitas, por isso basta verificar do processo
+            # A para B, e verificar B para A torna-se redundante.
+            if f1Rels and f1RelCods:
+                relacoesF1 = ((r,c) for c,r in m.grafo.relacoes(codF1))
+                if ("eSinteseDe",codF2) not in relacoesF1 or ("eSintetizadoPor",codF2) not in relacoesF1:
+                    rep.addFalhaInv("rel_1_inv_2",cod,{"codF1":codF1,"codF2":codF2})
+            else:
+                # Se algum não tem relações então já está mal
+                rep.addFalhaInv("rel_1_inv_2",cod,{"codF1":codF1,"codF2":codF2})
 
 
 def rel_3_inv_1(allClasses,rep:Report):
@@ -491,29 +500,27 @@ def rel_3_inv_1(allClasses,rep:Report):
     administrativa</b> na justificação do respetivo PCA"
     """
 
-    logger.info("Verificação do invariante rel_3_inv_1")
-
-    for cod,classe in allClasses.items():
-        if classe["nivel"] == 3:
-            if not classe.get("filhos"):
-                proRel = classe.get("proRel")
-                if proRel and "eSuplementoPara" in proRel:
-                    pca = classe.get("pca",{})
-                    just = pca.get("justificacao")
-                    if just:
-                        justUtilidade = [x for x in just if x["tipo"]=="utilidade"]
-                        if not justUtilidade:
-                            rep.addFalhaInv("rel_3_inv_1",cod)
-                    elif pca:
-                        rep.addFalhaInv("rel_3_inv_1",cod,extra="Neste caso nem tem justificação do PCA")
-                    else:
-                        rep.addFalhaInv("rel_3_inv_1",cod,extra="Neste caso nem tem PCA")
+    MotorInvariantes(allClasses).verificar(["rel_3_inv_1"],rep)
+
 
-    err = len(rep.globalErrors["erroInv"].get("rel_3_inv_1",[]))
-    logger.info(f"Foram encontradas {err} falhas no invariante rel_3_inv_1")
+@visitaClasse("rel_3_inv_1",ordem=60,niveis=[3],campos=["filhos","proRel","pca"])
+def rel_3_inv_1_classe(m,cod,classe,rep: Falhas):
+    if not classe.get("filhos"):
+        proRel = classe.get("proRel")
+        if proRel and "eSuplementoPara" in proRel:
+            pca = classe.get("pca",{})
+            just = pca.get("justificacao")
+            if just:
+                justUtilidade = [x for x in just if x["tipo"]=="utilidade"]
+                if not justUtilidade:
+                    rep.addFalhaInv("rel_3_inv_1",cod)
+            elif pca:
+                rep.addFalhaInv("rel_3_inv_1",cod,extra="Neste caso nem tem justificação do PCA")
+            else:
+                rep.addFalhaInv("rel_3_inv_1",cod,extra="Neste caso nem tem PCA")
 
 
-def rel_3_inv_2(allClasses,rep:Report):
+def rel_3_inv_2(allClasses,rep:Report,grafo: GrafoRelacoes = None):
     """
     A função testa o seguinte invariante e guarda
     em `rep` os casos em que falha:
@@ -523,41 +530,38 @@ def rel_3_inv_2(allClasses,rep:Report):
     relação de <b>eSuplementoPara</b>"
     """
 
-    logger.info("Verificação do invariante rel_3_inv_2")
-
-    for cod,classe in allClasses.items():
-        if classe["nivel"] == 3:
-            codFilhos = classe.get("filhos")
-            if not codFilhos:
-                proRel = classe.get("proRel")
-                proRelCods = classe.get("processosRelacionados")
-                if proRel and "eSuplementoPara" in proRel:
-                    supls = [c for r,c in zip(proRel,proRelCods) if r=="eSuplementoPara"]
-                    pca = classe.get("pca",{})
-                    just = pca.get("justificacao")
-                    if just:
-                        jUtilidade = [x for x in just if x["tipo"]=="utilidade"]
-                        allProcRefs = []
-                        for crit in jUtilidade:
-                            allProcRefs += crit.get("procRefs",[])
-
-                        for s in supls:
-                            if s not in allProcRefs:
-                                rep.addFalhaInv("rel_3_inv_2",cod,{"proc":s})
-                    else:
-                        extra = ""
-                        if pca:
-                            extra = "Neste caso nem tem justificação do PCA"
-                        else:
-                            extra = "Neste caso nem tem PCA"
+    MotorInvariantes(allClasses,grafo=grafo).verificar(["rel_3_inv_2"],rep)
 
-                        # Aqui como nem tem justificação/pca, não tem nenhum procRef,
-                        # por isso todos os supls estão em falta
-                        for s in supls:
-                            rep.addFalhaInv("rel_3_inv_2",cod,{"proc":s},extra=extra)
 
-    err = len(rep.globalErrors["erroInv"].get("rel_3_inv_2",[]))
-    logger.info(f"Foram encontradas {err} falhas no invariante rel_3_inv_2")
+@visitaClasse("rel_3_inv_2",ordem=240,niveis=[3],campos=["filhos","proRel","pca"])
+def rel_3_inv_2_classe(m,cod,classe,rep: Falhas):
+    codFilhos = classe.get("filhos")
+    if not codFilhos:
+        proRel = classe.get("proRel")
+        if proRel and "eSuplementoPara" in proRel:
+            supls = m.grafo.destinos(cod,"eSuplementoPara")
+            pca = classe.get("pca",{})
+            just = pca.get("justificacao")
+            if just:
+                jUtilidade = [x for x in just if x["tipo"]=="utilidade"]
+                allProcRefs = []
+                for crit in jUtilidade:
+                    allProcRefs += crit.get("procRefs",[])
+
+                for s in supls:
+                    if s not in allProcRefs:
+                        rep.addFalhaInv("rel_3_inv_2",cod,{"proc":s})
+            else:
+                extra = ""
+                if pca:
+                    extra = "Neste caso nem tem justificação do PCA"
+                else:
+                    extra = "Neste caso nem tem PCA"
+
+                # Aqui como nem tem justificação/pca, não tem nenhum procRef,
+                # por isso todos os supls estão em falta
+                for s in supls:
+                    rep.addFalhaInv("rel_3_inv_2",cod,{"proc":s},extra=extra)
 
 
 def rel_5_inv_1(allClasses,rep:Report):
@@ -570,25 +574,23 @@ def rel_5_inv_1(allClasses,rep:Report):
     complementaridade informacional</b>"
     """
 
-    logger.info("Verificação do invariante rel_5_inv_1")
+    MotorInvariantes(allClasses).verificar(["rel_5_inv_1"],rep)
 
-    for cod,classe in allClasses.items():
-        if classe["nivel"] == 3:
-            proRel = classe.get("proRel")
-            if proRel and "eComplementarDe" in proRel:
-                df = classe.get("df",{})
-                just = df.get("justificacao")
-                if just:
-                    justComplementaridade = [x for x in just if x["tipo"]=="complementaridade"]
-                    if not justComplementaridade:
-                        rep.addFalhaInv("rel_5_inv_1",cod)
-                elif df:
-                    rep.addFalhaInv("rel_5_inv_1",cod,extra="Neste caso nem tem justificação no DF")
-                else:
-                    rep.addFalhaInv("rel_5_inv_1",cod,extra="Neste caso nem tem DF")
 
-    err = len(rep.globalErrors["erroInv"].get("rel_5_inv_1",[]))
-    logger.info(f"Foram encontradas {err} falhas no invariante rel_5_inv_1")
+@visitaClasse("rel_5_inv_1",ordem=90,niveis=[3],campos=["proRel","df"])
+def rel_5_inv_1_classe(m,cod,classe,rep: Falhas):
+    proRel = classe.get("proRel")
+    if proRel and "eComplementarDe" in proRel:
+        df = classe.get("df",{})
+        just = df.get("justificacao")
+        if just:
+            justComplementaridade = [x for x in just if x["tipo"]=="complementaridade"]
+            if not justComplementaridade:
+                rep.addFalhaInv("rel_5_inv_1",cod)
+        elif df:
+            rep.addFalhaInv("rel_5_inv_1",cod,extra="Neste caso nem tem justificação no DF")
+        else:
+            rep.addFalhaInv("rel_5_inv_1",cod,extra="Neste caso nem tem DF")
 
 
 def rel_8_inv_3(allClasses,rep: Report):
@@ -600,25 +602,23 @@ def rel_8_inv_3(allClasses,rep: Report):
     outro, o DF deve ter o valor de \"Eliminação\""
     """
 
-    logger.info("Verificação do invariante rel_8_inv_3")
+    MotorInvariantes(allClasses).verificar(["rel_8_inv_3"],rep)
 
-    for cod,classe in allClasses.items():
-        if classe["nivel"] == 3:
-            proRel = classe.get("proRel")
-            if proRel and "eSintetizadoPor" in proRel:
-                filhos = classe.get("filhos")
-                if not filhos:
-                    if "eSinteseDe" not in proRel and "eComplementarDe" not in proRel:
-                        df = classe.get("df",{})
-                        valor = df.get("valor")
-                        if valor != 'E':
-                            rep.addFalhaInv("rel_8_inv_3",cod,{"valor":valor})
 
-    err = len(rep.globalErrors["erroInv"].get("rel_8_inv_3",[]))
-    logger.info(f"Foram encontradas {err} falhas no invariante rel_8_inv_3")
+@visitaClasse("rel_8_inv_3",ordem=310,niveis=[3],campos=["proRel","filhos","df"])
+def rel_8_inv_3_classe(m,cod,classe,rep: Falhas):
+    proRel = classe.get("proRel")
+    if proRel and "eSintetizadoPor" in proRel:
+        filhos = classe.get("filhos")
+        if not filhos:
+            if "eSinteseDe" not in proRel and "eComplementarDe" not in proRel:
+                df = classe.get("df",{})
+                valor = df.get("valor")
+                if valor != 'E':
+                    rep.addFalhaInv("rel_8_inv_3",cod,{"valor":valor})
 
 
-def rel_3_inv_3(allClasses,rep:Report):
+def rel_3_inv_3(allClasses,rep:Report,grafo: GrafoRelacoes = None):
     """
     A função testa o seguinte invariante e guarda
     em `rep` os casos em que falha:
@@ -629,43 +629,41 @@ def rel_3_inv_3(allClasses,rep:Report):
     nomeadamente no <b>critério de utilidade administrativa</b>"
     """
 
-    logger.info("Verificação do invariante rel_3_inv_3")
-
-    for cod,classe in allClasses.items():
-        if classe["nivel"] == 3:
-            codFilhos = classe.get("filhos")
-            if not codFilhos:
-                proRel = classe.get("proRel")
-                proRelCods = classe.get("processosRelacionados")
-                if proRel and proRelCods and "eSuplementoDe" in proRel:
-                    pca = classe.get("pca",{})
-                    just = pca.get("justificacao",[])
-                    supl = [cod for rel,cod in zip(proRel,proRelCods) if rel=="eSuplementoDe"]
-                    if just:
-                        allProcRefs = []
-                        for j in just:
-                            procRefs = j.get("procRefs",[])
-                            allProcRefs+=procRefs
-
-                        for sup in supl:
-                            if sup not in allProcRefs:
-                                if sup in allClasses:
-                                    rep.addFalhaInv("rel_3_inv_3",cod,{"proc":sup})
-                    else:
-                        extra = ""
-                        if pca:
-                            extra = "Neste caso nem tem justificação do PCA"
-                        else:
-                            extra = "Neste caso nem tem PCA"
+    MotorInvariantes(allClasses,grafo=grafo).verificar(["rel_3_inv_3"],rep)
 
-                        # Aqui como nem tem justificação/pca, não tem nenhum procRef,
-                        # por isso todos os sups estão em falta
-                        for sup in supl:
-                            if sup in allClasses:
-                                rep.addFalhaInv("rel_3_inv_3",cod,{"proc":sup},extra=extra)
 
-    err = len(rep.globalErrors["erroInv"].get("rel_3_inv_3",[]))
-    logger.info(f"Foram encontradas {err} falhas no invariante rel_3_inv_3")
+@visitaClasse("rel_3_inv_3",ordem=70,niveis=[3],campos=["filhos","proRel","pca"])
+def rel_3_inv_3_classe(m,cod,classe,rep: Falhas):
+    codFilhos = classe.get("filhos")
+    if not codFilhos:
+        proRel = classe.get("proRel")
+        proRelCods = classe.get("processosRelacionados")
+        if proRel and proRelCods and "eSuplementoDe" in proRel:
+            pca = classe.get("pca",{})
+            just = pca.get("justificacao",[])
+            supl = m.grafo.destinos(cod,"eSuplementoDe")
+            if just:
+                allProcRefs = []
+                for j in just:
+                    procRefs = j.get("procRefs",[])
+                    allProcRefs+=procRefs
+
+                for sup in supl:
+                    if sup not in allProcRefs:
+                        if sup in m.allClasses:
+                            rep.addFalhaInv("rel_3_inv_3",cod,{"proc":sup})
+            else:
+                extra = ""
+                if pca:
+                    extra = "Neste caso nem tem justificação do PCA"
+                else:
+                    extra = "Neste caso nem tem PCA"
+
+                # Aqui como nem tem justificação/pca, não tem nenhum procRef,
+                # por isso todos os sups estão em falta
+                for sup in supl:
+                    if sup in m.allClasses:
+                        rep.addFalhaInv("rel_3_inv_3",cod,{"proc":sup},extra=extra)
 
 
 def rel_8_inv_2(allClasses,rep: Report):
@@ -677,21 +675,19 @@ def rel_8_inv_2(allClasses,rep: Report):
     o valor do DF é de \"Conservação\""
     """
 
-    logger.info("Verificação do invariante rel_8_inv_2")
+    MotorInvariantes(allClasses).verificar(["rel_8_inv_2"],rep)
 
-    for cod,classe in allClasses.items():
-        if classe["nivel"] == 3:
-            filhos = classe.get("filhos")
-            if not filhos:
-                proRel = classe.get("proRel")
-                if proRel and "eSinteseDe" in proRel:
-                    df = classe.get("df",{})
-                    valor = df.get("valor")
-                    if valor != "C":
-                        rep.addFalhaInv("rel_8_inv_2",cod,{"valor":valor})
 
-    err = len(rep.globalErrors["erroInv"].get("rel_8_inv_2",[]))
-    logger.info(f"Foram encontradas {err} falhas no invariante rel_8_inv_2")
+@visitaClasse("rel_8_inv_2",ordem=200,niveis=[3],campos=["filhos","proRel","df"])
+def rel_8_inv_2_classe(m,cod,classe,rep: Falhas):
+    filhos = classe.get("filhos")
+    if not filhos:
+        proRel = classe.get("proRel")
+        if proRel and "eSinteseDe" in proRel:
+            df = classe.get("df",{})
+            valor = df.get("valor")
+            if valor != "C":
+                rep.addFalhaInv("rel_8_inv_2",cod,{"valor":valor})
 
 
 def rel_1_inv_1(allClasses,rep: Report):
@@ -704,30 +700,28 @@ def rel_1_inv_1(allClasses,rep: Report):
     de PCA ou DF distintos entre eles"
     """
 
-    logger.info("Verificação do invariante rel_1_inv_1")
+    MotorInvariantes(allClasses).verificar(["rel_1_inv_1"],rep)
 
-    for cod,classe in allClasses.items():
-        if classe["nivel"] == 3:
-            codFilhos = classe.get("filhos")
-            if codFilhos:
-                filhos = [(c,allClasses.get(c)) for c in codFilhos]
-                valoresCounter = {} # {(pca,df):["100","200"]}
-                for c,f in filhos:
-                    valores = (f.get("pca",{}).get("valores"),f.get("df",{}).get("valor"))
-                    if valores in valoresCounter:
-                        valoresCounter[valores].append(c)
-                    else:
-                        valoresCounter[valores] = [c]
 
-                for valor,cods in valoresCounter.items():
-                    # Quando uma combinação de valores de pca e df se repete,
-                    # o invariante falha. É registado o valor em questão e
-                    # os sítios onde acontece
-                    if len(cods) > 1:
-                        rep.addFalhaInv("rel_1_inv_1",cod,{"filhos": cods})
+@visitaClasse("rel_1_inv_1",ordem=140,niveis=[3],campos=["filhos","pca","df"])
+def rel_1_inv_1_classe(m,cod,classe,rep: Falhas):
+    codFilhos = classe.get("filhos")
+    if codFilhos:
+        filhos = [(c,m.allClasses.get(c)) for c in codFilhos]
+        valoresCounter = {} # {(pca,df):["100","200"]}
+        for c,f in filhos:
+            valores = (f.get("pca",{}).get("valores"),f.get("df",{}).get("valor"))
+            if valores in valoresCounter:
+                valoresCounter[valores].append(c)
+            else:
+                valoresCounter[valores] = [c]
 
-    err = len(rep.globalErrors["erroInv"].get("rel_1_inv_1",[]))
-    logger.info(f"Foram encontradas {err} falhas no invariante rel_1_inv_1")
+        for valor,cods in valoresCounter.items():
+            # Quando uma combinação de valores de pca e df se repete,
+            # o invariante falha. É registado o valor em questão e
+            # os sítios onde acontece
+            if len(cods) > 1:
+                rep.addFalhaInv("rel_1_inv_1",cod,{"filhos": cods})
 
 
 def rel_1_inv_4(allClasses,rep: Report):
@@ -739,21 +733,19 @@ def rel_1_inv_4(allClasses,rep: Report):
     DF e PCA se esta tiver desdobramento no nível 4"
     """
 
-    logger.info("Verificação do invariante rel_1_inv_4")
+    MotorInvariantes(allClasses).verificar(["rel_1_inv_4"],rep)
 
-    for cod,classe in allClasses.items():
-        if classe["nivel"] == 3:
-            if classe.get("filhos"):
-                temPca = bool(classe.get("pca"))
-                temDf = bool(classe.get("df"))
-                if (temDf or temPca):
-                    rep.addFalhaInv("rel_1_inv_4",cod,{"temPca":temPca,"temDf":temDf})
 
-    err = len(rep.globalErrors["erroInv"].get("rel_1_inv_4",[]))
-    logger.info(f"Foram encontradas {err} falhas no invariante rel_1_inv_4")
+@visitaClasse("rel_1_inv_4",ordem=150,niveis=[3],campos=["filhos","pca","df"])
+def rel_1_inv_4_classe(m,cod,classe,rep: Falhas):
+    if classe.get("filhos"):
+        temPca = bool(classe.get("pca"))
+        temDf = bool(classe.get("df"))
+        if (temDf or temPca):
+            rep.addFalhaInv("rel_1_inv_4",cod,{"temPca":temPca,"temDf":temDf})
 
 
-def rel_1_inv_6(allClasses,rep: Report):
+def rel_1_inv_6(allClasses,rep: Report,grafo: GrafoRelacoes = None):
     """
     A função testa o seguinte invariante e guarda
     em `rep` os casos em que falha:
@@ -765,34 +757,31 @@ def rel_1_inv_6(allClasses,rep: Report):
     Pelo menos um dos 4ºs níveis deve ser de conservação"
     """
 
-    logger.info("Verificação do invariante rel_1_inv_6")
+    MotorInvariantes(allClasses,grafo=grafo).verificar(["rel_1_inv_6"],rep)
 
-    for cod,classe in allClasses.items():
-        if classe["nivel"] == 3:
-            proRels = classe.get("proRel")
-            proRelCods = classe.get("processosRelacionados")
-            if proRels and proRelCods and "eComplementarDe" in proRels:
-                compls = [c for c,r in zip(proRelCods,proRels) if r=="eComplementarDe"]
-                for compl in compls:
-                    codFilhos = allClasses.get(compl,{}).get("filhos",[])
-                    filhos = [allClasses.get(c) for c in codFilhos]
-                    if filhos:
-                        conservacao = False
-                        for filho in filhos:
-                            valor = filho.get("df",{}).get("valor")
-                            if valor == "C":
-                                conservacao = True
-                                break
-                        # Se nenhum filho tiver o valor de "C",
-                        # então o invariante falha
-                        if not conservacao:
-                            rep.addFalhaInv("rel_1_inv_6",cod,{"proc": compl,"filhos": codFilhos})
 
-    err = len(rep.globalErrors["erroInv"].get("rel_1_inv_6",[]))
-    logger.info(f"Foram encontradas {err} falhas no invariante rel_1_inv_6")
+@visitaClasse("rel_1_inv_6",ordem=220,niveis=[3],campos=["proRel","filhos","df"])
+def rel_1_inv_6_classe(m,cod,classe,rep: Falhas):
+    proRels = classe.get("proRel")
+    proRelCods = classe.get("processosRelacionados")
+    if proRels and proRelCods and "eComplementarDe" in proRels:
+        for compl in m.grafo.destinos(cod,"eComplementarDe"):
+            codFilhos = m.allClasses.get(compl,{}).get("filhos",[])
+            filhos = [m.allClasses.get(c) for c in codFilhos]
+            if filhos:
+                conservacao = False
+                for filho in filhos:
+                    valor = filho.get("df",{}).get("valor")
+                    if valor == "C":
+                        conservacao = True
+                        break
+                # Se nenhum filho tiver o valor de "C",
+                # então o invariante falha
+                if not conservacao:
+                    rep.addFalhaInv("rel_1_inv_6",cod,{"proc": compl,"filhos": codFilhos})
 
 
-def rel_1_inv_3(allClasses,termosIndice,rep: Report):
+def rel_1_inv_3(allClasses,termosIndice: IndiceTermos,rep: Report):
     """
     A função testa o seguinte invariante e guarda
     em `rep` os casos em que falha:
@@ -801,21 +790,18 @@ def rel_1_inv_3(allClasses,termosIndice,rep: Report):
     de índice são replicados em cada um desses níveis"
     """
 
-    logger.info("Verificação do invariante rel_1_inv_3")
+    MotorInvariantes(allClasses,termosIndice=termosIndice).verificar(["rel_1_inv_3"],rep)
 
-    for cod,classe in allClasses.items():
-        if classe["nivel"] == 3:
-            codFilhos = classe.get("filhos")
-            if codFilhos:
-                termosPai = [t["termo"] for t in termosIndice if t["codigo"]==cod]
-                for c in codFilhos:
-                    termosFilho = [t["termo"] for t in termosIndice if t["codigo"]==c]
-                    for t in termosPai:
-                        if t not in termosFilho:
-                            rep.addFalhaInv("rel_1_inv_3",cod,{"termo":t,"filho" :c})
 
-    err = len(rep.globalErrors["erroInv"].get("rel_1_inv_3",[]))
-    logger.info(f"Foram encontradas {err} falhas no invariante rel_1_inv_3")
+@visitaClasse("rel_1_inv_3",ordem=80,niveis=[3],campos=["filhos","termosIndice"],entradas=["classes","termosIndice"])
+def rel_1_inv_3_classe(m,cod,classe,rep: Falhas):
+    codFilhos = classe.get("filhos")
+    if codFilhos:
+        termosPai = m.termosIndice.termosDoCodigo(cod)
+        for c in codFilhos:
+            for t in termosPai:
+                if not m.termosIndice.temTermo(c,t):
+                    rep.addFalhaInv("rel_1_inv_3",cod,{"termo":t,"filho" :c})
 
 
 def rel_4_inv_1(allClasses,rep: Report):
@@ -828,30 +814,28 @@ def rel_4_inv_1(allClasses,rep: Report):
     um <b>critério de densidade informacional</b>"
     """
 
-    logger.info("Verificação do invariante rel_4_inv_1")
-
-    for cod,classe in allClasses.items():
-        if classe["nivel"] == 3:
-            codFilhos = classe.get("filhos")
-            if not codFilhos:
-                proRels = classe.get("proRel")
-                if proRels and ("eSinteseDe" in proRels or "eSintetizadoPor" in proRels):
-                    df = classe.get("df",{})
-                    just = df.get("justificacao")
-                    if just:
-                        justDensidade = [x for x in just if x["tipo"]=="densidade"]
-                        if not justDensidade:
-                            rep.addFalhaInv("rel_4_inv_1",cod)
-                    elif df:
-                        rep.addFalhaInv("rel_4_inv_1",cod,extra="Neste caso nem tem justificação do DF")
-                    else:
-                        rep.addFalhaInv("rel_4_inv_1",cod,extra="Neste caso nem tem DF")
+    MotorInvariantes(allClasses).verificar(["rel_4_inv_1"],rep)
+
 
-    err = len(rep.globalErrors["erroInv"].get("rel_4_inv_1",[]))
-    logger.info(f"Foram encontradas {err} falhas no invariante rel_4_inv_1")
+@visitaClasse("rel_4_inv_1",ordem=210,niveis=[3],campos=["filhos","proRel","df"])
+def rel_4_inv_1_classe(m,cod,classe,rep: Falhas):
+    codFilhos = classe.get("filhos")
+    if not codFilhos:
+        proRels = classe.get("proRel")
+        if proRels and ("eSinteseDe" in proRels or "eSintetizadoPor" in proRels):
+            df = classe.get("df",{})
+            just = df.get("justificacao")
+            if just:
+                justDensidade = [x for x in just if x["tipo"]=="densidade"]
+                if not justDensidade:
+                    rep.addFalhaInv("rel_4_inv_1",cod)
+            elif df:
+                rep.addFalhaInv("rel_4_inv_1",cod,extra="Neste caso nem tem justificação do DF")
+            else:
+                rep.addFalhaInv("rel_4_inv_1",cod,extra="Neste caso nem tem DF")
 
 
-def rel_4_inv_2(allClasses,rep: Report):
+def rel_4_inv_2(allClasses,rep: Report,grafo: GrafoRelacoes = None):
     """
     A função testa o seguinte invariante e guarda
     em `rep` os casos em que falha:
@@ -862,77 +846,31 @@ def rel_4_inv_2(allClasses,rep: Report):
     respetiva justificação"
     """
 
-    logger.info("Verificação do invariante rel_4_inv_2")
-
-    for cod,classe in allClasses.items():
-        if classe["nivel"] == 3:
-            codFilhos = classe.get("filhos")
-            if not codFilhos:
-                proRelCods = classe.get("processosRelacionados")
-                proRels = classe.get("proRel")
-                if proRels and ("eSinteseDe" in proRels or "eSintetizadoPor" in proRels):
-                    valor = classe.get("df",{}).get("valor")
-                    # Só faz sentido fazer esta verificação em processos
-                    # com o DF de "Eliminação"
-                    if valor != "C":
-                        df = classe.get("df",{})
-                        just = df.get("justificacao")
-                        sints = [(c,r) for c,r in zip(proRelCods,proRels) if r in ["eSinteseDe","eSintetizadoPor"]]
-                        if just:
-                            jDensidade = [x for x in just if x["tipo"]=="densidade"]
-                            allProcRefs = []
-                            for crit in jDensidade:
-                                allProcRefs += crit.get("procRefs",[])
-
-                            for c,r in sints:
-                                if c not in allProcRefs:
-                                    rep.addFalhaInv("rel_4_inv_2",cod,{"proc": c, "rel": r})
-                        else:
-                            extra = ""
-                            if df:
-                                extra = "Neste caso nem tem justificação do DF"
-                            else:
-                                extra = "Neste caso nem tem DF"
-
-                            # Aqui como nem tem justificação, não tem nenhum procRef,
-                            # por isso estão todos em falta
-                            for c,r in sints:
-                                rep.addFalhaInv("rel_4_inv_2",cod,{"proc": c, "rel": r},extra=extra)
-
-    err = len(rep.globalErrors["erroInv"].get("rel_4_inv_2",[]))
-    logger.info(f"Foram encontradas {err} falhas no invariante rel_4_inv_2")
-
-
-def rel_5_inv_2(allClasses,rep: Report):
-    """
-    A função testa o seguinte invariante e guarda
-    em `rep` os casos em que falha:
-
-    "Todos os processos relacionados pela relação
-    <b>eComplementarDe</b>, devem estar relacionados
-    com o <b>critério de complementaridade informacional</b>
-    da respetiva justificação"
-    """
+    MotorInvariantes(allClasses,grafo=grafo).verificar(["rel_4_inv_2"],rep)
 
-    logger.info("Verificação do invariante rel_5_inv_2")
 
-    for cod,classe in allClasses.items():
-        if classe["nivel"] == 3:
-            proRelCods = classe.get("processosRelacionados")
-            proRels = classe.get("proRel")
-            if proRels and "eComplementarDe" in proRels:
+@visitaClasse("rel_4_inv_2",ordem=120,niveis=[3],campos=["filhos","proRel","df"])
+def rel_4_inv_2_classe(m,cod,classe,rep: Falhas):
+    codFilhos = classe.get("filhos")
+    if not codFilhos:
+        proRels = classe.get("proRel")
+        if proRels and ("eSinteseDe" in proRels or "eSintetizadoPor" in proRels):
+            valor = classe.get("df",{}).get("valor")
+            # Só faz sentido fazer esta verificação em processos
+            # com o DF de "Eliminação"
+            if valor != "C":
                 df = classe.get("df",{})
                 just = df.get("justificacao")
-                compls = [c for c,r in zip(proRelCods,proRels) if r=="eComplementarDe"]
+                sints = m.grafo.relacoes(cod,"eSinteseDe","eSintetizadoPor")
                 if just:
-                    jComlpementaridade = [x for x in just if x["tipo"]=="complementaridade"]
+                    jDensidade = [x for x in just if x["tipo"]=="densidade"]
                     allProcRefs = []
-                    for crit in jComlpementaridade:
+                    for crit in jDensidade:
                         allProcRefs += crit.get("procRefs",[])
 
-                    for c in compls:
+                    for c,r in sints:
                         if c not in allProcRefs:
-                            rep.addFalhaInv("rel_5_inv_2",cod,{"proc":c})
+                            rep.addFalhaInv("rel_4_inv_2",cod,{"proc": c, "rel": r})
                 else:
                     extra = ""
                     if df:
@@ -942,11 +880,51 @@ def rel_5_inv_2(allClasses,rep: Report):
 
                     # Aqui como nem tem justificação, não tem nenhum procRef,
                     # por isso estão todos em falta
-                    for c in compls:
-                        rep.addFalhaInv("rel_5_inv_2",cod,{"proc":c},extra=extra)
+                    for c,r in sints:
+                        rep.addFalhaInv("rel_4_inv_2",cod,{"proc": c, "rel": r},extra=extra)
+
+
+def rel_5_inv_2(allClasses,rep: Report,grafo: GrafoRelacoes = None):
+    """
+    A função testa o seguinte invariante e guarda
+    em `rep` os casos em que falha:
+
+    "Todos os processos relacionados pela relação
+    <b>eComplementarDe</b>, devem estar relacionados
+    com o <b>critério de complementaridade informacional</b>
+    da respetiva justificação"
+    """
+
+    MotorInvariantes(allClasses,grafo=grafo).verificar(["rel_5_inv_2"],rep)
 
-    err = len(rep.globalErrors["erroInv"].get("rel_5_inv_2",[]))
-    logger.info(f"Foram encontradas {err} falhas no invariante rel_5_inv_2")
+
+@visitaClasse("rel_5_inv_2",ordem=110,niveis=[3],campos=["proRel","df"])
+def rel_5_inv_2_classe(m,cod,classe,rep: Falhas):
+    proRels = classe.get("proRel")
+    if proRels and "eComplementarDe" in proRels:
+        df = classe.get("df",{})
+        just = df.get("justificacao")
+        compls = m.grafo.destinos(cod,"eComplementarDe")
+        if just:
+            jComlpementaridade = [x for x in just if x["tipo"]=="complementaridade"]
+            allProcRefs = []
+            for crit in jComlpementaridade:
+                allProcRefs += crit.get("procRefs",[])
+
+            for c in compls:
+                if c not in allProcRefs:
+                    rep.addFalhaInv("rel_5_inv_2",cod,{"proc":c})
+        else:
+            extra = ""
+            if df:
+                extra = "Neste caso nem tem justificação do DF"
+            else:
+                extra = "Neste caso nem tem DF"
+
+            # Aqui como nem tem justificação, não tem nenhum procRef,
+            # por isso estão todos em falta
+            for c in compls:
+                rep.addFalhaInv("rel_5_inv_2",cod,{"proc":c},extra=extra)
 
 
 def rel_8_inv_1(allClasses,rep: Report):
@@ -958,24 +936,22 @@ def rel_8_inv_1(allClasses,rep: Report):
     então o valor do DF é de \"Conservação\""
     """
 
-    logger.info("Verificação do invariante rel_8_inv_1")
+    MotorInvariantes(allClasses).verificar(["rel_8_inv_1"],rep)
 
-    for cod,classe in allClasses.items():
-        if classe["nivel"] == 3:
-            codFilhos = classe.get("filhos")
-            if not codFilhos:
-                proRels = classe.get("proRel")
-                if proRels and "eComplementarDe" in proRels:
-                    df = classe.get("df",{})
-                    valor = df.get("valor")
-                    if valor != "C":
-                        rep.addFalhaInv("rel_8_inv_1",cod,{"valor":valor})
 
-    err = len(rep.globalErrors["erroInv"].get("rel_8_inv_1",[]))
-    logger.info(f"Foram encontradas {err} falhas no invariante rel_8_inv_1")
+@visitaClasse("rel_8_inv_1",ordem=290,niveis=[3],campos=["filhos","proRel","df"])
+def rel_8_inv_1_classe(m,cod,classe,rep: Falhas):
+    codFilhos = classe.get("filhos")
+    if not codFilhos:
+        proRels = classe.get("proRel")
+        if proRels and "eComplementarDe" in proRels:
+            df = classe.get("df",{})
+            valor = df.get("valor")
+            if valor != "C":
+                rep.addFalhaInv("rel_8_inv_1",cod,{"valor":valor})
 
 
-def rel_2_inv_9(allClasses,rep: Report):
+def rel_2_inv_9(allClasses,rep: Report,grafo: GrafoRelacoes = None):
     """
     A função testa o seguinte invariante e guarda
     em `rep` os casos em que falha:
@@ -983,22 +959,20 @@ def rel_2_inv_9(allClasses,rep: Report):
     "Um PN só pode ter uma relação com outro PN"
     """
 
-    logger.info("Verificação do invariante rel_2_inv_9")
+    MotorInvariantes(allClasses,grafo=grafo).verificar(["rel_2_inv_9"],rep)
 
-    for cod,classe in allClasses.items():
-        if classe["nivel"] == 3:
-            proRelCods = classe.get("processosRelacionados")
-            proRels = classe.get("proRel")
-            if proRelCods and proRels:
-                proRelsCount = Counter(proRelCods)
-                rels = list(zip(proRelCods,proRels))
-                for x,count in proRelsCount.items():
-                    if count > 1:
-                        relsDuplicadas = [(c,r) for c,r in rels if c == x]
-                        rep.addFalhaInv("rel_2_inv_9",cod,{"proc":x,"rels":relsDuplicadas})
 
-    err = len(rep.globalErrors["erroInv"].get("rel_2_inv_9",[]))
-    logger.info(f"Foram encontradas {err} falhas no invariante rel_2_inv_9")
+@visitaClasse("rel_2_inv_9",ordem=250,niveis=[3],campos=["proRel"])
+def rel_2_inv_9_classe(m,cod,classe,rep: Falhas):
+    proRelCods = classe.get("processosRelacionados")
+    proRels = classe.get("proRel")
+    if proRelCods and proRels:
+        proRelsCount = Counter(proRelCods)
+        rels = m.grafo.relacoes(cod)
+        for x,count in proRelsCount.items():
+            if count > 1:
+                relsDuplicadas = [(c,r) for c,r in rels if c == x]
+                rep.addFalhaInv("rel_2_inv_9",cod,{"proc":x,"rels":relsDuplicadas})
 
 
 def rel_2_inv_2(allClasses,rep: Report):
@@ -1009,21 +983,19 @@ def rel_2_inv_2(allClasses,rep: Report):
     "Um processo não transversal não pode ter participantes"
     """
 
-    logger.info("Verificação do invariante rel_2_inv_2")
+    MotorInvariantes(allClasses).verificar(["rel_2_inv_2"],rep)
 
-    for cod,classe in allClasses.items():
-        if classe["nivel"] == 3:
-            procTrans = classe.get("procTrans")
-            if procTrans == "N":
-                participantes = classe.get("participantes")
-                if participantes:
-                    rep.addFalhaInv("rel_2_inv_2",cod)
 
-    err = len(rep.globalErrors["erroInv"].get("rel_2_inv_2",[]))
-    logger.info(f"Foram encontradas {err} falhas no invariante rel_2_inv_2")
+@visitaClasse("rel_2_inv_2",ordem=260,niveis=[3],campos=["procTrans","participantes"])
+def rel_2_inv_2_classe(m,cod,classe,rep: Falhas):
+    procTrans = classe.get("procTrans")
+    if procTrans == "N":
+        participantes = classe.get("participantes")
+        if participantes:
+            rep.addFalhaInv("rel_2_inv_2",cod)
 
 
-def rel_2_inv_10(termosIndice,rep: Report):
+def rel_2_inv_10(termosIndice: IndiceTermos,rep: Report):
     """
     A função testa o seguinte invariante e guarda
     em `rep` os casos em que falha:
@@ -1032,29 +1004,23 @@ def rel_2_inv_10(termosIndice,rep: Report):
     nenhuma classe 3"
     """
 
-    logger.info("Verificação do invariante rel_2_inv_10")
+    MotorInvariantes({},termosIndice=termosIndice).verificar(["rel_2_inv_10"],rep)
 
-    n3 = re.compile(r'^\d{3}\.\d{1,3}\.\d{1,3}$')
-    termos = {} # {termo:[100,200]}
-    for t in termosIndice:
-        cod = t["codigo"]
-        termo = t["termo"]
-        if n3.fullmatch(cod):
-            if termo in termos:
-                termos[termo].add(cod)
-            else:
-                termos[termo] = set([cod])
 
-    for t,cods in termos.items():
+@visitaFinal("rel_2_inv_10",ordem=300,campos=["termosIndice"],entradas=["termosIndice"])
+def rel_2_inv_10_final(m,rep: Falhas):
+    for t,cods in m.termosIndice.classes3De.items():
         if len(cods) > 1:
+            # Cada falha fica com uma cópia dos códigos, porque o
+            # conjunto do índice muda com os termos acrescentados.
+            # As falhas são registadas pela ordem dos códigos e não
+            # pela do conjunto, que muda de execução para execução
+            cods = sorted(cods)
             for c in cods:
-                rep.addFalhaInv("rel_2_inv_10",c,{"t":t,"cods": cods})
-
-    err = len(rep.globalErrors["erroInv"].get("rel_2_inv_10",[]))
-    logger.info(f"Foram encontradas {err} falhas no invariante rel_2_inv_10")
+                rep.addFalhaInv("rel_2_inv_10",c,{"t":t,"cods": list(cods)})
 
 
-def rel_2_inv_8(allClasses,rep: Report):
+def rel_2_inv_8(allClasses,rep: Report,grafo: GrafoRelacoes = None):
     """
     A função testa o seguinte invariante e guarda
     em `rep` os casos em que falha:
@@ -1062,21 +1028,15 @@ def rel_2_inv_8(allClasses,rep: Report):
     "Um PN não se pode relacionar com ele próprio"
     """
 
-    logger.info("Verificação do invariante rel_2_inv_8")
+    MotorInvariantes(allClasses,grafo=grafo).verificar(["rel_2_inv_8"],rep)
 
-    for cod,classe in allClasses.items():
-        if classe["nivel"] == 3:
-            proRelCods = classe.get("processosRelacionados")
-            proRels = classe.get("proRel")
-            if proRelCods:
-                # Identificar os todos os casos em que o processo
-                # se menciona a si próprio
-                selfRels = [r for c,r in zip(proRelCods,proRels) if cod==c]
-                for r in selfRels:
-                    rep.addFalhaInv("rel_2_inv_8",cod,{"rel":r})
 
-    err = len(rep.globalErrors["erroInv"].get("rel_2_inv_8",[]))
-    logger.info(f"Foram encontradas {err} falhas no invariante rel_2_inv_8")
+@visitaAresta("rel_2_inv_8",ordem=230,niveis=[3],campos=["proRel"])
+def rel_2_inv_8_aresta(m,cod,classe,proc,rel,rep: Falhas):
+    # Identificar os todos os casos em que o processo
+    # se menciona a si próprio
+    if cod == proc:
+        rep.addFalhaInv("rel_2_inv_8",cod,{"rel":rel})
 
 
 def rel_2_inv_14(allClasses,rep: Report):
@@ -1087,21 +1047,19 @@ def rel_2_inv_14(allClasses,rep: Report):
     "Um processo transversal tem de ter participantes"
     """
 
-    logger.info("Verificação do invariante rel_2_inv_14")
+    MotorInvariantes(allClasses).verificar(["rel_2_inv_14"],rep)
 
-    for cod,classe in allClasses.items():
-        if classe['nivel'] == 3:
-            procTrans = classe.get("procTrans")
-            if procTrans == "S":
-                participantes = classe.get("participantes")
-                if not participantes:
-                    rep.addFalhaInv("rel_2_inv_14",cod)
 
-    err = len(rep.globalErrors["erroInv"].get("rel_2_inv_14",[]))
-    logger.info(f"Foram encontradas {err} falhas no invariante rel_2_inv_14")
+@visitaClasse("rel_2_inv_14",ordem=270,niveis=[3],campos=["procTrans","participantes"])
+def rel_2_inv_14_classe(m,cod,classe,rep: Falhas):
+    procTrans = classe.get("procTrans")
+    if procTrans == "S":
+        participantes = classe.get("participantes")
+        if not participantes:
+            rep.addFalhaInv("rel_2_inv_14",cod)
 
 
-def rel_1_inv_7(allClasses,harmonizacao,rep: Report):
+def rel_1_inv_7(allClasses,harmonizacao,rep: Report,hier: Hierarquia = None):
     """
     A função testa o seguinte invariante e guarda
     em `rep` os casos em que falha:
@@ -1109,18 +1067,16 @@ def rel_1_inv_7(allClasses,harmonizacao,rep: Report):
     "Os PNs em harmonização não podem ter filhos ativos"
     """
 
-    logger.info("Verificação do invariante rel_1_inv_7")
+    MotorInvariantes(allClasses,harmonizacao,hier=hier).verificar(["rel_1_inv_7"],rep)
 
-    # Como em `allClasses` apenas existem processos ativos,
-    # a verificação é feita dos filhos para os pais.
-    for cod,classe in allClasses.items():
-        if classe["nivel"] == 4:
-            pai = re.search(r'^(\d{3}\.\d{1,3}\.\d{1,3})\.\d{1,4}$', cod).group(1)
-            if pai in harmonizacao:
-                rep.addFalhaInv("rel_1_inv_7",cod,{"pai":pai})
 
-    err = len(rep.globalErrors["erroInv"].get("rel_1_inv_7",[]))
-    logger.info(f"Foram encontradas {err} falhas no invariante rel_1_inv_7")
+# Como em `allClasses` apenas existem processos ativos,
+# a verificação é feita dos filhos para os pais.
+@visitaClasse("rel_1_inv_7",ordem=280,niveis=[4],campos=["filhos"],entradas=["classes","harmonizacao"])
+def rel_1_inv_7_classe(m,cod,classe,rep: Falhas):
+    pai = m.hier.pai(cod)
+    if pai in m.harmonizacao:
+        rep.addFalhaInv("rel_1_inv_7",cod,{"pai":pai})
 
 
 def rel_8_inv_4(allClasses,rep: Report):
@@ -1133,35 +1089,33 @@ def rel_8_inv_4(allClasses,rep: Report):
     zona de contexto"
     """
 
-    logger.info("Verificação do invariante rel_8_inv_4")
+    MotorInvariantes(allClasses).verificar(["rel_8_inv_4"],rep)
 
-    for cod,classe in allClasses.items():
-        if classe["nivel"] == 3:
-            filhos = classe.get("filhos")
-            if not filhos:
-                proRelCods = classe.get("processosRelacionados",[])
 
-                justPca = classe.get("pca",{}).get("justificacao")
-                if justPca:
-                    for crit in justPca:
-                        procRefs = crit.get("procRefs",[])
-                        for p in procRefs:
-                            if p not in proRelCods:
-                                rep.addFalhaInv("rel_8_inv_4",cod,{"proc":p,"tipo":"PCA"})
+@visitaClasse("rel_8_inv_4",ordem=320,niveis=[3],campos=["filhos","proRel","pca","df"])
+def rel_8_inv_4_classe(m,cod,classe,rep: Falhas):
+    filhos = classe.get("filhos")
+    if not filhos:
+        proRelCods = classe.get("processosRelacionados",[])
 
-                justDf = classe.get("df",{}).get("justificacao")
-                if justDf:
-                    for crit in justDf:
-                        procRefs = crit.get("procRefs",[])
-                        for p in procRefs:
-                            if p not in proRelCods:
-                                rep.addFalhaInv("rel_8_inv_4",cod,{"proc":p,"tipo":"DF"})
+        justPca = classe.get("pca",{}).get("justificacao")
+        if justPca:
+            for crit in justPca:
+                procRefs = crit.get("procRefs",[])
+                for p in procRefs:
+                    if p not in proRelCods:
+                        rep.addFalhaInv("rel_8_inv_4",cod,{"proc":p,"tipo":"PCA"})
 
-    err = len(rep.globalErrors["erroInv"].get("rel_8_inv_4",[]))
-    logger.info(f"Foram encontradas {err} falhas no invariante rel_8_inv_4")
+        justDf = classe.get("df",{}).get("justificacao")
+        if justDf:
+            for crit in justDf:
+                procRefs = crit.get("procRefs",[])
+                for p in procRefs:
+                    if p not in proRelCods:
+                        rep.addFalhaInv("rel_8_inv_4",cod,{"proc":p,"tipo":"DF"})
 
 
-def rel_8_inv_5(allClasses,rep: Report):
+def rel_8_inv_5(allClasses,rep: Report,grafo: GrafoRelacoes = None):
     """
     A função testa o seguinte invariante e guarda
     em `rep` os casos em que falha:
@@ -1172,29 +1126,24 @@ def rel_8_inv_5(allClasses,rep: Report):
     ou <b><i>eSintetizadoPor</i></b>"
     """
 
-    logger.info("Verificação do invariante rel_8_inv_5")
+    MotorInvariantes(allClasses,grafo=grafo).verificar(["rel_8_inv_5"],rep)
 
-    for cod,classe in allClasses.items():
-        if classe["nivel"] == 3:
-            filhos = classe.get("filhos")
-            if not filhos:
-                just = classe.get("df",{}).get("justificacao")
-                if just:
-                    jDensidade = [x for x in just if x["tipo"]=="densidade"]
-                    proRels = classe.get("proRel",[])
-                    proRelCods = classe.get("processosRelacionados",[])
-                    sints = [c for c,r in zip(proRelCods,proRels) if r in ["eSinteseDe","eSintetizadoPor"]]
-                    for crit in jDensidade:
-                        procRefs = crit.get("procRefs",[])
-                        for p in procRefs:
-                            if p not in sints:
-                                rep.addFalhaInv("rel_8_inv_5",cod,{"proc":p})
 
-    err = len(rep.globalErrors["erroInv"].get("rel_8_inv_5",[]))
-    logger.info(f"Foram encontradas {err} falhas no invariante rel_8_inv_5")
+@visitaClasse("rel_8_inv_5",ordem=330,niveis=[3],campos=["filhos","proRel","df"])
+def rel_8_inv_5_classe(m,cod,classe,rep: Falhas):
+    filhos = classe.get("filhos")
+    if not filhos:
+        just = classe.get("df",{}).get("justificacao")
+        if just:
+            jDensidade = [x for x in just if x["tipo"]=="densidade"]
+            for crit in jDensidade:
+                procRefs = crit.get("procRefs",[])
+                for p in procRefs:
+                    if not m.grafo.temRelacao(cod,"eSinteseDe",p) and not m.grafo.temRelacao(cod,"eSintetizadoPor",p):
+                        rep.addFalhaInv("rel_8_inv_5",cod,{"proc":p})
 
 
-def rel_8_inv_6(allClasses,rep: Report):
+def rel_8_inv_6(allClasses,rep: Report,grafo: GrafoRelacoes = None):
     """
     A função testa o seguinte invariante e guarda
     em `rep` os casos em que falha:
@@ -1205,29 +1154,24 @@ def rel_8_inv_6(allClasses,rep: Report):
     <b><i>eComplementarDe</i></b>"
     """
 
-    logger.info("Verificação do invariante rel_8_inv_6")
+    MotorInvariantes(allClasses,grafo=grafo).verificar(["rel_8_inv_6"],rep)
 
-    for cod,classe in allClasses.items():
-        if classe["nivel"] == 3:
-            filhos = classe.get("filhos")
-            if not filhos:
-                just = classe.get("df",{}).get("justificacao")
-                if just:
-                    jComlpementaridade = [x for x in just if x["tipo"]=="complementaridade"]
-                    proRels = classe.get("proRel",[])
-                    proRelCods = classe.get("processosRelacionados",[])
-                    compls = [c for c,r in zip(proRelCods,proRels) if r=="eComplementarDe"]
-                    for crit in jComlpementaridade:
-                        procRefs = crit.get("procRefs",[])
-                        for p in procRefs:
-                            if p not in compls:
-                                rep.addFalhaInv("rel_8_inv_6",cod,{"proc":p})
 
-    err = len(rep.globalErrors["erroInv"].get("rel_8_inv_6",[]))
-    logger.info(f"Foram encontradas {err} falhas no invariante rel_8_inv_6")
+@visitaClasse("rel_8_inv_6",ordem=340,niveis=[3],campos=["filhos","proRel","df"])
+def rel_8_inv_6_classe(m,cod,classe,rep: Falhas):
+    filhos = classe.get("filhos")
+    if not filhos:
+        just = classe.get("df",{}).get("justificacao")
+        if just:
+            jComlpementaridade = [x for x in just if x["tipo"]=="complementaridade"]
+            for crit in jComlpementaridade:
+                procRefs = crit.get("procRefs",[])
+                for p in procRefs:
+                    if not m.grafo.temRelacao(cod,"eComplementarDe",p):
+                        rep.addFalhaInv("rel_8_inv_6",cod,{"proc":p})
 
 
-def rel_8_inv_7(allClasses,rep: Report):
+def rel_8_inv_7(allClasses,rep: Report,grafo: GrafoRelacoes = None):
     """
     A função testa o seguinte invariante e guarda
     em `rep` os casos em que falha:
@@ -1238,25 +1182,21 @@ def rel_8_inv_7(allClasses,rep: Report):
     <b><i>eSuplementoPara</i></b>"
     """
 
-    logger.info("Verificação do invariante rel_8_inv_7")
-    for cod,classe in allClasses.items():
-        if classe["nivel"] == 3:
-            filhos = classe.get("filhos")
-            if not filhos:
-                just = classe.get("pca",{}).get("justificacao")
-                if just:
-                    jUtilidade = [x for x in just if x["tipo"]=="utilidade"]
-                    proRels = classe.get("proRel",[])
-                    proRelCods = classe.get("processosRelacionados",[])
-                    supls = [c for r,c in zip(proRels,proRelCods) if r=="eSuplementoPara"]
-                    for crit in jUtilidade:
-                        procRefs = crit.get("procRefs",[])
-                        for p in procRefs:
-                            if p not in supls:
-                                rep.addFalhaInv("rel_8_inv_7",cod,{"proc":p})
+    MotorInvariantes(allClasses,grafo=grafo).verificar(["rel_8_inv_7"],rep)
 
-    err = len(rep.globalErrors["erroInv"].get("rel_8_inv_7",[]))
-    logger.info(f"Foram encontradas {err} falhas no invariante rel_8_inv_7")
+
+@visitaClasse("rel_8_inv_7",ordem=350,niveis=[3],campos=["filhos","proRel","pca"])
+def rel_8_inv_7_classe(m,cod,classe,rep: Falhas):
+    filhos = classe.get("filhos")
+    if not filhos:
+        just = classe.get("pca",{}).get("justificacao")
+        if just:
+            jUtilidade = [x for x in just if x["tipo"]=="utilidade"]
+            for crit in jUtilidade:
+                procRefs = crit.get("procRefs",[])
+                for p in procRefs:
+                    if not m.grafo.temRelacao(cod,"eSuplementoPara",p):
+                        rep.addFalhaInv("rel_8_inv_7",cod,{"proc":p})
 
 
 def rel_7_inv_1(allClasses, rep: Report):
@@ -1268,22 +1208,14 @@ def rel_7_inv_1(allClasses, rep: Report):
     critério de cada tipo"
     """
 
-    logger.info("Verificação do invariante rel_7_inv_1")
+    MotorInvariantes(allClasses).verificar(["rel_7_inv_1"],rep)
 
-    for cod,classe in allClasses.items():
-        if classe["nivel"] in [3,4]:
-            just = classe.get("pca",{}).get("justificacao")
-            if just:
-                tiposSet = set()
-                tipos = [x["tipo"] for x in just if "tipo" in x]
-                for t in tipos:
-                    if t in tiposSet:
-                        rep.addFalhaInv("rel_7_inv_1",cod,{"tipo":t})
-                    else:
-                        tiposSet.add(t)
 
-    err = len(rep.globalErrors["erroInv"].get("rel_7_inv_1",[]))
-    logger.info(f"Foram encontradas {err} falhas no invariante rel_7_inv_1")
+@visitaClasse("rel_7_inv_1",ordem=360,niveis=[3,4],campos=["pca"])
+def rel_7_inv_1_classe(m,cod,classe,rep: Falhas):
+    just = classe.get("pca",{}).get("justificacao")
+    if just:
+        checkCriteriosRepetidos(cod,just,rep,"rel_7_inv_1")
 
 
 def rel_6_inv_1(allClasses, rep: Report):
@@ -1295,19 +1227,11 @@ def rel_6_inv_1(allClasses, rep: Report):
     critério de cada tipo"
     """
 
-    logger.info("Verificação do invariante rel_6_inv_1")
+    MotorInvariantes(allClasses).verificar(["rel_6_inv_1"],rep)
 
-    for cod,classe in allClasses.items():
-        if classe["nivel"] in [3,4]:
-            just = classe.get("df",{}).get("justificacao")
-            if just:
-                tiposSet = set()
-                tipos = [x["tipo"] for x in just if "tipo" in x]
-                for t in tipos:
-                    if t in tiposSet:
-                        rep.addFalhaInv("rel_6_inv_1",cod,{"tipo":t})
-                    else:
-                        tiposSet.add(t)
 
-    err = len(rep.globalErrors["erroInv"].get("rel_6_inv_1",[]))
-    logger.info(f"Foram encontradas {err} falhas no invariante rel_6_inv_1")
+@visitaClasse("rel_6_inv_1",ordem=370,niveis=[3,4],campos=["df"])
+def rel_6_inv_1_classe(m,cod,classe,rep: Falhas):
+    just = classe.get("df",{}).get("justificacao")
+    if just:
+        checkCriteriosRepetidos(cod,just,rep,"rel_6_inv_1")
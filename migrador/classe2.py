@@ -1,14 +1,14 @@
-from itertools import islice
 import logging
-from nanoid import generate
-import pandas as pd
 import json
 import re
 from . import contexto
 from . import decisao
+from .leitura import iterRows, limpaTexto, limpaLista, anulaVazios
 from .report import Report
+from .catalogos import Catalogos
+from .identificadores import Identificadores
 import os
-from utils.path_utils import FILES_DIR
+from utils.workspace_utils import Workspace, PADRAO
 from utils.log_utils import PROC
 
 hreg = re.compile(r'[hH][aA][rR][mM][oO]?[nN]?')
@@ -56,56 +56,58 @@ def calcNivel(cod,rep:Report,estado):
 #
 # Processa as notas de aplicação
 
-def procNotas(notas, codClasse, chave1=None, chave2=None):
+def procNotas(notas, codClasse, chave1=None, chave2=None, ids: Identificadores = None):
     res = []
     if not chave1:
         chave1 = 'idNota'
     if not chave2:
         chave2 = 'nota'
-    notas = brancos.sub('', notas)
-    notas = sepExtra.sub('', notas)
-    filtradas = notas.split('#')
-    for na in filtradas:
+    if ids is None:
+        ids = Identificadores()
+    # As notas já vêm limpas e partidas (ver `normaliza`)
+    for i, na in enumerate(notas):
         res.append({
-            chave1: chave2 + '_' + codClasse + '_' + generate('1234567890abcdef', 12),
+            chave1: ids.gerar(chave2 + '_' + codClasse + '_', '1234567890abcdef', 12, chave2, codClasse, i, na),
             chave2: na
         })
     return res
 # --------------------------------------------------
+#
+# Normalização vetorizada de um bloco de linhas da folha
+def normaliza(df):
+    anulaVazios(df)
+    limpaTexto(df, "Código", (re.compile(r'(\r\n|\n|\r|[ \u202F\u00A0])'), ''))
+    limpaTexto(df, "Título", (brancos, ''))
+    limpaTexto(df, "Descrição", (norm_brancos, ' '))
+    for col in ["Notas de aplicação", "Exemplos de NA", "Notas de exclusão"]:
+        limpaLista(df, col, (brancos, ''), (sepExtra, ''))
+    contexto.normaliza(df)
+    decisao.normaliza(df)
+# --------------------------------------------------
 
-def processSheet(sheet, nome, rep:Report):
+def processSheet(sheet, nome, rep:Report, cat: Catalogos, ws: Workspace = PADRAO):
 
     loggerProc = logging.getLogger(PROC)
-    # Carregam-se os catálogos
-    # --------------------------------------------------
-    ecatalog = open(os.path.join(FILES_DIR,'entCatalog.json'))
-    tcatalog = open(os.path.join(FILES_DIR,'tipCatalog.json'))
-    lcatalog = open(os.path.join(FILES_DIR,'legCatalog.json'))
-    entCatalog = json.load(ecatalog)
-    tipCatalog = json.load(tcatalog)
-    legCatalog = json.load(lcatalog)
-
-    # Load one worksheet.
+    # Catálogos
     # --------------------------------------------------
+    entCatalog = cat.entidades
+    tipCatalog = cat.tipologias
+    legCatalog = cat.legislacao
+
     fnome = nome.split("_")[0]
     loggerProc.info(f"# Migração da Classe {fnome}----------------------")
 
-    ws = sheet
-    data = ws.values
-    cols = next(data)[0:]
-    data = list(data)
-    idx = list(range(len(data)))
-    data = (islice(r, 0, None) for r in data)
-    df = pd.DataFrame(data, index=idx, columns=cols)
-    df = df.astype(object).mask(df.isna(), None)
-
     myClasse = {}
+    # Identificadores das notas e exemplos da folha
+    ids = Identificadores()
 
-    for _, row in df.iterrows():
+    # Leitura da folha linha a linha (modo streaming)
+    # --------------------------------------------------
+    for row in iterRows(sheet, normaliza):
         myReg = {}
-        if row["Código"]:
+        if row["Código"] is not None:
             # Código -----
-            cod = re.sub(r'(\r\n|\n|\r|[ \u202F\u00A0])','', str(row["Código"]))
+            cod = row["Código"]
             # Estado -----
             if row["Estado"]:
                 myReg["estado"] = calcEstado(cod,row["Estado"],rep)
@@ -114,26 +116,26 @@ def processSheet(sheet, nome, rep:Report):
             # Nível -----
             myReg["nivel"] = calcNivel(cod,rep,myReg["estado"])
             # Título -----
-            if row["Título"]:
-                myReg["titulo"] = brancos.sub('', row["Título"])
+            if row["Título"] is not None:
+                myReg["titulo"] = row["Título"]
             else:
                 if myReg["estado"] != 'H':
                     rep.addErro(cod,"Classe sem título")
 
             # Descrição -----
-            if row["Descrição"]:
-                myReg["descricao"] = norm_brancos.sub(' ', str(row["Descrição"]))
+            if row["Descrição"] is not None:
+                myReg["descricao"] = row["Descrição"]
             else:
                 myReg["descricao"] = ""
             # Notas de aplicação -----
-            if row["Notas de aplicação"]:
-                myReg["notasAp"] = procNotas(row["Notas de aplicação"], cod)
+            if row["Notas de aplicação"] is not None:
+                myReg["notasAp"] = procNotas(row["Notas de aplicação"], cod, ids=ids)
             # Exemplos de notas de aplicação -----
-            if row["Exemplos de NA"]:
-                myReg["exemplosNotasAp"] = procNotas(row["Exemplos de NA"], cod, 'idExemplo', 'exemplo')
+            if row["Exemplos de NA"] is not None:
+                myReg["exemplosNotasAp"] = procNotas(row["Exemplos de NA"], cod, 'idExemplo', 'exemplo', ids)
             # Notas de exclusão -----
-            if row["Notas de exclusão"]:
-                myReg["notasEx"] = procNotas(row["Notas de exclusão"], cod)
+            if row["Notas de exclusão"] is not None:
+                myReg["notasEx"] = procNotas(row["Notas de exclusão"], cod, ids=ids)
 
             # Registo das classes de nível 1
             if myReg["nivel"] == 1:
@@ -150,7 +152,7 @@ def processSheet(sheet, nome, rep:Report):
             rep.addDecl(cod,nome)
             myClasse[cod] = myReg
 
-    outFilePath = os.path.join(FILES_DIR,f"{fnome}.json")
+    outFilePath = os.path.join(ws.filesDir,f"{fnome}.json")
     outFile = open(outFilePath, "w", encoding="utf-8")
 
     json.dump(myClasse, outFile, indent = 4, ensure_ascii=False)
@@ -1,9 +1,24 @@
 import pandas as pd
 import re
 from .report import Report
+from .leitura import limpaTexto, limpaLista
 brancos = re.compile(r'\r\n|\n|\r|[ \u202F\u00A0]+$|^[ \u202F\u00A0]+')
 sepExtra = re.compile(r'#$|^#')
 
+def normaliza(df):
+    """
+    Normalização vetorizada, bloco a bloco, das colunas das decisões
+    de avaliação. O PCA não é normalizado aqui, o seu tratamento
+    depende do tipo do valor lido do Excel.
+    """
+    limpaTexto(df, "Nota ao PCA", (brancos, ''))
+    # A forma de contagem é sempre convertida, mesmo quando vazia
+    limpaTexto(df, "Forma de contagem do PCA", (brancos, ''), todos=True)
+    limpaLista(df, "Justificação PCA", (brancos, ''), (sepExtra, ''))
+    limpaTexto(df, "Destino final", (brancos, ''), lambda t: t.str.upper())
+    limpaTexto(df, "Nota ao DF", (brancos, ''))
+    limpaLista(df, "Justificação DF", (brancos, ''), (sepExtra, ''))
+
 def procDecisoes(classe, cod, myReg, legCatalog,rep: Report):
     # PCA -----
     if classe["Prazo de conservação administrativa"]:
@@ -35,15 +50,15 @@ def procDecisoes(classe, cod, myReg, legCatalog,rep: Report):
                 myReg['pca']['valores'] = pca
 
     # Nota ao PCA ----------------------------
-    if classe["Nota ao PCA"]:
-        myReg['pca']['notas'] = brancos.sub('', classe["Nota ao PCA"])
+    if classe["Nota ao PCA"] is not None:
+        myReg['pca']['notas'] = classe["Nota ao PCA"]
     # ERRO: um dos dois, PCA ou Nota ao PCA, tem de ter um valor válido
     if myReg["estado"]!='H':
         if classe["Prazo de conservação administrativa"] and (myReg['pca']['valores'] == "NE") and 'notas' not in myReg['pca']:
             rep.addErro(cod,"PCA e Nota ao PCA não podem ser simultaneamente inválidos")
     # Forma de Contagem do PCA -----
     if 'pca' in myReg and myReg['pca']['valores'] != "NE":
-        formaContagem = brancos.sub('', str(classe["Forma de contagem do PCA"]))
+        formaContagem = classe["Forma de contagem do PCA"]
         if re.search(r'conclusão.*procedimento', formaContagem, re.I):
             myReg['pca']['formaContagem'] = 'conclusaoProcedimento'
         elif re.search(r'cessação.*vigência', formaContagem, re.I):
@@ -91,10 +106,8 @@ def procDecisoes(classe, cod, myReg, legCatalog,rep: Report):
                 rep.addErro(cod,f"Forma de contagem do PCA desconhecida::<b>{formaContagem}</b>")
 
     # Justificação do PCA -----
-    if 'pca' in myReg and classe["Justificação PCA"]:
-        just = brancos.sub('', classe["Justificação PCA"])
-        just = sepExtra.sub('', just)
-        criterios = just.split('#')
+    if 'pca' in myReg and classe["Justificação PCA"] is not None:
+        criterios = classe["Justificação PCA"]
         myReg['pca']['justificacao'] = []
         for index,crit in enumerate(criterios):
             jcodigo = "just_pca_c" + cod + "_" + str(index)
@@ -164,9 +177,9 @@ def procDecisoes(classe, cod, myReg, legCatalog,rep: Report):
             myReg['pca']['justificacao'].append(myCrit)
 
     # DF ------------------------------------------------------
-    if classe["Destino final"]:
+    if classe["Destino final"] is not None:
         myReg['df'] = {}
-        df = brancos.sub('', classe["Destino final"]).upper()
+        df = classe["Destino final"]
         # Verifica-se se tem alguma coisa
         if re.search(r'C|CP|E|NE', df):
             myReg['df']['valor'] = df
@@ -175,16 +188,14 @@ def procDecisoes(classe, cod, myReg, legCatalog,rep: Report):
             if myReg["estado"]!='H':
                 rep.addErro(cod,f"Valor inválido para o DF::<b>{df}</b>")
     # Nota ao DF ------------------------------------------------------
-    if "Nota ao DF" in classe and classe["Nota ao DF"]:
-        myReg['df']['nota'] = brancos.sub('', classe["Nota ao DF"])
+    if "Nota ao DF" in classe and classe["Nota ao DF"] is not None:
+        myReg['df']['nota'] = classe["Nota ao DF"]
     # ERRO: um dos dois, DF ou Nota ao DF, tem de ter um valor válido
-    if myReg["estado"]!='H' and classe["Destino final"] and (myReg['df']['valor'] == "NE") and 'nota' not in myReg['df']:
+    if myReg["estado"]!='H' and classe["Destino final"] is not None and (myReg['df']['valor'] == "NE") and 'nota' not in myReg['df']:
         rep.addErro(cod,"DF e Nota ao DF não podem ser simultaneamente inválidos")
     # Justificação do DF ----------------------------------------------
-    if 'df' in myReg and classe["Justificação DF"]:
-        just = brancos.sub('', classe["Justificação DF"])
-        just = sepExtra.sub('', just)
-        criterios = just.split('#')
+    if 'df' in myReg and classe["Justificação DF"] is not None:
+        criterios = classe["Justificação DF"]
         myReg['df']['justificacao'] = []
         for index,crit in enumerate(criterios):
             jcodigo = "just_df_c" + cod + "_" + str(index)
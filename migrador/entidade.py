@@ -1,56 +1,51 @@
-from itertools import islice
 import logging
 import pandas as pd
 import json
 import re
 import os
-from utils.path_utils import FILES_DIR
+from utils.workspace_utils import Workspace, PADRAO
 from utils.log_utils import PROC
+from .leitura import iterRows, limpaTexto, limpaLista, anulaVazios
 from .report import Report
+from .catalogos import Catalogos
 
 brancos = re.compile(r'\r\n|\n|\r|[ \u202F\u00A0]+$|^[ \u202F\u00A0]+')
 sepExtra = re.compile(r'#$|^#')
 
-def processSheet(sheet, rep: Report):
+# Normalização vetorizada de um bloco de linhas da folha
+def normaliza(df):
+    anulaVazios(df)
+    limpaTexto(df, "Sigla", (brancos, ''), (re.compile(r'[ \u202F\u00A0,]+'), '_'))
+    for col in ["Estado", "ID SIOE", "Designação", "Internacional"]:
+        limpaTexto(df, col, (brancos, ''))
+    limpaLista(df, "Tipologia de Entidade", (brancos, ''), (sepExtra, ''), subsItem=[(brancos, '')])
+
+def processSheet(sheet, rep: Report, cat: Catalogos, ws: Workspace = PADRAO):
     loggerProc = logging.getLogger(PROC)
     loggerProc.info("# Migração do Catálogo de Entidades ----------------------")
-    # Load one worksheet.
-    ws = sheet
-    data = ws.values
-    cols = next(data)[0:]
-    data = list(data)
-    idx = list(range(len(data)))
-    data = (islice(r, 0, None) for r in data)
-    df = pd.DataFrame(data, index=idx, columns=cols)
-    df = df.astype(object).mask(df.isna(), None)
+    # Leitura da folha linha a linha (modo streaming)
 
     entCatalog = {}
     myEntidade = []
-    for index, row in df.iterrows():
+    for index, row in enumerate(iterRows(sheet, normaliza)):
         myReg = {}
-        if row["Sigla"]:
-            limpa = brancos.sub('', str(row["Sigla"]))
-            myReg["sigla"] = re.sub(r'[ \u202F\u00A0,]+', '_', limpa)
+        if row["Sigla"] is not None:
+            myReg["sigla"] = row["Sigla"]
             if myReg["sigla"] not in entCatalog:
                 entCatalog[myReg["sigla"]] = [index+2]
             else:
                 entCatalog[myReg["sigla"]].append(index+2)
 
-            if row["Estado"]:
-               myReg["estado"] = brancos.sub('', str(row["Estado"]))
-            if row["ID SIOE"]:
-                myReg["sioe"] = brancos.sub('', str(row["ID SIOE"]))
-            if row["Designação"]:
-                myReg["designacao"] = brancos.sub('', str(row["Designação"]))
-            if row["Tipologia de Entidade"]:
-                tipologias = brancos.sub('', str(row["Tipologia de Entidade"]))
-                tipologias = sepExtra.sub('', tipologias)
-                lista = tipologias.split('#')
-                myReg['tipologias'] = []
-                for tip in lista:
-                    myReg['tipologias'].append(brancos.sub('', tip))
-            if row["Internacional"]:
-                myReg["internacional"] = brancos.sub('', str(row["Internacional"]))
+            if row["Estado"] is not None:
+               myReg["estado"] = row["Estado"]
+            if row["ID SIOE"] is not None:
+                myReg["sioe"] = row["ID SIOE"]
+            if row["Designação"] is not None:
+                myReg["designacao"] = row["Designação"]
+            if row["Tipologia de Entidade"] is not None:
+                myReg['tipologias'] = row["Tipologia de Entidade"]
+            if row["Internacional"] is not None:
+                myReg["internacional"] = row["Internacional"]
             else:
                 myReg["internacional"] = "Não"
             if row["Data de criação"] and (not pd.isnull(row["Data de criação"])):
@@ -65,15 +60,13 @@ def processSheet(sheet, rep: Report):
             for l in linhas:
                 rep.addErroCatalogo(f"Linha {l}: Entidade duplicada::<b>{sig}</b>.","entidade")
 
-    outFilePath = os.path.join(FILES_DIR, "ent.json")
+    outFilePath = os.path.join(ws.filesDir, "ent.json")
     outFile = open(outFilePath, "w", encoding="utf-8")
     json.dump(myEntidade, outFile, indent = 4, ensure_ascii=False)
     loggerProc.info(f"Entidades extraídas: {len(myEntidade)}")
     outFile.close()
 
-    catalogPath = os.path.join(FILES_DIR, "entCatalog.json")
-    catalog = open(catalogPath, "w", encoding="utf-8")
-    json.dump(list(entCatalog.keys()), catalog, indent = 4, ensure_ascii=False)
+    cat.entidades = entCatalog
     loggerProc.info("Catálogo de entidades criado.")
     loggerProc.info("# FIM: Migração do Catálogo de Entidades -----------------")
     return len(myEntidade)
@@ -0,0 +1,148 @@
+import logging
+from utils.log_utils import INV
+from utils.progresso_utils import Etapa
+from .motor import invariantes
+
+logger = logging.getLogger(INV)
+
+
+class Escalonador:
+    """
+    Grafo de dependências entre os invariantes registados,
+    construído a partir do que cada um declara:
+
+    * os `campos` de que o invariante depende;
+    * os campos que a sua correção automática `altera`.
+
+    Há uma aresta de `a` para `b` quando a correção de `a` altera
+    algum campo de que `b` depende, isto é, quando as falhas de `b`
+    podem mudar depois da correção de `a` (os `dependentes` de `a`).
+
+    As correções que dependem umas das outras (direta ou
+    indiretamente) formam um componente e são aplicadas juntas,
+    pela ordem de `nomes`. Os componentes formam um DAG, que é
+    percorrido por camadas: os componentes de uma mesma camada
+    não dependem uns dos outros.
+
+    Os `nomes` são os ids dos invariantes pela ordem de
+    `invariantes.json`; por omissão, a ordem de registo.
+    """
+
+    def __init__(self,nomes=None):
+        if nomes is None:
+            nomes = list(invariantes)
+        for nome in nomes:
+            if nome not in invariantes:
+                logger.warning(f"O invariante {nome} não tem verificação registada")
+        self.nomes = [n for n in nomes if n in invariantes]
+        self.posicao = {n: i for i,n in enumerate(self.nomes)}
+        self.arestas = {n: self.dependentes(n) for n in self.nomes}
+
+
+    def dependentes(self,nome):
+        """
+        Invariantes (além de `nome`) cujas falhas podem mudar
+        com a correção do invariante `nome`.
+        """
+        altera = invariantes[nome].altera
+        return [n for n in self.nomes if n != nome and invariantes[n].campos & altera]
+
+
+    def correcoes(self):
+        """
+        Invariantes com correção automática, pela ordem de `nomes`.
+        """
+        return [n for n in self.nomes if invariantes[n].correcao is not None]
+
+
+    def componentes(self):
+        """
+        Componentes fortemente conexos do grafo das correções
+        (algoritmo de Tarjan), cada um pela ordem de `nomes`.
+        """
+
+        nos = self.correcoes()
+        arestas = {n: [d for d in self.arestas[n] if invariantes[d].correcao is not None] for n in nos}
+        indice = {}
+        minimo = {}
+        pilha = []
+        naPilha = set()
+        componentes = []
+
+        def visita(n):
+            indice[n] = minimo[n] = len(indice)
+            pilha.append(n)
+            naPilha.add(n)
+            for d in arestas[n]:
+                if d not in indice:
+                    visita(d)
+                    minimo[n] = min(minimo[n],minimo[d])
+                elif d in naPilha:
+                    minimo[n] = min(minimo[n],indice[d])
+            if minimo[n] == indice[n]:
+                comp = []
+                while True:
+                    d = pilha.pop()
+                    naPilha.discard(d)
+                    comp.append(d)
+                    if d == n:
+                        break
+                componentes.append(sorted(comp,key=self.posicao.get))
+
+        for n in nos:
+            if n not in indice:
+                visita(n)
+        return componentes
+
+
+    def camadas(self):
+        """
+        Camadas do DAG dos componentes: cada componente fica na
+        camada a seguir à do último componente de que depende.
+        As camadas (e os componentes de cada uma) estão pela
+        ordem de `nomes`.
+        """
+
+        componentes = sorted(self.componentes(),key=lambda c: self.posicao[c[0]])
+        compDe = {n: i for i,comp in enumerate(componentes) for n in comp}
+        antes = {i: set() for i in range(len(componentes))}
+        for i,comp in enumerate(componentes):
+            for n in comp:
+                for d in self.arestas[n]:
+                    j = compDe.get(d)
+                    if j is not None and j != i:
+                        antes[j].add(i)
+
+        camadaDe = {}
+        def camada(i):
+            if i not in camadaDe:
+                camadaDe[i] = 1 + max((camada(j) for j in antes[i]),default=-1)
+            return camadaDe[i]
+
+        camadas = []
+        for i,comp in enumerate(componentes):
+            c = camada(i)
+            while len(camadas) <= c:
+                camadas.append([])
+            camadas[c].append(comp)
+        return camadas
+
+
+    def ordemCorrecoes(self):
+        """
+        Ordem pela qual as correções devem ser aplicadas: camada
+        a camada e, em cada componente, pela ordem de `nomes`.
+        """
+        return [n for camada in self.camadas() for comp in camada for n in comp]
+
+
+    def corrigir(self,motor,errosInv,invs,alteracoes):
+        """
+        Aplica as correções automáticas às falhas em `errosInv`
+        ({"rel_2_inv_12": [ErroInv]}), pela `ordemCorrecoes`.
+        """
+        ordem = [n for n in self.ordemCorrecoes() if n in errosInv]
+        etapa = Etapa("correcoes",len(ordem))
+        for nome in ordem:
+            invariantes[nome].correcao(motor,errosInv[nome],invs,alteracoes)
+            etapa.avancar(f"Correção do invariante {nome} aplicada",invariante=nome,falhas=len(errosInv[nome]))
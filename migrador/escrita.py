@@ -0,0 +1,168 @@
+import re
+from rdflib import Graph, Literal, RDF, RDFS, OWL, XSD
+from rdflib.compare import to_canonical_graph
+
+# Nomes locais que podem ser escritos com prefixo (":c100.10.001")
+nomeLocal = re.compile(r'[A-Za-z0-9_](?:[A-Za-z0-9_.\-]*[A-Za-z0-9_\-])?')
+
+# Escape dos literais: \, ", mudanças de linha e restantes caracteres de controlo
+escapeLiteral = {c: f"\\u{c:04X}" for c in range(0x20)}
+escapeLiteral.update({
+    ord("\\"): "\\\\",
+    ord('"'): '\\"',
+    ord("\n"): "\\n",
+    ord("\r"): "\\r",
+    ord("\t"): "\\t"
+})
+
+# Primeira linha dos ficheiros escritos pelo EscritorTurtle
+MARCA = "# migrador: um triplo por linha\n"
+
+
+class EscritorTurtle:
+    """
+    Escrita de triplos em Turtle diretamente para o ficheiro
+    `caminho`, à medida que são acrescentados, sem construir um
+    `Graph` do rdflib. Tem o mesmo `add` que o `Graph`, com os
+    termos do rdflib (`URIRef` e `Literal`).
+
+    Cada triplo é escrito numa linha ("s p o ."), sem agrupar
+    os sujeitos e com os literais sempre numa só linha (ver
+    `ntriplos`), por isso a memória usada não depende do número
+    de triplos. Os triplos repetidos são escritos as vezes que
+    forem acrescentados, o que não muda o grafo.
+
+    Os `prefixos` ({"": ns, "dc": dc}) são declarados no início
+    do ficheiro, juntamente com os de rdf, rdfs, owl e xsd.
+
+    Entre `iniciarFragmento` e `terminarFragmento` os triplos são
+    também guardados em memória, e o texto escrito (o fragmento)
+    é devolvido no fim, para poder ser reaproveitado com `escrever`.
+    """
+
+    def __init__(self,caminho,prefixos={}):
+        self.ficheiro = open(caminho,"w",encoding="utf-8")
+        self.fragmento = None
+        self.prefixos = {"rdf": RDF._NS, "rdfs": RDFS._NS, "owl": OWL._NS, "xsd": XSD._NS}
+        self.prefixos.update(prefixos)
+        # Do mais longo para o mais curto, para escolher o mais específico
+        self.ordemPrefixos = sorted(self.prefixos.items(),key=lambda p: -len(p[1]))
+        self.predicados = {} # {URIRef: "rdf:type"}
+        self.ficheiro.write(MARCA)
+        for prefixo,uri in self.prefixos.items():
+            self.ficheiro.write(f"@prefix {prefixo}: <{uri}> .\n")
+        self.ficheiro.write("\n")
+
+
+    def termo(self,t):
+        """
+        Representação de `t` em Turtle.
+        """
+        if isinstance(t,Literal):
+            texto = f'"{str(t).translate(escapeLiteral)}"'
+            if t.language is not None:
+                return f"{texto}@{t.language}"
+            if t.datatype is not None:
+                return f"{texto}^^{self.termo(t.datatype)}"
+            return texto
+        for prefixo,uri in self.ordemPrefixos:
+            if t.startswith(uri):
+                local = t[len(uri):]
+                if nomeLocal.fullmatch(local):
+                    return f"{prefixo}:{local}"
+                break
+        return f"<{t}>"
+
+
+    def add(self,triplo):
+        s,p,o = triplo
+        pred = self.predicados.get(p)
+        if pred is None:
+            pred = "a" if p == RDF.type else self.termo(p)
+            self.predicados[p] = pred
+        linha = f"{self.termo(s)} {pred} {self.termo(o)} .\n"
+        self.ficheiro.write(linha)
+        if self.fragmento is not None:
+            self.fragmento.append(linha)
+
+
+    def escrever(self,texto):
+        """
+        Escreve `texto` (um fragmento já em Turtle) no ficheiro.
+        """
+        self.ficheiro.write(texto)
+
+
+    def iniciarFragmento(self):
+        self.fragmento = []
+
+
+    def terminarFragmento(self):
+        """
+        Devolve o texto escrito desde `iniciarFragmento`.
+        """
+        texto = "".join(self.fragmento)
+        self.fragmento = None
+        return texto
+
+
+    def fechar(self):
+        self.ficheiro.close()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self,*args):
+        self.fechar()
+
+
+def ntriplos(caminho):
+    """
+    Triplos do ficheiro Turtle `caminho` em N-Triples, uma
+    linha (terminada em "\\n") de cada vez.
+
+    Os ficheiros escritos pelo EscritorTurtle (que começam com
+    `MARCA`) já têm um triplo por linha, por isso basta expandir
+    os nomes com prefixo, linha a linha, sem carregar o ficheiro.
+    Os restantes (a ontologia base) são lidos com o rdflib e os
+    triplos são ordenados, com os nós em branco renomeados de forma
+    canónica, para que o resultado seja sempre o mesmo (o rdflib dá
+    nomes aleatórios aos nós em branco e não garante a ordem).
+    """
+
+    with open(caminho,encoding="utf-8") as f:
+        if f.readline() != MARCA:
+            g = Graph()
+            g.parse(caminho,format="turtle")
+            g = to_canonical_graph(g)
+            for linha in sorted(g.serialize(format="nt").splitlines()):
+                if linha.strip():
+                    yield linha + "\n"
+            return
+
+        prefixos = {"a": f"<{RDF.type}>"}
+        def expande(t):
+            if t.startswith("<"):
+                return t
+            if t == "a":
+                return prefixos["a"]
+            prefixo,local = t.split(":",1)
+            return f"<{prefixos[prefixo]}{local}>"
+
+        for linha in f:
+            if linha.startswith("@prefix"):
+                _,prefixo,uri,_ = linha.split()
+                prefixos[prefixo[:-1]] = uri[1:-1]
+                continue
+            if not linha.strip():
+                continue
+            s,p,o = linha[:-3].split(" ",2)
+            if o.startswith('"'):
+                fim = o.rindex('"') + 1
+                if o[fim:].startswith("^^"):
+                    o = o[:fim] + "^^" + expande(o[fim+2:])
+            else:
+                o = expande(o)
+            yield f"{expande(s)} {expande(p)} {o} .\n"
@@ -1,24 +1,182 @@
-from openpyxl import load_workbook
 from . import classe2 as c
 from . import tindice as ti
 from . import entidade as e
 from . import tipologia as tip
 from . import leg
+from . import contexto
+from . import decisao
+from . import leitura
+from . import report
+from . import identificadores
+from .leitura import openWorkbook
 from .report import Report
+from .catalogos import Catalogos
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import hashlib
+import logging
+import os
+from utils.cache_utils import DiskCache
+from utils.config_utils import DUMP_CATALOGS, EXTRACTION_WORKERS, SHEET_CACHE, CACHE_MAX_MB, DETERMINISTIC_IDS
+from utils.log_utils import PROC
+from utils.progresso_utils import Etapa
+from utils.path_utils import CACHE_DIR
+from utils.workspace_utils import Workspace, PADRAO
 
-def excel2json(rep: Report,filename):
+sheets = ['100_csv','150_csv','200_csv','250_csv','300_csv','350_csv','400_csv','450_csv','500_csv','550_csv','600_csv',
+            '650_csv','700_csv','710_csv','750_csv','800_csv','850_csv','900_csv','950_csv']
 
-    sheets = ['100_csv','150_csv','200_csv','250_csv','300_csv','350_csv','400_csv','450_csv','500_csv','550_csv','600_csv',
-                '650_csv','700_csv','710_csv','750_csv','800_csv','850_csv','900_csv','950_csv']
 
-    # Leitura do Excel
-    wb = load_workbook(filename)
+def processClasseSheet(filename,nome,cat: Catalogos,ws: Workspace = PADRAO):
+    """
+    Processa a folha de classes `nome` num processo à parte.
+    Cada processo abre o seu próprio workbook, recebe a sua
+    própria cópia dos catálogos e regista os erros num Report
+    privado, que é devolvido para ser junto ao Report principal.
+    """
+    rep = Report()
+    wb = openWorkbook(filename)
+    try:
+        c.processSheet(wb[nome], nome, rep, cat, ws)
+    finally:
+        wb.close()
+    return rep
 
-    ti.processSheet(wb['ti_csv'], 'ti_csv')
-    e.processSheet(wb['ent_sioe_csv'], rep)
-    tip.processSheet(wb['tip_ent_csv'], rep)
-    leg.processSheet(wb['leg_csv'], 'leg_csv',rep)
 
+def extractClasses(filename,nomes,cat: Catalogos,workers,ws: Workspace = PADRAO,etapa: Etapa = None):
+    """
+    Distribui as folhas das classes `nomes` por `workers` processos.
+    Devolve {folha: Report parcial}, os Reports são juntos ao Report
+    principal pela ordem fixa de `sheets`, por isso o resultado é
+    igual ao da extração em série. O progresso é registado na
+    `etapa` à medida que cada folha termina.
+    """
+    loggerProc = logging.getLogger(PROC)
+    workers = min(workers,len(nomes))
+    loggerProc.info(f"Extração das folhas das classes em paralelo ({workers} processos)")
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(processClasseSheet,filename,s,cat,ws): s for s in nomes}
+        parciais = {}
+        for f in as_completed(futures):
+            s = futures[f]
+            parciais[s] = f.result()
+            if etapa:
+                etapa.avancar(f"Folha {s} processada",folha=s)
+        return {s: parciais[s] for s in nomes}
+
+
+def versaoCodigo():
+    """
+    Hash do código de que depende a extração de uma folha de classes.
+    Faz parte da chave da cache, para que uma alteração ao código
+    invalide as entradas antigas.
+    """
+    h = hashlib.sha256()
+    for m in [c, contexto, decisao, leitura, report, identificadores]:
+        with open(m.__file__, "rb") as f:
+            h.update(f.read())
+    # O modo dos identificadores muda o resultado da extração
+    h.update(str(DETERMINISTIC_IDS).encode())
+    return h.hexdigest()
+
+
+def chavesFolhas(filename,cat: Catalogos):
+    """
+    Chave da cache de cada folha de classes: hash do conteúdo da
+    folha, dos catálogos e do código da extração.
+    """
+    base = cat.digest() + versaoCodigo()
+    hashes = leitura.hashFolhas(filename,sheets)
+    return {s: hashlib.sha256((base + hashes[s]).encode()).hexdigest() for s in sheets}
+
+
+def guardaFolha(cache: DiskCache,chave,nome,rep: Report,ws: Workspace = PADRAO):
+    """
+    Guarda na cache o JSON produzido para a folha `nome` e o
+    Report parcial com os erros encontrados na sua extração.
+    """
+    fnome = nome.split("_")[0]
+    with open(os.path.join(ws.filesDir,f"{fnome}.json"), "rb") as f:
+        cache.put(chave, {"json": f.read(), "rep": rep})
+
+
+def restauraFolha(entrada,nome,ws: Workspace = PADRAO):
+    """
+    Repõe no workspace `ws` o JSON de uma folha guardada na cache e
+    devolve o respetivo Report parcial.
+    """
+    fnome = nome.split("_")[0]
+    with open(os.path.join(ws.filesDir,f"{fnome}.json"), "wb") as f:
+        f.write(entrada["json"])
+    return entrada["rep"]
+
+
+def excel2json(rep: Report,filename,ws: Workspace = PADRAO,workers=EXTRACTION_WORKERS,dumpCatalogos=DUMP_CATALOGS,usarCache=SHEET_CACHE):
+    """
+    Extrai os dados do Excel `filename` para os ficheiros JSON
+    intermédios, no workspace `ws`. Devolve os catálogos construídos durante a
+    extração, para serem usados nas fases seguintes.
+
+    Com `usarCache`, as folhas das classes que não mudaram desde
+    uma migração anterior (mesmo conteúdo e mesmos catálogos) são
+    repostas a partir da cache em vez de serem processadas.
+    """
+    loggerProc = logging.getLogger(PROC)
+
+    # Leitura do Excel em modo streaming: as folhas são lidas
+    # linha a linha à medida que são processadas
+    wb = openWorkbook(filename)
+    cat = Catalogos()
+    # Report parcial de cada folha das classes
+    parciais = {}
+    cache = None
+    etapa = Etapa("folhas", 4 + len(sheets))
+
+    try:
+        ti.processSheet(wb['ti_csv'], 'ti_csv', ws)
+        etapa.avancar("Folha ti_csv processada",folha="ti_csv")
+        e.processSheet(wb['ent_sioe_csv'], rep, cat, ws)
+        etapa.avancar("Folha ent_sioe_csv processada",folha="ent_sioe_csv")
+        tip.processSheet(wb['tip_ent_csv'], rep, cat, ws)
+        etapa.avancar("Folha tip_ent_csv processada",folha="tip_ent_csv")
+        leg.processSheet(wb['leg_csv'], 'leg_csv',rep, cat, ws)
+        etapa.avancar("Folha leg_csv processada",folha="leg_csv")
+        if dumpCatalogos:
+            cat.dump(ws.filesDir)
+
+        if usarCache:
+            try:
+                chaves = chavesFolhas(filename,cat)
+                cache = DiskCache(os.path.join(CACHE_DIR,"folhas"), CACHE_MAX_MB * 1024 * 1024)
+            except Exception as err:
+                loggerProc.warning(f"Não foi possível calcular as chaves da cache das folhas, a cache não vai ser usada: {err}")
+        if cache:
+            for s in sheets:
+                entrada = cache.get(chaves[s])
+                if entrada is not None:
+                    parciais[s] = restauraFolha(entrada,s,ws)
+                    loggerProc.info(f"Folha {s} inalterada, reposta a partir da cache")
+                    etapa.avancar(f"Folha {s} reposta a partir da cache",folha=s)
+            loggerProc.info(f"Cache das folhas: {cache.hits} de {len(sheets)} folhas reaproveitadas")
+
+        pendentes = [s for s in sheets if s not in parciais]
+        # As folhas das classes só dependem dos catálogos,
+        # por isso podem ser processadas em paralelo
+        if workers <= 1 or len(pendentes) <= 1:
+            for s in pendentes:
+                parciais[s] = Report()
+                c.processSheet(wb[s], s, parciais[s], cat, ws)
+                etapa.avancar(f"Folha {s} processada",folha=s)
+    finally:
+        wb.close()
+
+    if workers > 1 and len(pendentes) > 1:
+        parciais.update(extractClasses(filename,pendentes,cat,workers,ws,etapa))
+
+    # Os Reports parciais são guardados na cache antes de serem
+    # juntos, porque o Report principal pode partilhar as suas listas
     for s in sheets:
-        c.processSheet(wb[s], s, rep)
+        if cache and s in pendentes:
+            guardaFolha(cache,chaves[s],s,parciais[s],ws)
+        rep.merge(parciais[s])
 
+    return cat
@@ -1,19 +1,40 @@
 import glob
+import hashlib
 import json
 import re
 import subprocess
-from nanoid import generate
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import date, datetime
-from rdflib import Graph, Namespace, Literal, RDF, RDFS, OWL, URIRef
+from rdflib import Namespace, Literal, RDF, RDFS, OWL, URIRef
 from rdflib.namespace import RDF,OWL
 import os
-from utils.path_utils import FILES_DIR, ONTOLOGY_DIR, OUTPUT_DIR
+from utils.path_utils import CACHE_DIR
+from utils.workspace_utils import Workspace, PADRAO
+from utils.cache_utils import DiskCache
+from utils.config_utils import TTL_CACHE, CACHE_MAX_MB, ZIP_LEVEL, KEEP_FINAL_OUTPUT, OUTPUT_FORMAT
 from utils.log_utils import GEN
+from utils.progresso_utils import Etapa
+from .catalogos import Catalogos
+from .hierarquia import Hierarquia
+from .termos import IndiceTermos
+from . import escrita
+from .escrita import EscritorTurtle, ntriplos
+from .identificadores import Identificadores
 import logging
 import zipfile
 
 logger = logging.getLogger(GEN)
 
+# Tamanho dos blocos copiados para a ontologia final (ver `juntaTTL`)
+TAMANHO_BLOCO = 1024 * 1024
+
+# Número de linhas de cada bloco escrito nos shards N-Triples
+LINHAS_BLOCO = 10000
+
+# Formatos da ontologia final (ver `genFinalOntology`)
+FORMATOS = ("ttl", "nt")
+
 ns = Namespace("http://jcr.di.uminho.pt/m51-clav#")
 dc = Namespace("http://purl.org/dc/elements/1.1/")
 uri_ontologia = URIRef("http://jcr.di.uminho.pt/m51-clav")
@@ -25,17 +46,16 @@ dataAtualizacao = agora.strftime("%Y-%m-%d")
 
 # --- Migra os termos de índice ------------------------
 # ------------------------------------------------------
-def tiGenTTL(termosIndice):
+def tiGenTTL(termosIndice: IndiceTermos,ws: Workspace = PADRAO):
 
     logger.info("Geração da ontologia dos termos índice")
 
-    g = Graph()
-    g.bind("", ns)
-    g.bind("dc", dc)
+    g = EscritorTurtle(os.path.join(ws.ontologyDir,"ti.ttl"),{"": ns, "dc": dc})
     g.add((uri_ontologia, dc.date, Literal(dataAtualizacao)))
 
-    for ti in termosIndice:
-        ticod = "ti_" + ti['codigo'] + '_' + generate('abcdef', 6)
+    ids = Identificadores()
+    for i,ti in enumerate(termosIndice):
+        ticod = ids.gerar("ti_" + ti['codigo'] + '_', 'abcdef', 6, ti['codigo'], i, ti['termo'])
         tiUri = ns[ticod]
         g.add((tiUri,RDF.type, OWL.NamedIndividual))
         g.add((tiUri,RDF.type, ns.TermoIndice))
@@ -44,20 +64,19 @@ def tiGenTTL(termosIndice):
         g.add((tiUri, ns.estado, Literal("Ativo")))
         g.add((tiUri, ns.termo, Literal(ti['termo'])))
 
-    g.serialize(format="ttl",destination=os.path.join(ONTOLOGY_DIR,"ti.ttl"))
+    g.fechar()
     logger.info("Geração da ontologia dos termos índice terminada")
 
 
 # --- Migra a legislação -------------------------------
 # ------------------------------------------------------
-def legGenTTL():
+def legGenTTL(ws: Workspace = PADRAO):
 
     logger.info("Geração da ontologia da legislação")
-    fin = open(os.path.join(FILES_DIR,"leg.json"))
+    fin = open(os.path.join(ws.filesDir,"leg.json"))
     leg = json.load(fin)
 
-    g = Graph()
-    g.bind("", ns)
+    g = EscritorTurtle(os.path.join(ws.ontologyDir,"leg.ttl"),{"": ns})
 
     for l in leg:
         cod = l['codigo']
@@ -83,20 +102,19 @@ def legGenTTL():
         g.add((lUri,ns.diplomaLink,Literal(l['link'])))
 
     fin.close()
-    g.serialize(format="ttl",destination=os.path.join(ONTOLOGY_DIR,"leg.ttl"))
+    g.fechar()
     logger.info("Geração da ontologia da legislação terminada")
 
 
 # --- Migra as tipologias ------------------------------
 # ------------------------------------------------------
-def tipologiaGenTTL():
+def tipologiaGenTTL(ws: Workspace = PADRAO):
 
     logger.info("Geração da ontologia da tipologia")
-    fin = open(os.path.join(FILES_DIR,"tip.json"))
+    fin = open(os.path.join(ws.filesDir,"tip.json"))
     tipologias = json.load(fin)
 
-    g = Graph()
-    g.bind("", ns)
+    g = EscritorTurtle(os.path.join(ws.ontologyDir,"tip.ttl"),{"": ns})
 
     for t in tipologias:
         sigla = t['sigla']
@@ -110,20 +128,19 @@ def tipologiaGenTTL():
             g.add((tUri,ns.tipDesignacao, Literal(t['designacao'])))
 
     fin.close()
-    g.serialize(format="ttl",destination=os.path.join(ONTOLOGY_DIR,"tip.ttl"))
+    g.fechar()
     logger.info("Geração da ontologia da tipologia terminada")
 
 
 # --- Migra as entidades -------------------------------
 # ------------------------------------------------------
-def entidadeGenTTL():
+def entidadeGenTTL(ws: Workspace = PADRAO):
 
     logger.info("Geração da ontologia das entidades")
-    fin = open(os.path.join(FILES_DIR,"ent.json"))
+    fin = open(os.path.join(ws.filesDir,"ent.json"))
     entidades = json.load(fin)
 
-    g = Graph()
-    g.bind("", ns)
+    g = EscritorTurtle(os.path.join(ws.ontologyDir,"ent.ttl"),{"": ns})
 
     for e in entidades:
         sigla = e['sigla']
@@ -154,32 +171,91 @@ def entidadeGenTTL():
                 g.add((ns[f"ent_{sigla}"],ns.pertenceTipologiaEnt,ns[f"tip_{tip}"]))
 
     fin.close()
-    g.serialize(format="ttl",destination=os.path.join(ONTOLOGY_DIR,"ent.ttl"))
+    g.fechar()
     logger.info("Geração da ontologia das entidades terminada")
 
 
 # --- Migra uma classe ---------------------------------
 # ------------------------------------------------------
-def classeGenTTL(clN1,classes):
+def versaoCodigo():
+    """
+    Hash do código de que dependem os triplos de uma classe.
+    Faz parte da chave da cache dos fragmentos, para que uma
+    alteração ao código invalide as entradas antigas.
+    """
+    global versao
+    if versao is None:
+        h = hashlib.sha256()
+        for m in [__file__, escrita.__file__]:
+            with open(m, "rb") as f:
+                h.update(f.read())
+        versao = h.hexdigest()
+    return versao
+
+versao = None
+
+
+def chaveFragmento(cod,classe,pai,entCatalog,legCatalog):
+    """
+    Chave do fragmento de ttl da classe `cod` na cache: hash do
+    registo da classe, do seu pai e da pertença aos catálogos das
+    entidades e legislação que referencia, que são os únicos dados
+    de que os seus triplos dependem.
+    """
+    refs = [d in entCatalog for d in classe.get('donos') or []]
+    refs += [p['id'] in entCatalog for p in classe.get('participantes') or []]
+    refs += [l in legCatalog for l in classe.get('legislacao') or []]
+    dados = json.dumps([cod,pai,refs,classe],sort_keys=True,ensure_ascii=False,default=str)
+    return hashlib.sha256((versaoCodigo() + dados).encode("utf-8")).hexdigest()
+
+
+def classeGenTTL(clN1,classes,cat: Catalogos,hier: Hierarquia = None,usarCache=TTL_CACHE,ws: Workspace = PADRAO):
+    """
+    Gera o ficheiro ttl da classe de nível 1 `clN1`, com
+    os triplos das suas classes (`classes`).
+
+    Com `usarCache`, os triplos de cada classe (o seu fragmento
+    de ttl) são guardados numa cache em CACHE_DIR, indexada
+    pelo hash do que os determina (`chaveFragmento`). As classes
+    que não mudaram desde uma migração anterior são copiadas
+    da cache em vez de serem geradas de novo.
+
+    Devolve o número de classes repostas a partir da cache.
+    """
 
     logger.info(f"Geração da ontologia da classe {clN1}")
 
-    # Carregam-se os catálogos
+    # Catálogos
     # --------------------------------------------------
-    ecatalog = open(os.path.join(FILES_DIR,"entCatalog.json"))
-    lcatalog = open(os.path.join(FILES_DIR,"legCatalog.json"))
-    entCatalog = json.load(ecatalog)
-    legCatalog = json.load(lcatalog)
+    entCatalog = cat.entidades
+    legCatalog = cat.legislacao
+
+    if hier is None:
+        hier = Hierarquia(classes)
+
+    cache = None
+    if usarCache:
+        try:
+            cache = DiskCache(os.path.join(CACHE_DIR,"ttl"), CACHE_MAX_MB * 1024 * 1024)
+        except Exception as err:
+            logger.warning(f"Não foi possível abrir a cache dos fragmentos de ttl, a cache não vai ser usada: {err}")
 
     # Correspondência de intervenções e relações
     intervCatalog = {'Apreciar': 'temParticipanteApreciador','Assessorar': 'temParticipanteAssessor',
                     'Comunicar': 'temParticipanteComunicador','Decidir': 'temParticipanteDecisor',
                     'Executar': 'temParticipanteExecutor','Iniciar': 'temParticipanteIniciador'}
 
-    g = Graph()
-    g.bind("", ns)
+    g = EscritorTurtle(os.path.join(ws.ontologyDir,f"{clN1}.ttl"),{"": ns})
 
     for cod,classe in classes.items():
+        if cache:
+            chave = chaveFragmento(cod,classe,hier.pai(cod),entCatalog,legCatalog)
+            fragmento = cache.get(chave)
+            if fragmento is not None:
+                g.escrever(fragmento)
+                continue
+            g.iniciarFragmento()
+
         # codigo, estado, nível e título
         codigoUri = ns[f"c{cod}"]
         g.add((codigoUri,RDF.type, OWL.NamedIndividual))
@@ -193,8 +269,7 @@ def classeGenTTL(clN1,classes):
             g.add((codigoUri,ns.pertenceLC, ns.lc1))
             g.add((codigoUri,ns.temPai, ns.lc1))
         elif classe['nivel'] in [2,3,4]:
-            partes = cod.split('.')
-            pai = '.'.join(partes[0:-1])
+            pai = hier.pai(cod)
             g.add((codigoUri,ns.pertenceLC, ns.lc1))
             g.add((codigoUri,ns.temPai, ns[f"c{pai}"]))
 
@@ -401,42 +476,247 @@ def classeGenTTL(clN1,classes):
                         for ref in crit['procRefs']:
                             g.add((critUri,ns.critTemProcRel,ns[f"c{ref}"]))
 
-    ecatalog.close()
-    lcatalog.close()
+        if cache:
+            cache.put(chave,g.terminarFragmento(),evict=False)
 
-    g.serialize(format="ttl",destination=os.path.join(ONTOLOGY_DIR,f"{clN1}.ttl"))
+    g.fechar()
+    hits = 0
+    if cache:
+        cache.evict()
+        hits = cache.hits
+        logger.info(f"Cache dos fragmentos da classe {clN1}: {hits} de {len(classes)} classes reaproveitadas")
     logger.info(f"Geração da ontologia da classe {clN1} terminada")
+    return hits
+
+
+# --- Geração das ontologias intermédias ---------------
+# ------------------------------------------------------
+def executaTarefa(funcao,args):
+    """
+    Executa uma tarefa de geração e devolve o tempo que
+    demorou (em segundos) e o resultado da tarefa.
+    """
+    inicio = time.perf_counter()
+    res = funcao(*args)
+    return time.perf_counter() - inicio, res
+
+
+def genOntologias(termosIndice: IndiceTermos,finalClasses,cat: Catalogos,hier: Hierarquia,workers=1,ws: Workspace = PADRAO):
+    """
+    Gera os ficheiros ttl intermédios no workspace `ws`: os dos
+    catálogos (ti, ent, tip e leg) e um por cada classe de nível 1
+    de `finalClasses` ({"100": {cod: classe}}).
+
+    Os ficheiros são independentes, por isso com `workers` > 1 são
+    gerados em paralelo, por vários processos, começando pelas
+    classes com mais processos. Nesse caso a `Hierarquia` de cada
+    classe é construída no próprio processo, a partir das suas
+    classes, para não ter de ser enviada.
+
+    No fim é registada a taxa de acertos da cache dos fragmentos
+    de ttl das classes (ver `classeGenTTL`).
+
+    Devolve o tempo de geração de cada ficheiro ({"100": segundos}).
+    Se a geração de algum ficheiro falhar, o erro é registado e
+    propagado.
+    """
+
+    tarefas = [
+        ("ti",tiGenTTL,(termosIndice,ws)),
+        ("ent",entidadeGenTTL,(ws,)),
+        ("tip",tipologiaGenTTL,(ws,)),
+        ("leg",legGenTTL,(ws,))
+    ]
+    for clN1,procs in finalClasses.items():
+        tarefas.append((clN1,classeGenTTL,(clN1,procs,cat,hier if workers <= 1 else None,TTL_CACHE,ws)))
+
+    tempos = {}
+    resultados = {}
+    etapa = Etapa("ontologias",len(tarefas))
+    workers = min(workers,len(tarefas))
+    if workers > 1:
+        logger.info(f"Geração dos ficheiros de ontologia em paralelo ({workers} processos)")
+        # As tarefas maiores são submetidas primeiro
+        porTamanho = sorted(tarefas,key=lambda t: -len(finalClasses.get(t[0],())))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(executaTarefa,funcao,args): nome for nome,funcao,args in porTamanho}
+            for f in as_completed(futures):
+                nome = futures[f]
+                try:
+                    tempos[nome],resultados[nome] = f.result()
+                except Exception:
+                    logger.error(f"Falha na geração da ontologia {nome}")
+                    for f in futures:
+                        f.cancel()
+                    raise
+                etapa.avancar(f"Ontologia {nome} gerada",ontologia=nome)
+    else:
+        for nome,funcao,args in tarefas:
+            try:
+                tempos[nome],resultados[nome] = executaTarefa(funcao,args)
+            except Exception:
+                logger.error(f"Falha na geração da ontologia {nome}")
+                raise
+            etapa.avancar(f"Ontologia {nome} gerada",ontologia=nome)
+
+    tempos = {nome: tempos[nome] for nome,_,_ in tarefas}
+    for nome,t in tempos.items():
+        logger.info(f"Ontologia {nome} gerada em {t:.2f}s")
+
+    if TTL_CACHE:
+        total = sum(len(procs) for procs in finalClasses.values())
+        hits = sum(resultados[clN1] for clN1 in finalClasses)
+        taxa = 100 * hits / total if total else 0
+        logger.info(f"Cache dos fragmentos de ttl: {hits} de {total} classes reaproveitadas ({taxa:.1f}%)")
+    return tempos
 
 
 # --- Geração da ontologia final -----------------------
 # ------------------------------------------------------
-def genFinalOntology():
+def juntaTTL(zipf,ontFiles,nome,copia=None,etapa: Etapa = None):
+    """
+    Escreve a concatenação dos ficheiros `ontFiles` na entrada `nome`
+    do zip e, se for dado, no ficheiro `copia`.
+    """
+    with zipf.open(nome, 'w', force_zip64=True) as entrada:
+        destinos = [entrada]
+        if copia:
+            destinos.append(open(copia, 'wb'))
+        try:
+            for file_path in ontFiles:
+                with open(file_path, 'rb') as infile:
+                    while bloco := infile.read(TAMANHO_BLOCO):
+                        for d in destinos:
+                            d.write(bloco)
+                for d in destinos:
+                    d.write(b'\n')
+                if etapa:
+                    etapa.avancar(f"Ficheiro {os.path.basename(file_path)} comprimido",ficheiro=os.path.basename(file_path))
+        finally:
+            for d in destinos[1:]:
+                d.close()
+
+
+def shardsNT(zipf,ontFiles,dirZip,copia=None,etapa: Etapa = None):
+    """
+    Escreve cada ficheiro de `ontFiles` em N-Triples, como um shard
+    próprio (`<dirZip>/<nome>.nt`) do zip e, se for dada, da diretoria
+    `copia`, juntamente com um `manifest.json` com o número de triplos,
+    o tamanho e o sha256 de cada shard.
+
+    Os ficheiros intermédios podem ter o mesmo triplo escrito mais do
+    que uma vez (por exemplo, uma relação de um processo consigo
+    próprio), por isso as linhas repetidas de cada shard são
+    descartadas: cada shard tem os triplos distintos do seu grafo e
+    o número de triplos do manifesto é o tamanho desse grafo.
+
+    Devolve o manifesto.
+    """
+
+    manifesto = {"formato": "nt", "shards": []}
+    if copia:
+        os.makedirs(copia, exist_ok=True)
+
+    for file_path in ontFiles:
+        nome = os.path.splitext(os.path.basename(file_path))[0]
+        ficheiro = f"{nome}.nt"
+        h = hashlib.sha256()
+        triplos = 0
+        tamanho = 0
+        with zipf.open(f"{dirZip}/{ficheiro}", 'w', force_zip64=True) as entrada:
+            destinos = [entrada]
+            if copia:
+                destinos.append(open(os.path.join(copia, ficheiro), 'wb'))
+            try:
+                bloco = []
+                vistas = set()
+                for linha in ntriplos(file_path):
+                    if linha in vistas:
+                        continue
+                    vistas.add(linha)
+                    bloco.append(linha)
+                    triplos += 1
+                    if len(bloco) == LINHAS_BLOCO:
+                        tamanho += escreveBloco(bloco, destinos, h)
+                        bloco = []
+                tamanho += escreveBloco(bloco, destinos, h)
+            finally:
+                for d in destinos[1:]:
+                    d.close()
+
+        manifesto["shards"].append({
+            "shard": nome,
+            "ficheiro": ficheiro,
+            "triplos": triplos,
+            "bytes": tamanho,
+            "sha256": h.hexdigest()
+        })
+        logger.info(f"Shard {ficheiro}: {triplos} triplos")
+        if etapa:
+            etapa.avancar(f"Shard {ficheiro} comprimido: {triplos} triplos",ficheiro=ficheiro,triplos=triplos)
+
+    dados = json.dumps(manifesto, indent=2, ensure_ascii=False).encode("utf-8")
+    zipf.writestr(f"{dirZip}/manifest.json", dados)
+    if copia:
+        with open(os.path.join(copia, "manifest.json"), 'wb') as f:
+            f.write(dados)
+    return manifesto
+
+
+def escreveBloco(linhas,destinos,h):
+    dados = "".join(linhas).encode("utf-8")
+    h.update(dados)
+    for d in destinos:
+        d.write(dados)
+    return len(dados)
+
+
+def genFinalOntology(formato=OUTPUT_FORMAT,nivelCompressao=ZIP_LEVEL,copia=KEEP_FINAL_OUTPUT,ws: Workspace = PADRAO):
+    """
+    Junta os ficheiros ttl intermédios do workspace `ws` na ontologia
+    final, comprimida num zip na sua diretoria de output
+    (`CLAV_<timestamp>.zip`).
+    O `formato` (ver `FORMATOS`) pode ser:
+
+    * "ttl": um só ficheiro Turtle, `CLAV_<timestamp>.ttl`;
+    * "nt": a diretoria `CLAV_<timestamp>/`, com um ficheiro N-Triples
+      por classe de nível 1 e por catálogo, que podem ser carregados
+      em paralelo, e um `manifest.json` (ver `shardsNT`).
+
+    Os ficheiros intermédios são copiados por blocos de tamanho fixo
+    diretamente para o zip, sem passar por um ficheiro intermédio,
+    por isso a memória usada não depende do tamanho da ontologia.
+    Com `copia` é também escrita, na mesma passagem, a ontologia
+    não comprimida.
+
+    Devolve o nome do ficheiro zip.
+    """
+
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato da ontologia final desconhecido: {formato}")
 
     now = datetime.now()
     timestamp = now.strftime("%Y-%m-%d_%H-%M-%S")
-    outputFile = os.path.join(OUTPUT_DIR, f"CLAV_{timestamp}.ttl")
-    zipedOutputFile = os.path.join(OUTPUT_DIR, f"CLAV_{timestamp}.zip")
-
-    # Concatenação dos ficheiros intermédios num só
-    logger.info("Concatenação dos ficheiros ttl intermédios num só")
-    try:
-        ontFiles = sorted(glob.glob(os.path.join(ONTOLOGY_DIR, "*.ttl")))
-        with open(outputFile, 'w', encoding='utf-8') as outfile:
-            for file_path in ontFiles:
-                with open(file_path) as infile:
-                    outfile.write(infile.read())
-                    outfile.write('\n')
-    except Exception:
-        logger.error(f"Falha na concatenação da ontologia")
-        raise
+    nome = f"CLAV_{timestamp}"
+    zipedOutputFile = os.path.join(ws.outputDir, f"{nome}.zip")
 
-    # Compressão da ontologia final
+    logger.info(f"Concatenação e compressão dos ficheiros ttl intermédios (formato {formato})")
     try:
-        with zipfile.ZipFile(zipedOutputFile, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            zipf.write(outputFile, os.path.basename(outputFile))
+        ontFiles = sorted(glob.glob(os.path.join(ws.ontologyDir, "*.ttl")))
+        etapa = Etapa("ontologia final", len(ontFiles))
+        with zipfile.ZipFile(zipedOutputFile, 'w', zipfile.ZIP_DEFLATED, compresslevel=nivelCompressao) as zipf:
+            if formato == "ttl":
+                outputFile = os.path.join(ws.outputDir, f"{nome}.ttl")
+                juntaTTL(zipf, ontFiles, f"{nome}.ttl", outputFile if copia else None, etapa)
+            else:
+                outputFile = os.path.join(ws.outputDir, nome)
+                shardsNT(zipf, ontFiles, nome, outputFile if copia else None, etapa)
         logger.info(f"Ontologia comprimida em {zipedOutputFile}")
     except Exception:
-        logger.error(f"Falha na compressão")
+        logger.error(f"Falha na concatenação e compressão da ontologia")
         raise
 
+    if copia:
+        logger.info(f"Ontologia não comprimida em {outputFile}")
+
     return os.path.basename(zipedOutputFile)
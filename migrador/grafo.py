@@ -0,0 +1,134 @@
+class GrafoRelacoes:
+    """
+    Grafo das relações entre processos (zona de contexto), indexado
+    por tipo de relação (`eSinteseDe`, `eComplementarDe`, ...).
+
+    Cada classe declara as suas relações em duas listas paralelas,
+    `processosRelacionados` e `proRel`. O grafo é construído uma única
+    vez a partir desses pares (com a semântica de `zip`, tal como eram
+    lidos pelos invariantes) e mantém:
+
+    * as relações de cada classe pela ordem em que foram declaradas;
+    * as adjacências diretas e inversas por tipo de relação;
+    * o conjunto das arestas, para verificar em O(1) se uma relação existe.
+
+    Sempre que uma relação é acrescentada a uma classe depois de o
+    grafo ter sido construído, deve ser registada com `adicionar`.
+    """
+
+    def __init__(self,allClasses=None):
+        self.ordem = {} # {"100.10.001": [("100.10.002","eSinteseDe"),...]}
+        self.saida = {} # {"100.10.001": {"eSinteseDe": ["100.10.002"]}}
+        self.entrada = {} # {"100.10.002": {"eSinteseDe": ["100.10.001"]}}
+        self.arestas = set() # {("100.10.001","eSinteseDe","100.10.002")}
+        if allClasses:
+            for cod,classe in allClasses.items():
+                proRelCods = classe.get("processosRelacionados")
+                proRels = classe.get("proRel")
+                if proRelCods and proRels:
+                    for c,r in zip(proRelCods,proRels):
+                        self.adicionar(cod,r,c)
+
+
+    def adicionar(self,cod,rel,proc):
+        """
+        Regista a relação "`cod` `rel` `proc`".
+        """
+        self.ordem.setdefault(cod,[]).append((proc,rel))
+        self.saida.setdefault(cod,{}).setdefault(rel,[]).append(proc)
+        self.entrada.setdefault(proc,{}).setdefault(rel,[]).append(cod)
+        self.arestas.add((cod,rel,proc))
+
+
+    def relacoes(self,cod,*tipos):
+        """
+        Pares (processo, relação) declarados por `cod`, pela ordem
+        de declaração. Se forem dados `tipos`, só são devolvidas
+        as relações desses tipos.
+        """
+        rels = self.ordem.get(cod,[])
+        if tipos:
+            return [(c,r) for c,r in rels if r in tipos]
+        return rels
+
+
+    def destinos(self,cod,*tipos):
+        """
+        Processos com os quais `cod` tem uma relação de um dos `tipos`,
+        pela ordem de declaração.
+        """
+        if len(tipos) == 1:
+            return self.saida.get(cod,{}).get(tipos[0],[])
+        return [c for c,_ in self.relacoes(cod,*tipos)]
+
+
+    def origens(self,cod,rel):
+        """
+        Processos que declaram a relação `rel` com `cod`.
+        """
+        return self.entrada.get(cod,{}).get(rel,[])
+
+
+    def temRelacao(self,cod,rel,proc):
+        return (cod,rel,proc) in self.arestas
+
+
+    def vizinhos(self,cod):
+        """
+        Processos relacionados com `cod`, em qualquer sentido
+        e por qualquer tipo de relação.
+        """
+        viz = {c for c,_ in self.relacoes(cod)}
+        for origens in self.entrada.get(cod,{}).values():
+            viz.update(origens)
+        return viz
+
+
+class GrafoSobreposto:
+    """
+    Vista de um `GrafoRelacoes` (`base`) com relações provisórias
+    acrescentadas por cima, sem alterar o grafo original. Tem a
+    mesma interface de consulta que o `GrafoRelacoes`: as relações
+    provisórias aparecem depois das que já existiam, tal como se
+    tivessem sido acrescentadas no fim das listas da classe.
+    """
+
+    def __init__(self,base: GrafoRelacoes):
+        self.base = base
+        self.novas = GrafoRelacoes()
+
+
+    def adicionar(self,cod,rel,proc):
+        self.novas.adicionar(cod,rel,proc)
+
+
+    def limpar(self):
+        """
+        Descarta as relações provisórias.
+        """
+        self.novas = GrafoRelacoes()
+
+
+    def relacoes(self,cod,*tipos):
+        novas = self.novas.relacoes(cod,*tipos)
+        if novas:
+            return self.base.relacoes(cod,*tipos) + novas
+        return self.base.relacoes(cod,*tipos)
+
+
+    def destinos(self,cod,*tipos):
+        novas = self.novas.destinos(cod,*tipos)
+        if novas:
+            return self.base.destinos(cod,*tipos) + novas
+        return self.base.destinos(cod,*tipos)
+
+
+    def origens(self,cod,rel):
+        novas = self.novas.origens(cod,rel)
+        if novas:
+            return self.base.origens(cod,rel) + novas
+        return self.base.origens(cod,rel)
+
+
+    def temRelacao(self,cod,rel,proc):
+        return self.base.temRelacao(cod,rel,proc) or self.novas.temRelacao(cod,rel,proc)
@@ -0,0 +1,81 @@
+class Hierarquia:
+    """
+    Índice da hierarquia das classes, construído a partir dos
+    seus códigos ("100", "100.10", "100.10.001", "100.10.001.01").
+
+    O pai de uma classe é o código sem o último segmento e os
+    descendentes de um código são todos os códigos que começam
+    por `cod + "."`. Os mapas são preenchidos numa só passagem
+    pelos códigos (`adicionar`), por isso as consultas de pai,
+    filhos, descendentes e ancestrais são O(1).
+
+    As listas de filhos e descendentes mantêm a ordem pela qual
+    os códigos foram adicionados. Os códigos intermédios não têm
+    de existir: "100.10.001.01" é descendente de "100.10" mesmo
+    que "100.10.001" não tenha sido declarado.
+    """
+
+    def __init__(self,cods=()):
+        self.paiDe = {} # {"100.10.001.01": "100.10.001"}
+        self.ancestraisDe = {} # {"100.10.001.01": ["100.10.001","100.10","100"]}
+        self.filhosDe = {} # {"100.10.001": ["100.10.001.01","100.10.001.02"]}
+        self.descendentesDe = {} # {"100.10": ["100.10.001","100.10.001.01",...]}
+        for cod in cods:
+            self.adicionar(cod)
+
+
+    def adicionar(self,cod):
+        if cod in self.paiDe:
+            return
+
+        ancestrais = []
+        pos = cod.rfind('.')
+        while pos != -1:
+            ancestral = cod[:pos]
+            ancestrais.append(ancestral)
+            self.descendentesDe.setdefault(ancestral,[]).append(cod)
+            pos = cod.rfind('.',0,pos)
+
+        self.ancestraisDe[cod] = ancestrais
+        if ancestrais:
+            self.paiDe[cod] = ancestrais[0]
+            self.filhosDe.setdefault(ancestrais[0],[]).append(cod)
+        else:
+            self.paiDe[cod] = None
+
+
+    def __contains__(self,cod):
+        return cod in self.paiDe
+
+
+    def pai(self,cod):
+        """
+        Código do pai de `cod` (None se for uma classe de nível 1).
+        """
+        if cod in self.paiDe:
+            return self.paiDe[cod]
+        pos = cod.rfind('.')
+        return cod[:pos] if pos != -1 else None
+
+
+    def filhos(self,cod):
+        """
+        Filhos diretos de `cod`.
+        """
+        return self.filhosDe.get(cod,[])
+
+
+    def descendentes(self,cod):
+        """
+        Todos os códigos abaixo de `cod` (`c.startswith(cod + ".")`).
+        """
+        return self.descendentesDe.get(cod,[])
+
+
+    def ancestrais(self,cod):
+        """
+        Ancestrais de `cod`, do pai até ao nível 1.
+        """
+        if cod in self.ancestraisDe:
+            return self.ancestraisDe[cod]
+        return Hierarquia([cod]).ancestraisDe[cod]
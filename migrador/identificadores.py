@@ -0,0 +1,58 @@
+import hashlib
+import logging
+from nanoid import generate
+from utils.config_utils import DETERMINISTIC_IDS
+from utils.log_utils import PROC
+
+logger = logging.getLogger(PROC)
+
+
+class Identificadores:
+    """
+    Geração dos sufixos aleatórios dos identificadores das notas,
+    dos exemplos de notas de aplicação e dos termos de índice
+    ("nota_100.10.001_3f9a0c1b2d4e").
+
+    Com `DETERMINISTIC_IDS` o sufixo é derivado de um hash das
+    `partes` que identificam o elemento (código da classe, posição,
+    conteúdo, ...), por isso a mesma entrada dá sempre os mesmos
+    identificadores. Caso contrário é gerado com o `nanoid`.
+
+    Os identificadores já gerados são guardados para detetar
+    colisões: se um sufixo já tiver sido usado é gerado outro
+    (de forma determinística, se for o caso) e a colisão é
+    registada no log.
+    """
+
+    def __init__(self,deterministico=None):
+        self.deterministico = DETERMINISTIC_IDS if deterministico is None else deterministico
+        self.usados = set()
+        self.colisoes = 0
+
+
+    def sufixo(self,alfabeto,tamanho,partes,tentativa):
+        if not self.deterministico:
+            return generate(alfabeto,tamanho)
+        h = hashlib.sha256("\x1f".join(map(str,partes + [tentativa])).encode()).digest()
+        n = int.from_bytes(h,"big")
+        res = []
+        for _ in range(tamanho):
+            n,i = divmod(n,len(alfabeto))
+            res.append(alfabeto[i])
+        return "".join(res)
+
+
+    def gerar(self,prefixo,alfabeto,tamanho,*partes):
+        """
+        Identificador `prefixo` + sufixo de `tamanho` caracteres
+        de `alfabeto`, único entre os gerados por esta instância.
+        """
+        tentativa = 0
+        ident = prefixo + self.sufixo(alfabeto,tamanho,list(partes),tentativa)
+        while ident in self.usados:
+            self.colisoes += 1
+            logger.warning(f"Colisão no identificador {ident}, foi gerado um novo")
+            tentativa += 1
+            ident = prefixo + self.sufixo(alfabeto,tamanho,list(partes),tentativa)
+        self.usados.add(ident)
+        return ident
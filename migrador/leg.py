@@ -1,63 +1,60 @@
-from itertools import islice
 import logging
 import pandas as pd
 import json
 from datetime import datetime
 import re
 import os
-from utils.path_utils import FILES_DIR
+from utils.workspace_utils import Workspace, PADRAO
 from utils.log_utils import PROC
+from .leitura import iterRows, limpaTexto, limpaLista
 from .report import Report
+from .catalogos import Catalogos
 
 brancos = re.compile(r'\r\n|\n|\r|[ \u202F\u00A0]+$|^[ \u202F\u00A0]+')
 sepExtra = re.compile(r'#$|^#')
 
-def processSheet(sheet, nome, rep: Report):
+# Normalização vetorizada de um bloco de linhas da folha
+def normaliza(df):
+    limpaTexto(df, "Tipo", (brancos, ''), (re.compile(r'[/ \u202F\u00A0()\-]+'), '_'))
+    limpaTexto(df, "Número", (brancos, ''), (re.compile(r'[/ \u202F\u00A0()\-\u2010]+'), '_'))
+    limpaLista(df, "Entidade", (brancos, ''), sep=',', descarta=('', 'NaT'), subsItem=[
+        (brancos, ''),
+        (re.compile(r'[/ \u202F\u00A0()]+'), '_')
+    ])
+    limpaTexto(df, "Sumário", (brancos, ''))
+    limpaTexto(df, "Fonte", (brancos, ''), lambda t: t.str.strip())
+    limpaTexto(df, "Link", (brancos, ''), lambda t: t.str.strip())
+
+def processSheet(sheet, nome, rep: Report, cat: Catalogos, ws: Workspace = PADRAO):
     loggerProc = logging.getLogger(PROC)
     loggerProc.info("# Migração do Catálogo Legislativo ---------------------------")
-    # Carregam-se os catálogos de entidades e tipologias
+    # Catálogos de entidades e tipologias
     # --------------------------------------------------
-    ecatalog = open(os.path.join(FILES_DIR, "entCatalog.json"))
-    tcatalog = open(os.path.join(FILES_DIR, "tipCatalog.json"))
-    entCatalog = json.load(ecatalog)
-    tipCatalog = json.load(tcatalog)
-    # Load one worksheet.
+    entCatalog = cat.entidades
+    tipCatalog = cat.tipologias
     fnome = nome.split("_")[0]
-    ws = sheet
-    data = ws.values
-    cols = next(data)[0:]
-    data = list(data)
-    idx = list(range(len(data)))
-    data = (islice(r, 0, None) for r in data)
-    df = pd.DataFrame(data, index=idx, columns=cols)
 
     legCatalog = {}
     myLeg = []
-    for index, row in df.iterrows():
+    # Leitura da folha linha a linha (modo streaming)
+    for index, row in enumerate(iterRows(sheet, normaliza)):
         myReg = {}
-        if row["Tipo"] and str(row["Tipo"]) != 'NaT':
+        if row["Tipo"] is not None and row["Tipo"] != 'NaT':
             # Tipo: ------------------------------------------------------
-            limpa = brancos.sub('', str(row["Tipo"]))
-            myReg["tipo"] = re.sub(r'[/ \u202F\u00A0()\-]+', '_', limpa)
+            myReg["tipo"] = row["Tipo"]
             # Número: ----------------------------------------------------
-            if row["Número"] and row["Número"] != '':
-                myReg["numero"] = brancos.sub('', str(row["Número"]))
-                myReg["numero"] = re.sub(r'[/ \u202F\u00A0()\-\u2010]+', '_', myReg["numero"])
+            if row["Número"] is not None:
+                myReg["numero"] = row["Número"]
 
             else:
                 rep.addWarning(info={"msg":f"Linha {str(index+2)}: Legislação sem número"})
                 myReg["numero"] = 'NE'
             # Entidades:--------------------------------------------------
             filtradas = []
-            if row["Entidade"]:
-                entidades = brancos.sub('', str(row["Entidade"])).split(',')
-                filtradas = list(filter(lambda e: e != '' and e != 'NaT', entidades))
+            if row["Entidade"] is not None:
+                filtradas = row["Entidade"]
                 if len(filtradas)> 0:
-                    myReg["entidade"] = []
-                    for e in filtradas:
-                        limpa = brancos.sub('', e)
-                        limpa = re.sub(r'[/ \u202F\u00A0()]+', '_', limpa)
-                        myReg["entidade"].append(limpa)
+                    myReg["entidade"] = filtradas
             if len(filtradas)> 0:
             # Cálculo do id/código da legislação: tipo + entidades + numero -------------------------
                 legCod = re.sub(r'[ ]+', '_', myReg["tipo"]) + '_' + '_'.join(myReg["entidade"])
@@ -88,15 +85,14 @@ def processSheet(sheet, nome, rep: Report):
                 else:
                     myReg["data"] = row["Data"].isoformat()[:10]
             # Sumário:----------------------------------------------------
-            if row["Sumário"]:
-                mySum = brancos.sub('', str(row["Sumário"]))
-                myReg["sumario"] = mySum
+            if row["Sumário"] is not None:
+                myReg["sumario"] = row["Sumário"]
             # Fonte:------------------------------------------------------
-            if row["Fonte"]:
-                myReg["fonte"] = brancos.sub('', str(row["Fonte"])).strip()
+            if row["Fonte"] is not None:
+                myReg["fonte"] = row["Fonte"]
             # Link:-------------------------------------------------------
-            if row["Link"]:
-                myReg["link"] = brancos.sub('', str(row["Link"])).strip()
+            if row["Link"] is not None:
+                myReg["link"] = row["Link"]
 
             myLeg.append(myReg)
 
@@ -105,14 +101,12 @@ def processSheet(sheet, nome, rep: Report):
             for l in linhas:
                 rep.addErroCatalogo(f"Linha {l}: Legislação duplicada::<b>{sig}</b>.","leg")
 
-    outFilePath = os.path.join(FILES_DIR, f"{fnome}.json")
+    outFilePath = os.path.join(ws.filesDir, f"{fnome}.json")
     outFile = open(outFilePath, "w", encoding="utf-8")
     json.dump(myLeg, outFile, indent = 4, ensure_ascii=False)
     loggerProc.info(f"Documentos legislativos extraídos: {len(myLeg)}")
     outFile.close()
 
-    catalogPath = os.path.join(FILES_DIR, "legCatalog.json")
-    catalog = open(catalogPath, "w", encoding="utf-8")
-    json.dump(list(legCatalog.keys()), catalog, indent = 4, ensure_ascii=False)
+    cat.legislacao = legCatalog
     loggerProc.info("Catálogo de legislação criado.")
     loggerProc.info("# FIM: Migração do Catálogo Legislativo ----------------------")
\ No newline at end of file
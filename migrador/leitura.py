@@ -0,0 +1,258 @@
+import hashlib
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+from openpyxl import load_workbook
+import numpy as np
+import pandas as pd
+from utils.config_utils import READ_CHUNK_ROWS
+
+
+def openWorkbook(filename):
+    """
+    Abre o ficheiro Excel em modo de leitura (`read_only`).
+    Neste modo as células não são carregadas todas para
+    memória, são lidas do ficheiro à medida que as linhas
+    da folha são percorridas.
+
+    O workbook devolvido deve ser fechado com `wb.close()`.
+    """
+    return load_workbook(filename, read_only=True)
+
+
+def iterBlocos(sheet, tamanho):
+    # Cabeçalho e blocos de, no máximo, `tamanho` linhas da folha,
+    # cada um com a posição da sua primeira linha
+    rows = sheet.iter_rows(values_only=True)
+    cols = next(rows, None)
+    if cols is None:
+        return None, iter(())
+
+    def blocos():
+        numCols = len(cols)
+        inicio = 0
+        bloco = []
+        for row in rows:
+            # No modo de leitura as linhas podem vir mais curtas que
+            # o cabeçalho, as células em falta ficam a None
+            if len(row) < numCols:
+                row = row + (None,) * (numCols - len(row))
+            bloco.append(row)
+            if len(bloco) == tamanho:
+                yield inicio, bloco
+                inicio += len(bloco)
+                bloco = []
+        if bloco:
+            yield inicio, bloco
+
+    return cols, blocos()
+
+
+def tiposColunas(sheet, tamanho=READ_CHUNK_ROWS):
+    """
+    Tipo (dtype) que o pandas daria a cada coluna da folha se esta
+    fosse lida de uma só vez para um DataFrame, como era feito antes
+    da leitura por blocos. Por exemplo, uma coluna de inteiros com
+    células vazias passa a float64.
+
+    A folha é percorrida bloco a bloco e os tipos de cada bloco
+    são combinados, por isso só um bloco é mantido em memória.
+    Devolve a lista dos tipos, pela ordem das colunas.
+    """
+    cols, blocos = iterBlocos(sheet, tamanho)
+    if cols is None:
+        return []
+
+    tipos = [None] * len(cols)
+    vazias = [False] * len(cols)
+    for _, bloco in blocos:
+        df = pd.DataFrame(bloco, columns=range(len(cols)))
+        nulos = df.isna()
+        for i, tipo in enumerate(df.dtypes):
+            if nulos[i].all():
+                # Um bloco só com células vazias não diz nada do tipo
+                vazias[i] = True
+                continue
+            vazias[i] = vazias[i] or nulos[i].any()
+            if tipos[i] is None or tipos[i] == tipo:
+                tipos[i] = tipo
+            elif {tipos[i].kind, tipo.kind} <= {"i", "f"}:
+                tipos[i] = np.dtype("float64")
+            else:
+                tipos[i] = np.dtype(object)
+
+    res = []
+    for tipo, vazia in zip(tipos, vazias):
+        if tipo is None:
+            tipo = np.dtype(object)
+        elif vazia and tipo.kind == "i":
+            tipo = np.dtype("float64")
+        elif vazia and tipo.kind == "b":
+            tipo = np.dtype(object)
+        res.append(tipo)
+    return res
+
+
+def iterChunks(sheet, tamanho=READ_CHUNK_ROWS):
+    """
+    Percorre as linhas de uma folha (`sheet`) em blocos de, no
+    máximo, `tamanho` linhas. A primeira linha é o cabeçalho e
+    cada bloco é devolvido como um DataFrame (`dtype=object`)
+    indexado pela posição da linha na folha, sem contar com o
+    cabeçalho.
+
+    Os valores são convertidos como se a folha fosse lida toda
+    para um só DataFrame (ver `tiposColunas`): os números de uma
+    coluna com células vazias são float e as células vazias das
+    colunas numéricas ou de datas ficam a NaN ou NaT.
+
+    Só um bloco é mantido em memória de cada vez.
+    """
+    tipos = tiposColunas(sheet, tamanho)
+    cols, blocos = iterBlocos(sheet, tamanho)
+    if cols is None:
+        return
+
+    for inicio, bloco in blocos:
+        df = pd.DataFrame(bloco, columns=cols, dtype=object, index=range(inicio, inicio + len(bloco)))
+        for i, tipo in enumerate(tipos):
+            if tipo != object:
+                df.isetitem(i, df.iloc[:, i].astype(tipo).astype(object))
+        yield df
+
+
+def anulaVazios(df):
+    """
+    As células vazias (None, NaN ou NaT) do DataFrame `df` ficam
+    todas a None (in place).
+    """
+    for i in range(len(df.columns)):
+        valores = df.iloc[:, i]
+        df.isetitem(i, valores.where(valores.notna(), None))
+
+
+def iterRows(sheet, normaliza=None):
+    """
+    Percorre as linhas de uma folha (`sheet`) uma a uma. Cada
+    linha é devolvida como um `dict` indexado pelo nome da coluna.
+
+    A leitura é feita por blocos (ver `iterChunks`) e, se for
+    passada uma função `normaliza`, esta é aplicada a cada bloco
+    antes de as suas linhas serem devolvidas. Desta forma a limpeza
+    das colunas é feita coluna a coluna com operações vetorizadas
+    e o processamento linha a linha só lê valores já normalizados.
+    """
+    for df in iterChunks(sheet):
+        if normaliza:
+            normaliza(df)
+        yield from df.to_dict("records")
+
+
+def applySubs(texto, subs):
+    # Cada substituição é um par (regex, substituto) ou uma
+    # função que recebe e devolve uma Series de strings
+    for sub in subs:
+        if callable(sub):
+            texto = sub(texto)
+        else:
+            regex, repl = sub
+            texto = texto.str.replace(regex, repl, regex=True)
+    return texto
+
+
+def limpaTexto(df, col, *subs, todos=False):
+    """
+    Normaliza a coluna `col` do DataFrame `df` (in place): os valores
+    são convertidos para string e as substituições `subs` são aplicadas
+    pela ordem dada.
+
+    As células vazias (que avaliam a falso) ficam a None e não são
+    normalizadas, a não ser que `todos` seja verdadeiro. Assim, o
+    processamento linha a linha pode continuar a distinguir as células
+    não preenchidas das que ficam vazias depois de limpas.
+    """
+    if col not in df.columns:
+        return
+    valores = df[col]
+    preenchidas = valores.astype(bool) if not todos else pd.Series(True, index=df.index)
+    texto = applySubs(valores[preenchidas].astype(str), subs)
+    df[col] = texto.reindex(df.index).astype(object).where(preenchidas, None)
+
+
+def limpaLista(df, col, *subs, sep='#', subsItem=(), descarta=()):
+    """
+    Normaliza uma coluna `col` com vários valores separados por `sep`.
+    O texto é limpo com `subs` (ver `limpaTexto`), depois é partido
+    por `sep`, os elementos que estejam em `descarta` são removidos e
+    os restantes são limpos com `subsItem`.
+
+    Cada célula preenchida passa a ter uma lista, as vazias ficam a None.
+    """
+    limpaTexto(df, col, *subs)
+    if col not in df.columns:
+        return
+    preenchidas = df[col].notna()
+    if not preenchidas.any():
+        return
+    itens = df.loc[preenchidas, col].str.split(sep).explode()
+    if descarta:
+        itens = itens[~itens.isin(descarta)]
+    itens = applySubs(itens.astype(str), subsItem)
+    listas = itens.groupby(level=0, sort=False).agg(list).reindex(df.index)
+    # As células em que todos os elementos foram descartados ficam
+    # com a lista vazia
+    df[col] = [
+        (l if isinstance(l, list) else []) if p else None
+        for l, p in zip(listas, preenchidas)
+    ]
+
+
+MAIN_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+sstRef = re.compile(rb'<c\s[^>]*\bt="s"[^>]*>\s*<v>(\d+)</v>')
+
+
+def hashFolhas(filename, nomes):
+    """
+    Calcula um hash do conteúdo de cada uma das folhas `nomes`
+    sem as percorrer com o openpyxl: é lido diretamente o XML
+    de cada folha dentro do ficheiro .xlsx.
+
+    O hash de uma folha inclui o seu XML, as strings partilhadas
+    (`sharedStrings.xml`) referenciadas pelas suas células e os
+    estilos do workbook (que determinam, por exemplo, se um número
+    é lido como data). Uma alteração noutra folha não altera o hash.
+
+    Devolve {nome: hash}.
+    """
+    with zipfile.ZipFile(filename) as z:
+        partes = set(z.namelist())
+
+        # Caminho do XML de cada folha (workbook.xml + relações)
+        rels = {}
+        for rel in ET.fromstring(z.read("xl/_rels/workbook.xml.rels")).iter(f"{PKG_REL_NS}Relationship"):
+            alvo = rel.get("Target")
+            rels[rel.get("Id")] = alvo.lstrip("/") if alvo.startswith("/") else f"xl/{alvo}"
+        caminhos = {}
+        for folha in ET.fromstring(z.read("xl/workbook.xml")).iter(f"{MAIN_NS}sheet"):
+            caminhos[folha.get("name")] = rels[folha.get(f"{REL_NS}id")]
+
+        strings = []
+        if "xl/sharedStrings.xml" in partes:
+            for si in ET.fromstring(z.read("xl/sharedStrings.xml")).iter(f"{MAIN_NS}si"):
+                strings.append("".join(t.text or "" for t in si.iter(f"{MAIN_NS}t")))
+
+        estilos = z.read("xl/styles.xml") if "xl/styles.xml" in partes else b""
+        hashEstilos = hashlib.sha256(estilos).digest()
+
+        res = {}
+        for nome in nomes:
+            xml = z.read(caminhos[nome])
+            h = hashlib.sha256(hashEstilos)
+            h.update(xml)
+            for ref in sstRef.finditer(xml):
+                h.update(strings[int(ref.group(1))].encode("utf-8"))
+                h.update(b"\0")
+            res[nome] = h.hexdigest()
+    return res
@@ -1,21 +1,36 @@
 from .excel2json import excel2json
+from .grafo import GrafoRelacoes
+from .motor import MotorInvariantes, ordemRelatorio
+from .escalonador import Escalonador
+from .revalidacao import Alteracoes, revalidar
+from .termos import IndiceTermos
 from . import checkInvariantes as c
 from .report import Report
 from . import genTTL as g
 import json
 import os
 from . import queryfix as fix
-from utils.path_utils import FILES_DIR, PROJECT_ROOT
+from utils.path_utils import PROJECT_ROOT
+from utils.workspace_utils import Workspace, PADRAO
+from utils.config_utils import INVARIANT_WORKERS, GENERATION_WORKERS
 import logging
 from utils.log_utils import FIX, GEN, INV, PROC
+from utils import progresso_utils
 
-def migra(filename):
+
+def migra(filename,ws: Workspace = PADRAO):
+    """
+    Migração do Excel `filename`. Os ficheiros intermédios, os
+    dumps e os ficheiros ttl são escritos no workspace `ws` (por
+    omissão, as diretorias globais).
+    """
 
     loggerProc = logging.getLogger(PROC)
     loggerInv = logging.getLogger(INV)
     loggerCorr = logging.getLogger(FIX)
     loggerGen = logging.getLogger(GEN)
     rep = Report()
+    progresso_utils.iniciar()
 
     loggerProc.info("-"*80)
     loggerProc.info(f"Inicio da migração do ficheiro {filename}")
@@ -26,7 +41,7 @@ def migra(filename):
     # --------------------------------------------
 
     loggerProc.info("Criação dos ficheiros JSON intermédios")
-    excel2json(rep,filename)
+    cat = excel2json(rep,filename,ws)
 
     # --------------------------------------------
     # Processamento inicial dos dados
@@ -35,11 +50,12 @@ def migra(filename):
     loggerProc.info("-"*80)
     loggerProc.info("Processamento inicial dos dados")
     loggerProc.info("-"*80)
-    classes, harmonizacao, outros = c.processClasses(rep)
+    classes, harmonizacao, outros, hier = c.processClasses(rep,ws)
 
     # Inferências de relações
     loggerProc.info("Inferências de relações")
     rep.fixMissingRels(classes)
+    grafo = GrafoRelacoes(classes)
 
     loggerProc.info("Verificação da estrutura dos dados")
     ok = rep.checkStruct()
@@ -56,57 +72,8 @@ def migra(filename):
     loggerInv.info("Verificação dos invariantes")
     loggerInv.info("-"*80)
 
-    with open(os.path.join(FILES_DIR,"ti.json")) as f:
-        termosIndice = json.load(f)
-
-    c.rel_2_inv_3(classes,rep)
-    c.rel_2_inv_4(classes,rep)
-    c.rel_2_inv_5(classes,rep)
-    c.rel_2_inv_12(classes,rep)
-    c.rel_2_inv_13(classes,rep)
-    c.rel_3_inv_1(classes,rep)
-    c.rel_3_inv_3(classes,rep)
-    c.rel_1_inv_3(classes,termosIndice,rep)
-    c.rel_5_inv_1(classes,rep)
-    c.rel_2_inv_1(classes,rep)
-    c.rel_5_inv_2(classes,rep)
-    c.rel_4_inv_2(classes,rep)
-    c.rel_1_inv_2(classes,rep)
-    c.rel_1_inv_1(classes,rep)
-    c.rel_1_inv_4(classes,rep)
-    c.rel_2_inv_6(classes,rep)
-    c.rel_2_inv_7(classes,rep)
-    c.rel_2_inv_11(classes,rep)
-    c.rel_1_inv_5(classes,rep)
-    c.rel_8_inv_2(classes,rep)
-    c.rel_4_inv_1(classes,rep)
-    c.rel_1_inv_6(classes,rep)
-    c.rel_2_inv_8(classes,rep)
-    c.rel_3_inv_2(classes,rep)
-    c.rel_2_inv_9(classes,rep)
-    c.rel_2_inv_2(classes,rep)
-    c.rel_2_inv_14(classes,rep)
-    c.rel_1_inv_7(classes,harmonizacao,rep)
-    c.rel_8_inv_1(classes,rep)
-    c.rel_2_inv_10(termosIndice,rep)
-    c.rel_8_inv_3(classes,rep)
-    c.rel_8_inv_4(classes,rep)
-    c.rel_8_inv_5(classes,rep)
-    c.rel_8_inv_6(classes,rep)
-    c.rel_8_inv_7(classes,rep)
-    c.rel_7_inv_1(classes,rep)
-    c.rel_6_inv_1(classes,rep)
-
-    loggerInv.info("-"*80)
-    loggerInv.info("Verificação dos invariantes terminada")
-    loggerInv.info("-"*80)
-
-    rep.dumpClasses(classes)
-
-    # --------------------------------------------
-    # Correções
-    # --------------------------------------------
-
+    with open(os.path.join(ws.filesDir,"ti.json")) as f:
+        termosIndice = IndiceTermos(json.load(f))
 
     with open(os.path.join(PROJECT_ROOT, "invariantes.json")) as f:
         invsJson = json.load(f)
@@ -119,33 +86,39 @@ def migra(filename):
                 "clarificacao": i["clarificacao"]
             }
 
+    # Todos os invariantes são verificados numa só passagem pelas classes,
+    # as falhas são registadas pela ordem declarada no registo de cada
+    # invariante (`ordem`); o `Escalonador` só decide a ordem das correções
+    escalonador = Escalonador(list(invs))
+    invariantes = ordemRelatorio(escalonador.nomes)
+    motor = MotorInvariantes(classes,harmonizacao,termosIndice,hier,grafo)
+    motor.verificar(invariantes,rep,INVARIANT_WORKERS)
+
+    loggerInv.info("-"*80)
+    loggerInv.info("Verificação dos invariantes terminada")
+    loggerInv.info("-"*80)
+
+    rep.dumpClasses(classes,ws=ws)
+
+    # --------------------------------------------
+    # Correções
+    # --------------------------------------------
+
     loggerCorr.info("-"*80)
     loggerCorr.info("Correção automática dos erros")
     loggerCorr.info("-"*80)
+    alteracoes = Alteracoes()
     errosInv = rep.globalErrors.get("erroInv",{})
-    if "rel_2_inv_12" in errosInv:
-        fix.rel_2_inv_12_fix(classes,rep.globalErrors["erroInv"]["rel_2_inv_12"])
-    if "rel_2_inv_13" in errosInv:
-        fix.rel_2_inv_13_fix(classes,rep.globalErrors["erroInv"]["rel_2_inv_13"])
-    if "rel_3_inv_2" in errosInv:
-        fix.rel_3_inv_2_fix(classes,rep.globalErrors["erroInv"]["rel_3_inv_2"])
-    if "rel_3_inv_3" in errosInv:
-        fix.rel_3_inv_3_fix(classes,rep.globalErrors["erroInv"]["rel_3_inv_3"])
-    if "rel_4_inv_2" in errosInv:
-        fix.rel_4_inv_2_fix(classes,rep.globalErrors["erroInv"]["rel_4_inv_2"])
-    if "rel_5_inv_2" in errosInv:
-        fix.rel_5_inv_2_fix(classes,rep.globalErrors["erroInv"]["rel_5_inv_2"])
-    if "rel_1_inv_3" in errosInv:
-        fix.rel_1_inv_3_fix(termosIndice,rep.globalErrors["erroInv"]["rel_1_inv_3"])
-    if "rel_8_inv_6" in errosInv:
-        fix.rel_8_inv_6_fix(classes,rep.globalErrors["erroInv"]["rel_8_inv_6"],invs)
-    if "rel_8_inv_7" in errosInv:
-        fix.rel_8_inv_7_fix(classes,rep.globalErrors["erroInv"]["rel_8_inv_7"],invs)
+    escalonador.corrigir(motor,errosInv,invs,alteracoes)
     loggerCorr.info("-"*80)
     loggerCorr.info("Correção automática dos erros terminada")
     loggerCorr.info("-"*80)
-    rep.dumpReport()
-    rep.dumpClasses(classes,dumpFileName="allClassesFixed.json")
+    rep.dumpReport(ws=ws)
+    rep.dumpClasses(classes,dumpFileName="allClassesFixed.json",ws=ws)
+
+    # Revalidação dos invariantes afetados pelas correções
+    repFix = revalidar(motor,invariantes,rep,alteracoes)
+    repFix.dumpReport(dumpFileName="dumpFixed.json",ws=ws)
 
     # --------------------------------------------
     # Geração da ontologia final
@@ -170,13 +143,7 @@ def migra(filename):
         loggerGen.info("Geração dos ficheiros de ontologia")
         loggerGen.info("-"*80)
 
-        g.tiGenTTL(termosIndice)
-        g.entidadeGenTTL()
-        g.tipologiaGenTTL()
-        g.legGenTTL()
-
-        for clN1,procs in finalClasses.items():
-            g.classeGenTTL(clN1,procs)
+        g.genOntologias(termosIndice,finalClasses,cat,hier,GENERATION_WORKERS,ws)
 
         loggerGen.info("-"*80)
         loggerGen.info("Geração dos ficheiros de ontologia terminada")
@@ -0,0 +1,333 @@
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from utils.log_utils import INV
+from utils.progresso_utils import Etapa
+from .report import Report, ErroInv
+from .hierarquia import Hierarquia
+from .grafo import GrafoRelacoes
+from .termos import IndiceTermos
+
+logger = logging.getLogger(INV)
+
+
+class Invariante:
+    """
+    Visitante registado para um invariante. Cada invariante
+    tem um único visitante, de um de três tipos:
+
+    * "classe": `funcao(m,cod,classe,rep)`, chamada uma vez
+    por classe de um dos `niveis` (todos, se `niveis` for None);
+    * "aresta": `funcao(m,cod,classe,proc,rel,rep)`, chamada
+    para cada relação "`cod` `rel` `proc`" declarada por uma
+    classe de um dos `niveis`, se `rel` estiver em `rels`
+    (ou para todas as relações, se `rels` for None);
+    * "final": `funcao(m,rep)`, chamada depois de percorridas
+    as classes, para invariantes que não dependem delas.
+
+    O `m` é o `MotorInvariantes` que está a fazer a verificação.
+
+    O `nome` é o id do invariante em `invariantes.json` e a `ordem`
+    a sua posição no relatório (ver `ordemRelatorio`). As
+    `entradas` são os dados do `MotorInvariantes` que o invariante
+    lê ("classes", "termosIndice", "harmonizacao") e os `campos`
+    os dados de que depende ("pca", "df", "proRel", "termosIndice",
+    ...), usados para saber que invariantes voltar a verificar
+    depois de uma correção (ver `revalidacao` e `escalonador`).
+
+    Se o invariante tiver correção automática, a `correcao`
+    é registada com `corrige`, juntamente com os campos que
+    `altera` e os invariantes que `verifica` para saber se
+    a correção é viável.
+    """
+
+    def __init__(self,nome,ordem,tipo,funcao,niveis=None,rels=None,campos=(),entradas=("classes",)):
+        self.nome = nome
+        self.ordem = ordem
+        self.tipo = tipo
+        self.funcao = funcao
+        self.niveis = niveis
+        self.rels = rels
+        self.campos = set(campos)
+        self.entradas = set(entradas)
+        self.correcao = None
+        self.altera = set()
+        self.verifica = []
+
+
+    def aceitaNivel(self,nivel):
+        return self.niveis is None or nivel in self.niveis
+
+
+invariantes = {} # {"rel_2_inv_1": Invariante}
+
+
+def visitaClasse(nome,ordem,niveis=None,campos=(),entradas=("classes",)):
+    """
+    Regista a função decorada como visitante por classe
+    do invariante `nome`, na posição `ordem` do relatório.
+    """
+    def regista(funcao):
+        invariantes[nome] = Invariante(nome,ordem,"classe",funcao,niveis,campos=campos,entradas=entradas)
+        return funcao
+    return regista
+
+
+def visitaAresta(nome,ordem,rels=None,niveis=None,campos=(),entradas=("classes",)):
+    """
+    Regista a função decorada como visitante por relação
+    do invariante `nome`, na posição `ordem` do relatório.
+    """
+    def regista(funcao):
+        invariantes[nome] = Invariante(nome,ordem,"aresta",funcao,niveis,rels,campos,entradas)
+        return funcao
+    return regista
+
+
+def visitaFinal(nome,ordem,campos=(),entradas=()):
+    """
+    Regista a função decorada como verificação final
+    do invariante `nome`, na posição `ordem` do relatório.
+    """
+    def regista(funcao):
+        invariantes[nome] = Invariante(nome,ordem,"final",funcao,campos=campos,entradas=entradas)
+        return funcao
+    return regista
+
+
+def ordemRelatorio(nomes=None):
+    """
+    Ids dos invariantes registados em `nomes` (por omissão, todos)
+    pela ordem em que as suas falhas aparecem no relatório e nos
+    dumps, a `ordem` declarada no registo de cada um.
+    """
+    if nomes is None:
+        nomes = invariantes
+    return sorted((n for n in nomes if n in invariantes),key=lambda n: invariantes[n].ordem)
+
+
+def corrige(nome,altera=(),verifica=()):
+    """
+    Regista a função decorada como correção automática do
+    invariante `nome`, que altera os campos `altera`. Os
+    invariantes `verifica` são verificados antes e depois de
+    cada correção, que é desfeita se introduzir falhas. A função
+    é chamada como `funcao(m,erros,invs,alteracoes)`, em que
+    `erros` são as falhas do invariante e `invs` as descrições
+    de `invariantes.json`.
+    """
+    def regista(funcao):
+        inv = invariantes[nome]
+        inv.correcao = funcao
+        inv.altera = set(altera)
+        inv.verifica = list(verifica)
+        return funcao
+    return regista
+
+
+class Falhas:
+    """
+    Falhas encontradas por um invariante durante a passagem
+    pelas classes. Tem a mesma interface que `Report.addFalhaInv`
+    e as falhas só são registadas no `Report` no fim (`registaEm`),
+    invariante a invariante, para que a ordem dos erros seja a
+    mesma de quando cada invariante percorria as classes sozinho.
+    """
+
+    def __init__(self):
+        self.falhas = []
+
+
+    def addFalhaInv(self,inv,cod,info={},extra=""):
+        self.falhas.append((inv,cod,info,extra))
+
+
+    def erros(self):
+        return [ErroInv(inv,cod,info,extra) for inv,cod,info,extra in self.falhas]
+
+
+    def registaEm(self,rep: Report):
+        for inv,cod,info,extra in self.falhas:
+            rep.addFalhaInv(inv,cod,info,extra)
+
+
+class MotorInvariantes:
+    """
+    Verificação de vários invariantes numa só passagem por
+    `allClasses`: cada classe (e cada uma das suas relações)
+    é visitada uma vez e entregue a todos os invariantes
+    interessados no seu nível.
+
+    Os `termosIndice` podem ser passados como lista (o conteúdo
+    de `ti.json`) ou como `IndiceTermos`.
+
+    A `Hierarquia` e o `GrafoRelacoes` podem ser passados
+    já construídos; caso contrário só são construídos se
+    algum invariante precisar deles.
+    """
+
+    def __init__(self,allClasses,harmonizacao=None,termosIndice=None,hier: Hierarquia = None,grafo: GrafoRelacoes = None):
+        self.allClasses = allClasses
+        self.harmonizacao = harmonizacao if harmonizacao is not None else {}
+        if termosIndice is not None and not isinstance(termosIndice,IndiceTermos):
+            termosIndice = IndiceTermos(termosIndice)
+        self.termosIndice = termosIndice
+        self.hierarquia = hier
+        self.grafoRelacoes = grafo
+        self.posicoes = None
+        self.estado = {} # Estado auxiliar de cada invariante durante a passagem
+
+
+    @property
+    def hier(self):
+        if self.hierarquia is None:
+            self.hierarquia = Hierarquia(self.allClasses)
+        return self.hierarquia
+
+
+    @property
+    def grafo(self):
+        if self.grafoRelacoes is None:
+            self.grafoRelacoes = GrafoRelacoes(self.allClasses)
+        return self.grafoRelacoes
+
+
+    @property
+    def posicao(self):
+        """
+        Posição de cada classe em `allClasses`, isto é, a ordem
+        pela qual as classes são visitadas.
+        """
+        if self.posicoes is None:
+            self.posicoes = {cod: i for i,cod in enumerate(self.allClasses)}
+        return self.posicoes
+
+
+    def percorrer(self,nomes,cods=None,finais=True):
+        """
+        Visita as classes `cods` (todas, se for None), pela ordem
+        de `allClasses`, e devolve as falhas de cada invariante
+        de `nomes` ({nome: Falhas}). As verificações finais só
+        são feitas se `finais` for verdadeiro.
+        """
+
+        selecionados = [invariantes[n] for n in nomes]
+        falhas = {inv.nome: Falhas() for inv in selecionados}
+        porClasse = [inv for inv in selecionados if inv.tipo == "classe"]
+        porAresta = [inv for inv in selecionados if inv.tipo == "aresta"]
+        self.estado = {}
+
+        if cods is None:
+            cods = self.allClasses
+
+        visitantes = {} # {nivel: ([Invariante],[Invariante])}
+        for cod in cods:
+            classe = self.allClasses[cod]
+            nivel = classe.get("nivel")
+            if nivel not in visitantes:
+                visitantes[nivel] = (
+                    [inv for inv in porClasse if inv.aceitaNivel(nivel)],
+                    [inv for inv in porAresta if inv.aceitaNivel(nivel)]
+                )
+            visClasse, visAresta = visitantes[nivel]
+
+            for inv in visClasse:
+                inv.funcao(self,cod,classe,falhas[inv.nome])
+
+            if visAresta:
+                for proc,rel in self.grafo.relacoes(cod):
+                    for inv in visAresta:
+                        if inv.rels is None or rel in inv.rels:
+                            inv.funcao(self,cod,classe,proc,rel,falhas[inv.nome])
+
+        if finais:
+            for inv in selecionados:
+                if inv.tipo == "final":
+                    inv.funcao(self,falhas[inv.nome])
+
+        return falhas
+
+
+    def verificar(self,nomes,rep: Report,workers=1):
+        """
+        Verifica os invariantes `nomes` e guarda em `rep` as
+        falhas encontradas. As falhas e as mensagens de log são
+        registadas pela ordem de `nomes`.
+
+        Com `workers` > 1 as classes são divididas em blocos
+        contíguos, verificados em paralelo por vários processos,
+        cada um com um Report próprio. Os Reports parciais são
+        depois juntos invariante a invariante e pela ordem dos
+        blocos, por isso o resultado é o mesmo da verificação
+        em série.
+        """
+
+        workers = min(workers,len(self.allClasses))
+        if workers > 1:
+            parciais = self.verificarEmParalelo(nomes,rep,workers)
+            # As verificações finais não dependem das classes,
+            # são feitas aqui e juntas depois dos blocos
+            falhas = self.percorrer(nomes,cods=[])
+        else:
+            falhas = self.percorrer(nomes)
+
+        etapa = Etapa("invariantes",len(nomes))
+        for nome in nomes:
+            logger.info(f"Verificação do invariante {nome}")
+            if workers > 1:
+                for parcial in parciais:
+                    rep.mergeErroInv(parcial,nome)
+            falhas[nome].registaEm(rep)
+            err = len(rep.globalErrors["erroInv"].get(nome,[]))
+            logger.info(f"Foram encontradas {err} falhas no invariante {nome}")
+            etapa.avancar(f"Invariante {nome} verificado: {err} falhas",invariante=nome,falhas=err)
+
+
+    def verificarEmParalelo(self,nomes,rep: Report,workers):
+        """
+        Distribui as classes por `workers` processos e devolve
+        os Reports parciais, pela ordem dos blocos de classes.
+
+        Só são enviados aos processos os dados que algum
+        dos invariantes lê (as suas `entradas`).
+        """
+
+        cods = list(self.allClasses)
+        tamanho = -(-len(cods) // workers)
+        blocos = [cods[i:i+tamanho] for i in range(0,len(cods),tamanho)]
+        parcial = rep.reportParcial()
+        entradas = set()
+        for nome in nomes:
+            entradas.update(invariantes[nome].entradas)
+        harmonizacao = self.harmonizacao if "harmonizacao" in entradas else None
+        termosIndice = self.termosIndice if "termosIndice" in entradas else None
+
+        logger.info(f"Verificação dos invariantes em paralelo ({len(blocos)} processos)")
+        with ProcessPoolExecutor(max_workers=len(blocos),initializer=iniciaWorker,
+                                 initargs=(self.allClasses,harmonizacao,termosIndice)) as executor:
+            futures = [executor.submit(verificaBloco,nomes,bloco,parcial) for bloco in blocos]
+            return [f.result() for f in futures]
+
+
+motorWorker = None # MotorInvariantes de cada processo da verificação em paralelo
+
+
+def iniciaWorker(allClasses,harmonizacao,termosIndice):
+    """
+    Inicialização dos processos da verificação em paralelo:
+    os dados são enviados uma só vez para cada processo.
+    """
+    global motorWorker
+    # Garante que os invariantes estão registados no processo
+    from . import checkInvariantes
+    motorWorker = MotorInvariantes(allClasses,harmonizacao,termosIndice)
+
+
+def verificaBloco(nomes,cods,rep: Report):
+    """
+    Verifica os invariantes `nomes` nas classes `cods` e
+    devolve o `rep` (parcial) com as falhas encontradas.
+    """
+    falhas = motorWorker.percorrer(nomes,cods,finais=False)
+    for nome in nomes:
+        falhas[nome].registaEm(rep)
+    return rep
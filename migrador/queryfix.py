@@ -1,16 +1,24 @@
-import re
 from .report import ErroInv, Report
+from .hierarquia import Hierarquia
+from .termos import IndiceTermos
 from . import checkInvariantes as check
-from utils.log_utils import FIX,INV
+from .grafo import GrafoRelacoes
+from .transacao import Transacao
+from .revalidacao import Alteracoes
+from .motor import corrige, invariantes
+from utils.log_utils import FIX
 import logging
-import copy
 
 logger = logging.getLogger(FIX)
 
-def rel_2_inv_12_fix(allClasses,erros: list[ErroInv]):
+def rel_2_inv_12_fix(allClasses,erros: list[ErroInv],alteracoes: Alteracoes = None):
     """
     Faz a correção das falhas do invariante rel_2_inv_12.
     """
+
+    if alteracoes is None:
+        alteracoes = Alteracoes()
+
     errFixed = 0
     logger.info("Correção do invariante rel_2_inv_12")
     for err in erros:
@@ -19,11 +27,13 @@ def rel_2_inv_12_fix(allClasses,erros: list[ErroInv]):
             if "legislacao" not in classe:
                 classe["legislacao"] = [err.info["leg"]]
                 err.fix(f"A legislação <b>{err.info["leg"]}</b> foi adicionada à zona de contexto do processo <b>{err.cod}</b>")
+                alteracoes.registar(err.cod,"legislacao")
                 errFixed += 1
             elif err.info["leg"] not in classe["legislacao"]:
                 # Aqui evitam-se adicionar legislações repetidas
                 classe["legislacao"].append(err.info["leg"])
                 err.fix(f"A legislação <b>{err.info["leg"]}</b> foi adicionada à zona de contexto do processo <b>{err.cod}</b>")
+                alteracoes.registar(err.cod,"legislacao")
                 errFixed += 1
             else:
                 # Aqui o erro já se encontra corrigido
@@ -33,11 +43,22 @@ def rel_2_inv_12_fix(allClasses,erros: list[ErroInv]):
     logger.info(f"Foram corrigidas {errFixed} falhas do invariante rel_2_inv_12")
 
 
-def rel_2_inv_13_fix(allClasses,erros: list[ErroInv]):
+@corrige("rel_2_inv_12",altera=["legislacao"])
+def rel_2_inv_12_corrige(m,erros,invs,alteracoes):
+    rel_2_inv_12_fix(m.allClasses,erros,alteracoes=alteracoes)
+
+
+def rel_2_inv_13_fix(allClasses,erros: list[ErroInv],hier: Hierarquia = None,alteracoes: Alteracoes = None):
     """
     Faz a correção das falhas do invariante rel_2_inv_13.
     """
 
+    if hier is None:
+        hier = Hierarquia(allClasses)
+
+    if alteracoes is None:
+        alteracoes = Alteracoes()
+
     logger.info("Correção do invariante rel_2_inv_13")
     errFixed = 0
     errFailed = 0
@@ -45,18 +66,20 @@ def rel_2_inv_13_fix(allClasses,erros: list[ErroInv]):
     for err in erros:
         # Neste caso, como os erros são acerca de classes de
         # nível 4, a correção acontece na classe pai
-        pai = re.search(r'^(\d{3}\.\d{1,3}\.\d{1,3})\.\d{1,4}$', err.cod).group(1)
+        pai = hier.pai(err.cod)
         classePai = allClasses.get(pai)
 
         if classePai:
             if "legislacao" not in classePai:
                 classePai["legislacao"] = [err.info["leg"]]
                 err.fix(f"A legislação <b>{err.info["leg"]}</b> foi adicionada à zona de contexto do processo <b>{pai}</b>")
+                alteracoes.registar(pai,"legislacao")
                 errFixed += 1
             # Aqui evitam-se adicionar legislações repetidas
             elif err.info["leg"] not in classePai["legislacao"]:
                 classePai["legislacao"].append(err.info["leg"])
                 err.fix(f"A legislação <b>{err.info["leg"]}</b> foi adicionada à zona de contexto do processo <b>{pai}</b>")
+                alteracoes.registar(pai,"legislacao")
                 errFixed += 1
             # Aqui o erro já se encontra corrigido,
             # provavelmente durante a correção de um processo "irmão"
@@ -72,11 +95,19 @@ def rel_2_inv_13_fix(allClasses,erros: list[ErroInv]):
     logger.info(f"Falharam {errFailed} correções do invariante rel_2_inv_13")
 
 
-def rel_3_inv_2_fix(allClasses,erros: list[ErroInv]):
+@corrige("rel_2_inv_13",altera=["legislacao"])
+def rel_2_inv_13_corrige(m,erros,invs,alteracoes):
+    rel_2_inv_13_fix(m.allClasses,erros,m.hier,alteracoes=alteracoes)
+
+
+def rel_3_inv_2_fix(allClasses,erros: list[ErroInv],alteracoes: Alteracoes = None):
     """
     Faz a correção das falhas do invariante rel_3_inv_2.
     """
 
+    if alteracoes is None:
+        alteracoes = Alteracoes()
+
     logger.info("Correção do invariante rel_3_inv_2")
     errFixed = 0
     errFailed = 0
@@ -118,6 +149,7 @@ def rel_3_inv_2_fix(allClasses,erros: list[ErroInv]):
                             crit["procRefs"] = procRefs
                             break
                     err.fix(f"O processo <b>{err.info["proc"]}</b> foi adicionado no critério de justificação <b>{critCod}</b> do PCA do processo <b>{err.cod}</b>")
+                    alteracoes.registar(err.cod,"pca")
                     errFixed += 1
 
                 # Se ainda não existe um critério do tipo "utilidade",
@@ -134,6 +166,7 @@ def rel_3_inv_2_fix(allClasses,erros: list[ErroInv]):
                     # Caso a justificação não exista
                     pca["justificacao"] = just
                     err.fix(f"Um novo critério de utilidade da justificação do PCA do processo <b>{err.cod}</b> foi gerado automaticamente com o código <b>{critCod}</b>. O processo <b>{err.info["proc"]}</b> foi adicionado ao critério criado.")
+                    alteracoes.registar(err.cod,"pca")
                     errFixed += 1
             else:
                 err.fail(f"O processo <b>{err.cod}</b> não tem PCA")
@@ -143,11 +176,19 @@ def rel_3_inv_2_fix(allClasses,erros: list[ErroInv]):
     logger.info(f"Falharam {errFailed} correções do invariante rel_3_inv_2")
 
 
-def rel_3_inv_3_fix(allClasses,erros: list[ErroInv]):
+@corrige("rel_3_inv_2",altera=["pca"])
+def rel_3_inv_2_corrige(m,erros,invs,alteracoes):
+    rel_3_inv_2_fix(m.allClasses,erros,alteracoes=alteracoes)
+
+
+def rel_3_inv_3_fix(allClasses,erros: list[ErroInv],alteracoes: Alteracoes = None):
     """
     Faz a correção das falhas do invariante rel_3_inv_3_fix.
     """
 
+    if alteracoes is None:
+        alteracoes = Alteracoes()
+
     logger.info("Correção do invariante rel_3_inv_3")
     errFixed = 0
     errFailed = 0
@@ -189,6 +230,7 @@ def rel_3_inv_3_fix(allClasses,erros: list[ErroInv]):
                             crit["procRefs"] = procRefs
                             break
                     err.fix(f"O processo <b>{err.info["proc"]}</b> foi adicionado no critério de justificação <b>{critCod}</b> do PCA do processo <b>{err.cod}</b>")
+                    alteracoes.registar(err.cod,"pca")
                     errFixed += 1
 
                 # Se ainda não existe um critério do tipo "utilidade",
@@ -205,6 +247,7 @@ def rel_3_inv_3_fix(allClasses,erros: list[ErroInv]):
                     # Caso a justificação não exista
                     pca["justificacao"] = just
                     err.fix(f"Um novo critério de utilidade da justificação do PCA do processo <b>{err.cod}</b> foi gerado automaticamente com o código <b>{critCod}</b>. O processo <b>{err.info["proc"]}</b> foi adicionado ao critério criado.")
+                    alteracoes.registar(err.cod,"pca")
                     errFixed += 1
             else:
                 err.fail(f"O processo <b>{err.cod}</b> não tem PCA")
@@ -215,11 +258,19 @@ def rel_3_inv_3_fix(allClasses,erros: list[ErroInv]):
     logger.info(f"Falharam {errFailed} correções do invariante rel_3_inv_3")
 
 
-def rel_4_inv_2_fix(allClasses,erros: list[ErroInv]):
+@corrige("rel_3_inv_3",altera=["pca"])
+def rel_3_inv_3_corrige(m,erros,invs,alteracoes):
+    rel_3_inv_3_fix(m.allClasses,erros,alteracoes=alteracoes)
+
+
+def rel_4_inv_2_fix(allClasses,erros: list[ErroInv],alteracoes: Alteracoes = None):
     """
     Faz a correção das falhas do invariante rel_4_inv_2.
     """
 
+    if alteracoes is None:
+        alteracoes = Alteracoes()
+
     errFixed = 0
     errFailed = 0
     logger.info("Correção do invariante rel_4_inv_2")
@@ -263,6 +314,7 @@ def rel_4_inv_2_fix(allClasses,erros: list[ErroInv]):
                         crit["procRefs"] = procRefs
                         break
                 err.fix(f"O processo <b>{err.info["proc"]}</b> foi adicionado no critério de justificação <b>{critCod}</b> do DF do processo <b>{err.cod}</b>")
+                alteracoes.registar(err.cod,"df")
                 errFixed += 1
 
             # Se ainda não existe um critério do tipo "densidade",
@@ -280,6 +332,7 @@ def rel_4_inv_2_fix(allClasses,erros: list[ErroInv]):
                 # Caso a justificação não exista
                 df["justificacao"] = just
                 err.fix(f"Um novo critério de densidade da justificação do DF do processo <b>{err.cod}</b> foi gerado automaticamente com o código <b>{critCod}</b>. O processo <b>{err.info["proc"]}</b> foi adicionado ao critério criado.")
+                alteracoes.registar(err.cod,"df")
                 errFixed += 1
         else:
             err.fail(f"O processo <b>{err.cod}</b> não tem DF")
@@ -289,11 +342,19 @@ def rel_4_inv_2_fix(allClasses,erros: list[ErroInv]):
     logger.info(f"Falharam {errFailed} correções do invariante rel_4_inv_2")
 
 
-def rel_5_inv_2_fix(allClasses,erros: list[ErroInv]):
+@corrige("rel_4_inv_2",altera=["df"])
+def rel_4_inv_2_corrige(m,erros,invs,alteracoes):
+    rel_4_inv_2_fix(m.allClasses,erros,alteracoes=alteracoes)
+
+
+def rel_5_inv_2_fix(allClasses,erros: list[ErroInv],alteracoes: Alteracoes = None):
     """
     Faz a correção das falhas do invariante rel_5_inv_2.
     """
 
+    if alteracoes is None:
+        alteracoes = Alteracoes()
+
     errFixed = 0
     errFailed = 0
     logger.info("Correção do invariante rel_5_inv_2")
@@ -333,6 +394,7 @@ def rel_5_inv_2_fix(allClasses,erros: list[ErroInv]):
                         crit["procRefs"] = procRefs
                         break
                 err.fix(f"O processo <b>{err.info["proc"]}</b> foi adicionado no critério de justificação <b>{critCod}</b> do DF do processo <b>{err.cod}</b>")
+                alteracoes.registar(err.cod,"df")
                 errFixed += 1
 
             # Se ainda não existe um critério do tipo "complementaridade",
@@ -350,6 +412,7 @@ def rel_5_inv_2_fix(allClasses,erros: list[ErroInv]):
                 # Caso a justificação não exista
                 df["justificacao"] = just
                 err.fix(f"Um novo critério de complementaridade da justificação do DF do processo <b>{err.cod}</b> foi gerado automaticamente com o código <b>{critCod}</b>. O processo <b>{err.info["proc"]}</b> foi adicionado ao critério criado.")
+                alteracoes.registar(err.cod,"df")
                 errFixed += 1
         else:
             err.fail(f"O processo <b>{err.cod}</b> não tem DF")
@@ -359,69 +422,74 @@ def rel_5_inv_2_fix(allClasses,erros: list[ErroInv]):
     logger.info(f"Falharam {errFailed} correções do invariante rel_5_inv_2")
 
 
-def rel_1_inv_3_fix(termosIndice,erros: list[ErroInv]):
+@corrige("rel_5_inv_2",altera=["df"])
+def rel_5_inv_2_corrige(m,erros,invs,alteracoes):
+    rel_5_inv_2_fix(m.allClasses,erros,alteracoes=alteracoes)
+
+
+def rel_1_inv_3_fix(termosIndice: IndiceTermos,erros: list[ErroInv],alteracoes: Alteracoes = None):
     """
     Faz a correção das falhas do invariante rel_1_inv_3.
     """
 
+    if alteracoes is None:
+        alteracoes = Alteracoes()
+
     errFixed = 0
     errFailed = 0
     logger.info("Correção do invariante rel_1_inv_3")
     for err in erros:
         # Formulação do novo termo índice
-        termo = {
-            "codigo" : err.info["filho"],
-            "termo": err.info["termo"]
-        }
-        termosIndice.append(termo)
+        termosIndice.adicionar(err.info["filho"],err.info["termo"])
         err.fix(f"O termo índice \"<b>{err.info["termo"]}</b>\" foi adicionado ao processo <b>{err.info["filho"]}</b>")
+        alteracoes.registar(err.info["filho"],"termosIndice")
         errFixed += 1
 
     logger.info(f"Foram corrigidas {errFixed} falhas do invariante rel_1_inv_3")
     logger.info(f"Falharam {errFailed} correções do invariante rel_1_inv_3")
 
 
-def rel_8_inv_6_fix(allClasses,erros: list[ErroInv],invs):
+@corrige("rel_1_inv_3",altera=["termosIndice"])
+def rel_1_inv_3_corrige(m,erros,invs,alteracoes):
+    rel_1_inv_3_fix(m.termosIndice,erros,alteracoes=alteracoes)
+
+
+def rel_8_inv_6_fix(allClasses,erros: list[ErroInv],invs,grafo: GrafoRelacoes = None,deps=None):
     """
     Faz a correção das falhas do invariante rel_8_inv_6.
+
+    A correção é só simulada: a relação é acrescentada numa
+    `Transacao` para verificar se violaria outros invariantes,
+    mas não chega a `allClasses`.
     """
 
-    deps = [
-        "rel_1_inv_6",
-        "rel_2_inv_8",
-        "rel_2_inv_9",
-        "rel_5_inv_1",
-        "rel_5_inv_2",
-        "rel_8_inv_1"
-    ]
+    if deps is None:
+        deps = invariantes["rel_8_inv_6"].verifica
 
     logger.info("Correção do invariante rel_8_inv_6")
     errFixed = 0
     errFailed = 0
 
+    transacao = Transacao(allClasses,grafo)
+    motor = check.MotorInvariantes(transacao,grafo=transacao.grafo)
     for err in erros:
-        # Verificação dos erros já existentes na classe,
-        # antes da correção
-        c = allClasses[err.cod]
-        classesTestBefore = {err.cod: c}
-        codFilhos = c.get("filhos",[])
-        for f in codFilhos:
-            classesTestBefore[f] = allClasses.get(f,{})
-        repBefore = testDepends(deps,classesTestBefore)
-
-        # Aplicação da correção numa cópia da classe
-        classeCopy = copy.deepcopy(allClasses[err.cod])
-        proRelCods = classeCopy.get("processosRelacionados",[])
-        proRels = classeCopy.get("proRel",[])
+        # Verificação dos erros já existentes nas classes
+        # da relação, antes da correção
+        cods = classesRelacao(transacao,err)
+        repBefore = testDepends(deps,motor,cods)
+
+        # Aplicação provisória da correção
+        classe = transacao[err.cod]
+        proRelCods = classe.get("processosRelacionados") or []
+        proRels = classe.get("proRel") or []
         if len(proRelCods) == len(proRels):
-            proRelCods.append(err.info["proc"])
-            proRels.append("eComplementarDe")
+            transacao.adicionarRelacao(err.cod,"eComplementarDe",err.info["proc"])
 
             # Verificação dos erros depois de aplicar a correção
-            classesTestAfter = {err.cod: classeCopy}
-            repAfter = testDepends(deps,classesTestAfter)
+            repAfter = testDepends(deps,motor,cods)
             diff = diffReports(repBefore,repAfter)
 
+            transacao.rollback()
             if diff:
                 invDesc = []
                 for i in diff:
@@ -441,42 +509,54 @@ def rel_8_inv_6_fix(allClasses,erros: list[ErroInv],invs):
     logger.info(f"Falharam {errFailed} correções do invariante rel_8_inv_6")
 
 
-def rel_8_inv_7_fix(allClasses,erros: list[ErroInv],invs):
+@corrige("rel_8_inv_6",verifica=[
+    "rel_1_inv_6",
+    "rel_2_inv_8",
+    "rel_2_inv_9",
+    "rel_5_inv_1",
+    "rel_5_inv_2",
+    "rel_8_inv_1"
+])
+def rel_8_inv_6_corrige(m,erros,invs,alteracoes):
+    rel_8_inv_6_fix(m.allClasses,erros,invs,m.grafo)
+
+
+def rel_8_inv_7_fix(allClasses,erros: list[ErroInv],invs,grafo: GrafoRelacoes = None,deps=None):
     """
     Faz a correção das falhas do invariante rel_8_inv_7.
+
+    A correção é só simulada: a relação é acrescentada numa
+    `Transacao` para verificar se violaria outros invariantes,
+    mas não chega a `allClasses`.
     """
 
-    deps = [
-        "rel_2_inv_7",
-        "rel_2_inv_8",
-        "rel_2_inv_9",
-        "rel_3_inv_1",
-        "rel_3_inv_2"
-    ]
+    if deps is None:
+        deps = invariantes["rel_8_inv_7"].verifica
 
     logger.info("Correção do invariante rel_8_inv_7")
     errFixed = 0
     errFailed = 0
 
+    transacao = Transacao(allClasses,grafo)
+    motor = check.MotorInvariantes(transacao,grafo=transacao.grafo)
     for err in erros:
-        # Verificação dos erros já existentes na classe,
-        # antes da correção
-        classesTestBefore = {err.cod: allClasses[err.cod]}
-        repBefore = testDepends(deps,classesTestBefore)
-
-        # Aplicação da correção numa cópia da classe
-        classeCopy = copy.deepcopy(allClasses[err.cod])
-        proRelCods = classeCopy.get("processosRelacionados",[])
-        proRels = classeCopy.get("proRel",[])
+        # Verificação dos erros já existentes nas classes
+        # da relação, antes da correção
+        cods = classesRelacao(transacao,err)
+        repBefore = testDepends(deps,motor,cods)
+
+        # Aplicação provisória da correção
+        classe = transacao[err.cod]
+        proRelCods = classe.get("processosRelacionados") or []
+        proRels = classe.get("proRel") or []
         if len(proRelCods) == len(proRels):
-            proRelCods.append(err.info["proc"])
-            proRels.append("eSuplementoPara")
+            transacao.adicionarRelacao(err.cod,"eSuplementoPara",err.info["proc"])
 
             # Verificação dos erros depois de aplicar a correção
-            classesTestAfter = {err.cod: classeCopy}
-            repAfter = testDepends(deps,classesTestAfter)
+            repAfter = testDepends(deps,motor,cods)
             diff = diffReports(repBefore,repAfter)
 
+            transacao.rollback()
             if diff:
                 invDesc = []
                 for i in diff:
@@ -496,25 +576,47 @@ def rel_8_inv_7_fix(allClasses,erros: list[ErroInv],invs):
     logger.info(f"Falharam {errFailed} correções do invariante rel_8_inv_7")
 
 
-def testDepends(deps,classes):
+@corrige("rel_8_inv_7",verifica=[
+    "rel_2_inv_7",
+    "rel_2_inv_8",
+    "rel_2_inv_9",
+    "rel_3_inv_1",
+    "rel_3_inv_2"
+])
+def rel_8_inv_7_corrige(m,erros,invs,alteracoes):
+    rel_8_inv_7_fix(m.allClasses,erros,invs,m.grafo)
+
+
+def classesRelacao(allClasses,err: ErroInv):
+    """
+    Classes envolvidas na relação acrescentada pela correção
+    de `err`: o processo `err.cod` e o processo relacionado
+    (`proc`). As duas têm de ser verificadas, porque algumas
+    falhas (por exemplo, as relações antissimétricas) só são
+    registadas numa das pontas da relação.
+    """
+    cods = [err.codBruto]
+    proc = err.infoBruto.get("proc")
+    if proc != err.codBruto and proc in allClasses:
+        cods.append(proc)
+    return cods
+
+
+def testDepends(deps,motor,cods):
     """
     Faz a verificação dos invariantes em `deps`
-    para `classes` e retorna um Report com os
-    erros encontrados.
+    apenas para as classes `cods` e retorna um
+    Report com os erros encontrados.
+
+    As classes relacionadas são consultadas em
+    `motor.allClasses`, que durante a simulação
+    de uma correção é uma `Transacao`.
     """
 
-    # Desabilitação temporária dos logs
-    loggerInv = logging.getLogger(INV)
-    loggerInv.disabled = True
     rep = Report()
+    falhas = motor.percorrer(deps,cods,finais=False)
     for dep in deps:
-        # Não funciona para alguns invariantes
-        # que não recebem estes argumentos, está
-        # muito hardcoded
-        func = getattr(check,dep)
-        func(classes,rep)
-    # Reabilitação dos logs
-    loggerInv.disabled = False
+        falhas[dep].registaEm(rep)
     return rep
 
 
@@ -526,15 +628,19 @@ def diffReports(repBefore: Report, repAfter: Report):
 
     Retorna a lista de invariantes que seriam
     violados caso as alterações fossem aplicadas.
+
+    As falhas são comparadas pela sua chave (`ErroInv.chave`),
+    sem gerar as mensagens de erro.
     """
 
-    invs = set()
-    errosInvItems = repBefore.globalErrors["erroInv"].items()
-    errInvBefore = {k:set([x.msg for x in v]) for k,v in errosInvItems}
+    invs = []
+    errInvBefore = set()
+    for err in repBefore.globalErrors["erroInv"].values():
+        errInvBefore.update(e.chave() for e in err)
     for inv, err in repAfter.globalErrors["erroInv"].items():
         for e in err:
-            if e.msg not in errInvBefore:
-                invs.add(inv)
+            if e.chave() not in errInvBefore:
+                invs.append(inv)
                 break
     return invs
 
@@ -0,0 +1,216 @@
+import os
+import pickle
+from .report import Report, FixStatus
+from .genHTML import generate_classe_table_dict, generate_error_table, generate_warnings_table
+from utils.workspace_utils import Workspace, PADRAO
+
+# Ficheiro, na diretoria dos dumps, onde é guardado o Report da migração
+REPORT_FILE = "report.pkl"
+
+# Tipos dos erros e dos warnings, pela ordem em que aparecem no relatório
+TIPOS_ERROS = ["grave", "normal", "catalogo", "invariante"]
+TIPOS_WARNINGS = ["normal", "relHarmonizacao", "harmonizacao", "inferencias"]
+
+ESTADOS = {
+    FixStatus.FIXED: "corrigido",
+    FixStatus.FAILED: "falhou",
+    FixStatus.UNFIXED: None
+}
+
+
+def guardaReport(rep: Report,invs,ws: Workspace = PADRAO):
+    """
+    Guarda o Report `rep` da migração, e a descrição dos
+    invariantes `invs`, no workspace `ws`, para que o relatório
+    possa ser consultado depois da migração terminar.
+    """
+    with open(os.path.join(ws.dumpDir,REPORT_FILE),"wb") as f:
+        pickle.dump({"rep": rep, "invs": invs},f,protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def carregaRelatorio(ws: Workspace = PADRAO):
+    """
+    Relatorio do Report guardado no workspace `ws` por `guardaReport`.
+    """
+    with open(os.path.join(ws.dumpDir,REPORT_FILE),"rb") as f:
+        dados = pickle.load(f)
+    return Relatorio(dados["rep"],dados["invs"])
+
+
+def getClasse(cod,decls):
+    # A classe de nível 1 é a folha da primeira declaração
+    # do processo, tal como nas tabelas HTML
+    if sheets := decls.get(cod):
+        return sheets[0].replace("_csv","")
+    return cod[:3]
+
+
+class Relatorio:
+    """
+    Versão estruturada do Report de uma migração: uma lista de
+    erros e uma de warnings, uma linha por erro, com as contagens
+    por tipo, por classe de nível 1 e por invariante. As listas
+    podem ser filtradas e consultadas por páginas (`pagina`), em
+    vez de ser gerada uma só tabela HTML com todos os erros.
+
+    Cada erro tem o `tipo` (grave, normal, catalogo ou invariante),
+    o `subtipo` (o tipo do erro grave, o catálogo ou o invariante),
+    a `classe` de nível 1 (None nos erros de catálogo), o código
+    (`cod`), se é `inativo`, a `mensagem` (em HTML, tal como nas
+    tabelas) e, nos invariantes, o `estado` da correção automática
+    e a respetiva mensagem (`correcao`).
+    """
+
+    def __init__(self,rep: Report,invs):
+        self.rep = rep
+        self.invs = invs
+        self.erros = []
+        self.warnings = []
+        self.classes = {cod: {"titulo": c["titulo"], "erros": 0} for cod,c in rep.classesN1.items()}
+        self.invariantes = {}
+        self.tipos = {t: 0 for t in TIPOS_ERROS}
+        self.tiposWarnings = {t: len(rep.warnings[t]) for t in TIPOS_WARNINGS}
+
+        globalErrors = rep.globalErrors
+        decls = rep.declaracoes
+
+        for cod, files in globalErrors["grave"]["declsRepetidas"].items():
+            self.addErro("grave","declsRepetidas",getClasse(cod,decls),cod,
+                         f"Código declarado mais do que uma vez, nas folhas <b>{', '.join(files)}</b>")
+
+        for cod, rels in globalErrors["grave"]["relsInvalidas"].items():
+            for rel in rels:
+                if rel[2]:
+                    msg = f"O processo <span class='error-critical'><b>{cod}</b></span> é inválido e é referenciado na justificação do {rel[2].upper()} do processo <b>{rel[0]}</b>."
+                else:
+                    msg = f"A relação <b>{rel[0]}</b> <b><i>{rel[1]}</b></i> <span class='error-critical'><b>{cod}</b></span>, declarada na zona de contexto do processo <b>{rel[0]}</b>, é inválida."
+                self.addErro("grave","relsInvalidas",getClasse(rel[0],decls),rel[0],msg)
+
+        for cod, msgs in globalErrors["grave"]["outro"].items():
+            for msg in msgs:
+                self.addErro("grave","outro",getClasse(cod,decls),cod,msg)
+
+        for cod, msgs in globalErrors["normal"].items():
+            for msg in msgs:
+                self.addErro("normal",None,getClasse(cod,decls),cod,msg)
+
+        for catalogo, msgs in globalErrors["catalogo"].items():
+            for msg in msgs:
+                self.addErro("catalogo",catalogo,None,None,msg)
+
+        for inv, erros in globalErrors["erroInv"].items():
+            invariante = self.invs.get(inv, {"desc": "Sem descrição", "clarificacao": ""})
+            contagem = {"desc": invariante["desc"], "clarificacao": invariante["clarificacao"],
+                        "erros": 0, "corrigidos": 0, "falhados": 0}
+            self.invariantes[inv] = contagem
+            for err in erros:
+                # Tal como no `Report.addErroInv`, a classe só é
+                # conhecida se o processo tiver sido declarado
+                sheets = decls.get(err.codBruto)
+                classe = sheets[0].replace("_csv","") if sheets else None
+                estado = ESTADOS[err.fixStatus]
+                self.addErro("invariante",inv,classe,err.codBruto,err.msg,estado,err.fixMsg or None)
+                contagem["erros"] += 1
+                if estado == "corrigido":
+                    contagem["corrigidos"] += 1
+                elif estado == "falhou":
+                    contagem["falhados"] += 1
+
+        for tipo in TIPOS_WARNINGS:
+            for msg in rep.warnings[tipo]:
+                self.warnings.append({"tipo": tipo, "mensagem": msg})
+
+
+    def addErro(self,tipo,subtipo,classe,cod,msg,estado=None,correcao=None):
+        self.erros.append({
+            "tipo": tipo,
+            "subtipo": subtipo,
+            "classe": classe,
+            "cod": cod,
+            "inativo": cod in self.rep.inativos,
+            "mensagem": msg,
+            "estado": estado,
+            "correcao": correcao
+        })
+        self.tipos[tipo] += 1
+        if classe in self.classes:
+            self.classes[classe]["erros"] += 1
+
+
+    def resumo(self):
+        """
+        Contagens dos erros (por tipo, por classe de nível 1
+        e por invariante) e dos warnings (por tipo).
+        """
+        return {
+            "erros": len(self.erros),
+            "tipos": self.tipos,
+            "classes": self.classes,
+            "invariantes": self.invariantes,
+            "warnings": len(self.warnings),
+            "tiposWarnings": self.tiposWarnings
+        }
+
+
+    def filtrarErros(self,tipo=None,subtipo=None,classe=None,cod=None,estado=None,texto=None):
+        """
+        Erros que satisfazem todos os filtros dados: `cod` filtra
+        pelo início do código e `texto` procura na mensagem (sem
+        distinguir maiúsculas de minúsculas).
+        """
+        texto = texto.lower() if texto else None
+        for err in self.erros:
+            if tipo and err["tipo"] != tipo:
+                continue
+            if subtipo and err["subtipo"] != subtipo:
+                continue
+            if classe and err["classe"] != classe:
+                continue
+            if cod and not (err["cod"] or "").startswith(cod):
+                continue
+            if estado and err["estado"] != estado:
+                continue
+            if texto and texto not in err["mensagem"].lower():
+                continue
+            yield err
+
+
+    def filtrarWarnings(self,tipo=None,texto=None):
+        texto = texto.lower() if texto else None
+        for w in self.warnings:
+            if tipo and w["tipo"] != tipo:
+                continue
+            if texto and texto not in w["mensagem"].lower():
+                continue
+            yield w
+
+
+    def tabelasHTML(self):
+        """
+        Tabelas HTML do relatório, tal como eram devolvidas
+        pela aplicação web antes do relatório estruturado.
+        """
+        rep = self.rep
+        return {
+            "table_by_classe": generate_classe_table_dict(
+                rep.globalErrors, rep.classesN1, rep.inativos, rep.declaracoes, self.invs
+            ),
+            "table_all_errors": generate_error_table(rep.globalErrors, rep.inativos, self.invs),
+            "warnings": generate_warnings_table(rep.warnings)
+        }
+
+
+def pagina(linhas,numero,tamanho):
+    """
+    Página `numero` (a começar em 1) das `linhas`, com `tamanho`
+    linhas por página, e o total de linhas.
+    """
+    linhas = list(linhas)
+    inicio = (numero - 1) * tamanho
+    return {
+        "total": len(linhas),
+        "pagina": numero,
+        "tamanho": tamanho,
+        "paginas": max(1, -(-len(linhas) // tamanho)),
+        "linhas": linhas[inicio:inicio + tamanho]
+    }
@@ -1,7 +1,8 @@
 import json
+import copy
 import html
 import os
-from utils.path_utils import DUMP_DIR
+from utils.workspace_utils import Workspace, PADRAO
 import logging
 from utils.log_utils import PROC
 from enum import Enum
@@ -168,7 +169,8 @@ class Report:
         # Verifica a existência de erros "graves" no código.
         ok = True
         logger = logging.getLogger(PROC)
-        repetidas = {k:set(v) for k,v in self.declaracoes.items() if len(v)>1}
+        # Folhas sem repetidos, pela ordem das declarações
+        repetidas = {k:list(dict.fromkeys(v)) for k,v in self.declaracoes.items() if len(v)>1}
         if repetidas:
             self.globalErrors["grave"]["declsRepetidas"] = repetidas
             ok = False
@@ -199,7 +201,17 @@ class Report:
         entradas iguais, depende sempre do invariante.
         """
 
-        err = ErroInv(inv,cod,info,extra)
+        self.addErroInv(ErroInv(inv,cod,info,extra))
+
+
+    def addErroInv(self,err):
+        """
+        Regista em `rep` uma falha de invariante já criada
+        (`err`), indexada tal como no `addFalhaInv`.
+        """
+
+        inv = err.inv
+        cod = err.codBruto
         # Aqui consulta-se sempre o self.declaracoes caso o
         # código esteja com um formato inválido para saber
         # onde a classe foi declarada. Neste caso só olhamos
@@ -231,13 +243,88 @@ class Report:
                 self.warnings["normal"].append(info["msg"])
 
 
-    def dumpReport(self,dumpFileName="dump.json"):
+    def merge(self,other):
+        """
+        Junta ao `rep` o conteúdo de outro Report (`other`),
+        como se os registos de `other` tivessem sido feitos
+        diretamente neste, depois dos que já cá existem.
+
+        Serve para juntar os Reports parciais produzidos em
+        paralelo. Para o resultado ser determinístico, os
+        fragmentos devem ser juntos sempre pela mesma ordem.
+        """
+
+        def mergeDict(dest,orig):
+            # {chave: [valores]}, as listas são concatenadas
+            for k,v in orig.items():
+                if k in dest:
+                    dest[k].extend(v)
+                else:
+                    dest[k] = list(v)
+
+        mergeDict(self.declaracoes,other.declaracoes)
+        for tipo,rels in other.missingRels.items():
+            self.missingRels[tipo].extend(rels)
+
+        grave = self.globalErrors["grave"]
+        otherGrave = other.globalErrors["grave"]
+        grave["declsRepetidas"].update(otherGrave["declsRepetidas"])
+        mergeDict(grave["relsInvalidas"],otherGrave["relsInvalidas"])
+        mergeDict(grave["outro"],otherGrave["outro"])
+        mergeDict(self.globalErrors["normal"],other.globalErrors["normal"])
+        mergeDict(self.globalErrors["erroInv"],other.globalErrors["erroInv"])
+        for ent,errosInv in other.globalErrors["erroInvByCod"].items():
+            mergeDict(self.globalErrors["erroInvByCod"].setdefault(ent,{}),errosInv)
+        for catalogo,msgs in other.globalErrors["catalogo"].items():
+            self.globalErrors["catalogo"][catalogo].extend(msgs)
+
+        for tipo,msgs in other.warnings.items():
+            self.warnings[tipo].extend(msgs)
+        self.inativos.update(other.inativos)
+        self.classesN1.update(other.classesN1)
+
+
+    def reportParcial(self):
+        """
+        Cria um Report vazio para registar falhas de invariantes
+        noutro processo. Tem as mesmas declarações e classes de
+        nível 1 que `rep`, necessárias ao `addFalhaInv`.
+        """
+
+        parcial = Report()
+        parcial.declaracoes = self.declaracoes
+        for ent in self.globalErrors["erroInvByCod"]:
+            parcial.globalErrors["erroInvByCod"][ent] = {}
+        return parcial
+
+
+    def mergeErroInv(self,other,inv):
+        """
+        Junta ao `rep` as falhas do invariante `inv` registadas
+        noutro Report (`other`), depois das que já cá existem.
+
+        Ao contrário do `merge`, junta um só invariante, para que
+        as falhas de vários Reports parciais possam ser juntas
+        invariante a invariante, pela mesma ordem que teriam se
+        tivessem sido registadas todas no mesmo Report.
+        """
+
+        erros = other.globalErrors["erroInv"].get(inv)
+        if erros:
+            self.globalErrors["erroInv"].setdefault(inv,[]).extend(erros)
+        for ent,errosInv in other.globalErrors["erroInvByCod"].items():
+            if inv in errosInv:
+                byCod = self.globalErrors["erroInvByCod"].setdefault(ent,{})
+                byCod.setdefault(inv,[]).extend(errosInv[inv])
+
+
+    def dumpReport(self,dumpFileName="dump.json",ws: Workspace = PADRAO):
         report = {}
         report["globalErrors"] = self.globalErrors
         report["warnings"] = self.warnings
         logger = logging.getLogger(PROC)
 
-        dumpPath = os.path.join(DUMP_DIR, dumpFileName)
+        dumpPath = os.path.join(ws.dumpDir, dumpFileName)
         try:
             logger.info(f"Criação do dump do relatório de erros: {dumpPath}")
             with open(dumpPath,'w',encoding='utf-8') as f:
@@ -245,10 +332,10 @@ class Report:
         except Exception:
             logger.exception(f"Criação do dump do relatório de erros falhou")
 
-    def dumpClasses(self,allClasses,dumpFileName="allClasses.json"):
+    def dumpClasses(self,allClasses,dumpFileName="allClasses.json",ws: Workspace = PADRAO):
 
         logger = logging.getLogger(PROC)
-        dumpPath = os.path.join(DUMP_DIR, dumpFileName)
+        dumpPath = os.path.join(ws.dumpDir, dumpFileName)
         try:
             logger.info(f"Criação do dump das classes: {dumpPath}")
             with open(dumpPath,'w',encoding='utf-8') as f:
@@ -263,15 +350,78 @@ class FixStatus(Enum):
 
 
 class ErroInv:
+    """
+    Falha de um invariante. Só são guardados os dados tal como
+    foram registados (`codBruto`, `infoBruto`, `extraBruto`): o
+    `cod`, o `info` e o `extra` são escapados para html e a mensagem
+    (`msg`) é gerada só quando são consultados pela primeira vez,
+    ficando guardados a partir daí.
+    """
+
+    __slots__ = ("inv","codBruto","infoBruto","extraBruto","fixStatus","fixMsg","codEscapado","infoEscapado","extraEscapado","mensagem")
 
     def __init__(self,inv,cod,info,extra):
         self.inv = inv
-        self.cod = html.escape(cod)
-        self.info = self.escapeAllHtml(info)
-        self.extra = html.escape(extra)
+        self.codBruto = cod
+        self.infoBruto = info
+        self.extraBruto = extra
         self.fixStatus = FixStatus.UNFIXED
         self.fixMsg = ""
-        self.msg = self.errorMsg()
+        self.codEscapado = None
+        self.infoEscapado = None
+        self.extraEscapado = None
+        self.mensagem = None
+
+
+    @property
+    def cod(self):
+        if self.codEscapado is None:
+            self.codEscapado = html.escape(self.codBruto)
+        return self.codEscapado
+
+
+    @property
+    def info(self):
+        if self.infoEscapado is None:
+            self.infoEscapado = self.escapeAllHtml(self.infoBruto)
+        return self.infoEscapado
+
+
+    @property
+    def extra(self):
+        if self.extraEscapado is None:
+            self.extraEscapado = html.escape(self.extraBruto)
+        return self.extraEscapado
+
+
+    @property
+    def msg(self):
+        if self.mensagem is None:
+            self.mensagem = self.errorMsg()
+        return self.mensagem
+
+
+    def chave(self):
+        """
+        Chave que identifica a falha (invariante, código e dados
+        registados), para comparar falhas sem gerar as mensagens.
+        """
+        return (self.inv,self.codBruto,congelar(self.infoBruto),self.extraBruto)
+
+
+    def dados(self):
+        """
+        Conteúdo da falha, tal como é escrito nos dumps.
+        """
+        return {
+            "inv": self.inv,
+            "cod": self.cod,
+            "info": self.info,
+            "extra": self.extra,
+            "fixStatus": self.fixStatus,
+            "fixMsg": self.fixMsg,
+            "msg": self.msg
+        }
 
 
     def escapeAllHtml(self,data):
@@ -287,6 +437,17 @@ class ErroInv:
             return data
 
 
+    def copia(self):
+        """
+        Cópia do erro por corrigir, para ser registada
+        noutro Report.
+        """
+        err = copy.copy(self)
+        err.fixStatus = FixStatus.UNFIXED
+        err.fixMsg = ""
+        return err
+
+
     def fix(self, fixMsg):
         self.fixStatus = FixStatus.FIXED
         self.fixMsg = fixMsg
@@ -451,8 +612,26 @@ class ErroInv:
         return msg
 
 
+def congelar(data):
+    """
+    Versão imutável (e por isso comparável e usável em
+    conjuntos) de `data`, com dicionários, listas e
+    conjuntos convertidos em tuplos e `frozenset`s.
+    """
+    if isinstance(data, dict):
+        return tuple((k, congelar(v)) for k, v in data.items())
+    elif isinstance(data, (list, tuple)):
+        return tuple(congelar(item) for item in data)
+    elif isinstance(data, (set, frozenset)):
+        return frozenset(congelar(item) for item in data)
+    else:
+        return data
+
+
 class CustomEncoder(json.JSONEncoder):
     def default(self, obj):
+        if isinstance(obj, ErroInv):
+            return obj.dados()
         if isinstance(obj, Enum):
             return obj.name
         if isinstance(obj, (set, frozenset)):
@@ -0,0 +1,114 @@
+import logging
+from utils.log_utils import INV
+from .report import Report
+from .motor import MotorInvariantes, invariantes
+
+logger = logging.getLogger(INV)
+
+
+class Alteracoes:
+    """
+    Registo das alterações feitas pelas correções automáticas
+    (`queryfix`): para cada classe, os campos que foram alterados
+    ("pca", "df", "legislacao", "proRel", "termosIndice").
+    """
+
+    def __init__(self):
+        self.campos = {} # {"100.10.001": {"pca","df"}}
+
+
+    def registar(self,cod,campo):
+        self.campos.setdefault(cod,set()).add(campo)
+
+
+    def alterados(self):
+        """
+        Conjunto de todos os campos alterados.
+        """
+        campos = set()
+        for c in self.campos.values():
+            campos.update(c)
+        return campos
+
+
+    def afetadas(self,motor: MotorInvariantes):
+        """
+        Classes cujos invariantes podem ter mudado de resultado:
+        as classes alteradas, os seus pais e filhos e os processos
+        com que estão relacionadas (e os pais e filhos destes).
+        """
+
+        hier = motor.hier
+        grafo = motor.grafo
+
+        def familia(cod):
+            fam = {cod}
+            if pai := hier.pai(cod):
+                fam.add(pai)
+            fam.update(hier.filhos(cod))
+            return fam
+
+        afetadas = set()
+        for cod in self.campos:
+            afetadas.update(familia(cod))
+            for viz in grafo.vizinhos(cod):
+                afetadas.update(familia(viz))
+        return {cod for cod in afetadas if cod in motor.allClasses}
+
+
+    def __len__(self):
+        return len(self.campos)
+
+
+    def __bool__(self):
+        return bool(self.campos)
+
+
+def revalidar(motor: MotorInvariantes,nomes,repAntes: Report,alteracoes: Alteracoes):
+    """
+    Volta a verificar os invariantes `nomes` depois das correções,
+    e devolve um novo Report com as falhas que ficaram.
+
+    Só são verificados de novo os invariantes que dependem de
+    algum dos campos alterados e, desses, só nas classes afetadas
+    pelas alterações. As restantes falhas são copiadas de `repAntes`
+    (a verificação antes das correções), por isso o custo depende
+    do tamanho das alterações e não do número de classes.
+    """
+
+    rep = repAntes.reportParcial()
+    campos = alteracoes.alterados()
+    afetados = [n for n in nomes if invariantes[n].campos & campos]
+    afetadas = alteracoes.afetadas(motor)
+    posicao = motor.posicao
+    cods = sorted(afetadas,key=posicao.get)
+
+    logger.info(f"Revalidação de {len(afetados)} invariantes em {len(cods)} classes afetadas pelas correções")
+    falhas = motor.percorrer(afetados,cods,finais=False)
+    falhas.update(motor.percorrer([n for n in afetados if invariantes[n].tipo == "final"],cods=[]))
+
+    errosAntes = repAntes.globalErrors["erroInv"]
+    for nome in nomes:
+        antes = errosAntes.get(nome,[])
+        if nome not in falhas:
+            for err in antes:
+                rep.addErroInv(err.copia())
+            continue
+
+        novas = falhas[nome].erros()
+
+        if invariantes[nome].tipo == "final":
+            erros = novas
+        else:
+            # As falhas das classes não afetadas mantêm-se e
+            # as restantes são substituídas pelas novas, tudo
+            # pela ordem de `allClasses`
+            mantidas = [err.copia() for err in antes if err.codBruto not in afetadas]
+            erros = sorted(mantidas + novas,key=lambda err: posicao.get(err.codBruto,-1))
+        for err in erros:
+            rep.addErroInv(err)
+
+    for nome in afetados:
+        n = len(rep.globalErrors["erroInv"].get(nome,[]))
+        logger.info(f"Foram encontradas {n} falhas no invariante {nome} depois das correções")
+    return rep
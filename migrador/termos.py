@@ -0,0 +1,74 @@
+import re
+
+# Códigos das classes de nível 3 ("100.10.001")
+n3 = re.compile(r'^\d{3}\.\d{1,3}\.\d{1,3}$')
+
+
+class IndiceTermos:
+    """
+    Índice dos termos de índice (`ti.json`), construído uma
+    única vez a partir da lista de termos:
+
+    * `termosDe`: os termos de cada código, pela ordem em que
+    aparecem na lista (com repetições);
+    * `conjuntoDe`: o conjunto dos termos de cada código, para
+    verificar em O(1) se um código tem um termo;
+    * `codigosDe`: os códigos de cada termo;
+    * `classes3De`: os códigos de nível 3 de cada termo.
+
+    Os termos já chegam normalizados da extração (`tindice`),
+    por isso são indexados tal como estão em `ti.json`.
+
+    A lista original é mantida em `termos`. Os termos
+    acrescentados depois de o índice ter sido construído
+    devem ser registados com `adicionar`.
+    """
+
+    def __init__(self,termosIndice=()):
+        self.termos = [] # [{"codigo": "100.10.001", "termo": "..."}]
+        self.termosDe = {} # {"100.10.001": ["termo1","termo2"]}
+        self.conjuntoDe = {} # {"100.10.001": {"termo1","termo2"}}
+        self.codigosDe = {} # {"termo1": {"100.10.001","100.10.001.01"}}
+        self.classes3De = {} # {"termo1": {"100.10.001"}}
+        for t in termosIndice:
+            self.indexar(t)
+
+
+    def indexar(self,t):
+        cod = t["codigo"]
+        termo = t["termo"]
+        self.termos.append(t)
+        self.termosDe.setdefault(cod,[]).append(termo)
+        self.conjuntoDe.setdefault(cod,set()).add(termo)
+        self.codigosDe.setdefault(termo,set()).add(cod)
+        if n3.fullmatch(cod):
+            self.classes3De.setdefault(termo,set()).add(cod)
+
+
+    def adicionar(self,cod,termo):
+        """
+        Acrescenta o termo `termo` ao código `cod`.
+        """
+        self.indexar({
+            "codigo" : cod,
+            "termo": termo
+        })
+
+
+    def termosDoCodigo(self,cod):
+        """
+        Termos do código `cod`, pela ordem da lista.
+        """
+        return self.termosDe.get(cod,[])
+
+
+    def temTermo(self,cod,termo):
+        return termo in self.conjuntoDe.get(cod,())
+
+
+    def __iter__(self):
+        return iter(self.termos)
+
+
+    def __len__(self):
+        return len(self.termos)
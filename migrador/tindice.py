@@ -1,36 +1,33 @@
-from itertools import islice
 import logging
-import pandas as pd
 import json
 import re
 import os
-from utils.path_utils import FILES_DIR
+from utils.workspace_utils import Workspace, PADRAO
 from utils.log_utils import PROC
+from .leitura import iterRows, limpaTexto
 
 brancos = re.compile(r'\r\n|\n|\r|[ \u202F\u00A0]+$|^[ \u202F\u00A0]+')
 
-def processSheet(sheet, nome):
+# Normalização vetorizada de um bloco de linhas da folha
+def normaliza(df):
+    limpaTexto(df, "Código", (brancos, ''))
+    limpaTexto(df, "Termo", (brancos, ''), todos=True)
+
+def processSheet(sheet, nome, ws: Workspace = PADRAO):
 
     loggerProc = logging.getLogger(PROC)
-    # Load one worksheet.
     fnome = nome.split("_")[0]
-    ws = sheet
-    data = ws.values
-    cols = next(data)[0:]
-    data = list(data)
-    idx = list(range(len(data)))
-    data = (islice(r, 0, None) for r in data)
-    df = pd.DataFrame(data, index=idx, columns=cols)
 
     myClasse = []
-    for _,row in df.iterrows():
+    # Leitura da folha linha a linha (modo streaming)
+    for row in iterRows(sheet, normaliza):
         myReg = {}
-        if row["Código"]:
-            myReg["codigo"] = brancos.sub('', str(row["Código"]))
-            myReg["termo"] = brancos.sub('', str(row["Termo"]))
+        if row["Código"] is not None:
+            myReg["codigo"] = row["Código"]
+            myReg["termo"] = row["Termo"]
             myClasse.append(myReg)
 
-    outFilePath = os.path.join(FILES_DIR, f"{fnome}.json")
+    outFilePath = os.path.join(ws.filesDir, f"{fnome}.json")
     outFile = open(outFilePath, "w", encoding="utf-8")
 
     json.dump(myClasse, outFile, indent = 4, ensure_ascii=False)
@@ -1,41 +1,39 @@
-from itertools import islice
 import logging
-import pandas as pd
 import json
 import re
 import os
-from utils.path_utils import FILES_DIR
+from utils.workspace_utils import Workspace, PADRAO
 from utils.log_utils import PROC
+from .catalogos import Catalogos
+from .leitura import iterRows, limpaTexto
 from .report import Report
 
 brancos = re.compile(r'\r\n|\n|\r|[ \u202F\u00A0]+$|^[ \u202F\u00A0]+')
 sepExtra = re.compile(r'#$|^#')
 
-def processSheet(sheet, rep: Report):
+# Normalização vetorizada de um bloco de linhas da folha
+def normaliza(df):
+    limpaTexto(df, "Sigla", (brancos, ''))
+    limpaTexto(df, "Designação", (brancos, ''))
+
+def processSheet(sheet, rep: Report, cat: Catalogos, ws: Workspace = PADRAO):
     loggerProc = logging.getLogger(PROC)
     loggerProc.info("# Migração do Catálogo de Tipologias -------------------")
-    # Load one worksheet.
-    ws = sheet
-    data = ws.values
-    cols = next(data)[0:]
-    data = list(data)
-    idx = list(range(len(data)))
-    data = (islice(r, 0, None) for r in data)
-    df = pd.DataFrame(data, index=idx, columns=cols)
+    # Leitura da folha linha a linha (modo streaming)
 
     tipCatalog = {}
     myTipologia = []
-    for index, row in df.iterrows():
+    for index, row in enumerate(iterRows(sheet, normaliza)):
         myReg = {}
-        if row['Sigla']:
-            myReg["sigla"] = brancos.sub('', row['Sigla'])
+        if row['Sigla'] is not None:
+            myReg["sigla"] = row['Sigla']
             if myReg["sigla"] not in tipCatalog:
                 tipCatalog[myReg["sigla"]] = [index+2]
             else:
                 tipCatalog[myReg["sigla"]].append(index+2)
 
-            if row["Designação"]:
-                myReg["designacao"] = brancos.sub('', row["Designação"])
+            if row["Designação"] is not None:
+                myReg["designacao"] = row["Designação"]
             else:
                 rep.addWarning(info={"msg":f"A tipologia <b>{myReg["sigla"]}</b> não tem designação definida."})
             myTipologia.append(myReg)
@@ -45,15 +43,12 @@ def processSheet(sheet, rep: Report):
             for l in linhas:
                 rep.addErroCatalogo(f"Linha {l}:Tipologia duplicada::<b>{sig}</b>.","tipologia")
 
-    outFilePath = os.path.join(FILES_DIR, "tip.json")
+    outFilePath = os.path.join(ws.filesDir, "tip.json")
     outFile = open(outFilePath, "w", encoding="utf-8")
     json.dump(myTipologia, outFile, indent = 4, ensure_ascii=False)
     loggerProc.info(f"Tipologias extraídas: {len(myTipologia)}")
     outFile.close()
-    catalogPath = os.path.join(FILES_DIR, "tipCatalog.json")
-
-    catalog = open(catalogPath, "w", encoding="utf-8")
-    json.dump(list(tipCatalog.keys()), catalog, indent = 4, ensure_ascii=False)
+    cat.tipologias = tipCatalog
     loggerProc.info("Catálogo de tipologias criado.")
     loggerProc.info("# FIM: Migração do Catálogo de Tipologias -----------------")
     return len(myTipologia)
\ No newline at end of file
@@ -0,0 +1,62 @@
+from collections.abc import Mapping
+from .grafo import GrafoRelacoes, GrafoSobreposto
+
+
+class Transacao(Mapping):
+    """
+    Camada de alterações provisórias sobre `allClasses`, usada
+    para simular uma correção antes de a aplicar.
+
+    Pode ser usada em vez de `allClasses` (é um `Mapping` com os
+    mesmos códigos): as classes alteradas são cópias superficiais
+    em que só as listas modificadas são copiadas, as restantes são
+    as próprias classes de `allClasses`. O `grafo` é uma vista do
+    grafo das relações com as relações provisórias incluídas.
+
+    As alterações nunca passam para `allClasses` nem para o grafo
+    original; `rollback` descarta-as.
+    """
+
+    def __init__(self,allClasses,grafo: GrafoRelacoes = None):
+        self.base = allClasses
+        self.grafo = GrafoSobreposto(grafo if grafo is not None else GrafoRelacoes(allClasses))
+        self.alteradas = {} # {"100.10.001": cópia da classe}
+
+
+    def __getitem__(self,cod):
+        classe = self.alteradas.get(cod)
+        if classe is not None:
+            return classe
+        return self.base[cod]
+
+
+    def __iter__(self):
+        return iter(self.base)
+
+
+    def __len__(self):
+        return len(self.base)
+
+
+    def adicionarRelacao(self,cod,rel,proc):
+        """
+        Acrescenta, provisoriamente, a relação "`cod` `rel` `proc`"
+        à zona de contexto da classe `cod`.
+        """
+        classe = self.alteradas.get(cod)
+        if classe is None:
+            classe = dict(self.base[cod])
+            classe["processosRelacionados"] = list(classe.get("processosRelacionados") or [])
+            classe["proRel"] = list(classe.get("proRel") or [])
+            self.alteradas[cod] = classe
+        classe["processosRelacionados"].append(proc)
+        classe["proRel"].append(rel)
+        self.grafo.adicionar(cod,rel,proc)
+
+
+    def rollback(self):
+        """
+        Descarta as alterações provisórias.
+        """
+        self.alteradas = {}
+        self.grafo.limpar()
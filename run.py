@@ -2,15 +2,10 @@ from webapp.app import app
 from datetime import datetime
 import os
 import logging
-from utils.path_utils import DUMP_DIR, LOG_DIR, FILES_DIR, UPLOAD_DIR, OUTPUT_DIR, ONTOLOGY_DIR
+from utils.path_utils import LOG_DIR, criarDiretorias
 
 # Criação das diretorias caso não existam
-os.makedirs(DUMP_DIR, exist_ok=True)
-os.makedirs(LOG_DIR, exist_ok=True)
-os.makedirs(FILES_DIR, exist_ok=True)
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-os.makedirs(OUTPUT_DIR, exist_ok=True)
-os.makedirs(ONTOLOGY_DIR, exist_ok=True)
+criarDiretorias()
 
 now = datetime.now()
 dateFormat = "%Y-%m-%d_%H-%M-%S"
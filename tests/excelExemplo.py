@@ -0,0 +1,121 @@
+import datetime
+import random
+from openpyxl import Workbook
+
+# Workbook de exemplo, com a estrutura do Excel da CLAV, para os testes
+# que correm a migração completa. Os dados são gerados aleatoriamente
+# a partir de uma `semente`, com erros que não impedem a geração da
+# ontologia (invariantes, catálogos, ...).
+
+FOLHAS = ["100","150","200","250","300","350","400","450","500","550","600",
+          "650","700","710","750","800","850","900","950"]
+
+COLUNAS = ["Código","Estado","Título","Descrição","Notas de aplicação","Exemplos de NA","Notas de exclusão",
+    "Dimensão qualitativa do processo","Uniformização do processo","Tipo de processo","Processo transversal (S/N)",
+    "Dono do processo","Participante no processo","Tipo de intervenção do participante",
+    "Diplomas jurídico-administrativos REF","Código do processo relacionado","Tipo de relação entre processos",
+    "Prazo de conservação administrativa","Nota ao PCA","Forma de contagem do PCA","Justificação PCA",
+    "Destino final","Nota ao DF","Justificação DF","Notas"]
+
+RELACOES = ["Síntese (sintetiza)", "Síntese (sintetizado por)", "Complementar", "Cruzado", "Suplemento de",
+            "Suplemento para", "Sucessão (sucessor)", "Sucessão (antecessor)"]
+CRITERIOS_PCA = ["Critério legal: ver [{leg}]", "Critério gestionário: ref {p}", "Critério de utilidade administrativa: ref {p}"]
+CRITERIOS_DF = ["Critério legal: ver [{leg}]", "Critério de densidade informacional: ref {p}", "Critério de complementaridade informacional: ref {p}"]
+
+
+def geraExcel(caminho,semente=1,porClasse2=3):
+    """
+    Escreve em `caminho` um workbook de exemplo com `porClasse2`
+    classes de nível 3 por cada classe de nível 2.
+    """
+
+    rnd = random.Random(semente)
+    ents = [f"ENT{i}" for i in range(20)] + ["DUP", "DUP"]
+    tips = [f"TIP{i}" for i in range(5)] + ["TIPX", "TIPX"]
+    wb = Workbook()
+    wb.remove(wb.active)
+
+    ws = wb.create_sheet("ent_sioe_csv")
+    ws.append(["Sigla","Estado","ID SIOE","Designação","Tipologia de Entidade","Internacional","Data de criação","Data de extinção"])
+    for i,e in enumerate(ents):
+        ws.append([e, rnd.choice([None,"Inativa"]), str(1000+i), f" Entidade {e}\n", "#TIP1#TIP2" if i%3==0 else None,
+                   rnd.choice([None,"Sim"]), datetime.datetime(2000,1,1+i%28) if i%2 else None, None])
+
+    ws = wb.create_sheet("tip_ent_csv")
+    ws.append(["Sigla","Designação"])
+    for t in tips:
+        ws.append([t, f"Tipologia {t} "])
+
+    ws = wb.create_sheet("leg_csv")
+    ws.append(["Tipo","Número","Entidade","Estado","Data","Sumário","Fonte","Link"])
+    legs = []
+    for i in range(15):
+        tipo = rnd.choice(["Decreto-Lei","Lei","Portaria"])
+        num = f"{i+1}/20{10+i%10}"
+        ws.append([tipo, num, rnd.choice([None, "ENT1", "ENT2,TIP1"]), rnd.choice([None, "Revogado"]),
+                   datetime.datetime(2010,1,1+i%28) if i%2 else "03/04/2011", f"Sumário {i}\r\n", "DR", "http://x"])
+        legs.append(f"{tipo} {num}")
+
+    plano = {}
+    classes3 = []
+    for s in FOLHAS:
+        linhas = [[s, None, f"Classe {s}", f"Desc\n{s}"]]
+        for n2 in (10, 20):
+            c2 = f"{s}.{n2}"
+            linhas.append([c2, None, f"Título {c2}", None])
+            for n3 in range(1, porClasse2+1):
+                c3 = f"{c2}.{n3:03d}"
+                classes3.append(c3)
+                linhas.append([c3])
+        plano[s] = linhas
+
+    def just(criterios):
+        return "#".join(rnd.choice(criterios).format(leg=rnd.choice(legs), p=rnd.choice(classes3))
+                        for _ in range(rnd.randint(0, 3))) or None
+
+    termos = []
+    for s in FOLHAS:
+        ws = wb.create_sheet(f"{s}_csv")
+        ws.append(COLUNAS)
+        for linha in plano[s]:
+            if len(linha) > 1:
+                ws.append(linha + [None]*(len(COLUNAS)-len(linha)))
+                continue
+            c3 = linha[0]
+            estado = rnd.choices([None, "Harmonização", "Inativo"], [20, 2, 2])[0]
+            relCods = rnd.sample(classes3, rnd.randint(0, 4)) + ([c3] if rnd.random() < 0.05 else [])
+            trans = rnd.choice(["S", "N", None])
+            parts = rnd.sample(ents[:20] + tips[:5], rnd.randint(1 if trans == "S" else 0, 3))
+            temFilhos = rnd.random() < 0.3
+            row = [c3, estado, f" Título {c3} ", f"Descrição\n de {c3}",
+                   "Nota A#Nota B" if rnd.random()<0.5 else None,
+                   "#Exemplo 1#" if rnd.random()<0.3 else None,
+                   "Excl \"q\"" if rnd.random()<0.3 else None,
+                   "Dim", "Unif", rnd.choice(["PC","PE","XX"]), trans,
+                   "#".join(rnd.sample(ents[:20]+tips[:5], rnd.randint(1,2))),
+                   "#".join(parts) or None,
+                   "#".join(rnd.choice(["Apreciar","Decidir","Executar","Iniciar"]) for _ in parts) or None,
+                   "#".join(rnd.choice(legs) for _ in range(rnd.randint(0,2))) or None,
+                   "#".join(relCods) or None, "#".join(rnd.choice(RELACOES) for _ in relCods) or None]
+            if temFilhos:
+                row += [None]*8
+            else:
+                row += [rnd.choice([5, "10", "5#7", "abc"]), "nota pca" if rnd.random()<0.2 else None,
+                        rnd.choice(["Conclusão do procedimento", "Disposição legal 3 - x", "nada"]),
+                        just(CRITERIOS_PCA), rnd.choice(["C","E","CP"]), None, just(CRITERIOS_DF), None]
+            ws.append(row)
+            for _ in range(rnd.randint(0, 2)):
+                termos.append((c3, f"termo {rnd.randint(0,60)}"))
+            if temFilhos:
+                for k in range(1, rnd.randint(2, 3)+1):
+                    c4 = f"{c3}.{k:02d}"
+                    ws.append([c4, estado, f"Filho {c4}"] + [None]*14 +
+                              [rnd.choice([5, "10", "abc"]), None, "Conclusão do procedimento", just(CRITERIOS_PCA),
+                               rnd.choice(["C","E"]), None, just(CRITERIOS_DF), None])
+                    termos += [(c4, t) for c, t in termos if c == c3 and rnd.random() < 0.7]
+
+    ws = wb.create_sheet("ti_csv", 0)
+    ws.append(["Código", "Termo"])
+    for c, t in termos:
+        ws.append([c, t + " "])
+    wb.save(caminho)
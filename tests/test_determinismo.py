@@ -0,0 +1,71 @@
+import glob
+import os
+import subprocess
+import sys
+import zipfile
+from excelExemplo import geraExcel
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Migração completa (extração, verificação, correções e geração da
+# ontologia) num workspace, com a ontologia final nos dois formatos
+MIGRACAO = """
+import os, sys
+from migrador.migrador import migra
+from migrador.genTTL import genFinalOntology
+from utils.workspace_utils import Workspace
+ws = Workspace(sys.argv[2]).criar()
+rep, ok, invs = migra(sys.argv[1],ws)
+assert ok
+for formato in ["ttl", "nt"]:
+    zipFile = genFinalOntology(formato,ws=ws)
+    os.replace(os.path.join(ws.outputDir,zipFile),os.path.join(ws.outputDir,f"{formato}.zip"))
+"""
+
+
+def migra(excel,raiz,semente):
+    env = dict(os.environ,
+               PYTHONHASHSEED=str(semente),
+               CLAV_DETERMINISTIC_IDS="1",
+               CLAV_SHEET_CACHE="0",
+               CLAV_TTL_CACHE="0",
+               CLAV_EXTRACTION_WORKERS="1",
+               CLAV_GENERATION_WORKERS="1")
+    subprocess.run([sys.executable, "-c", MIGRACAO, excel, raiz], cwd=RAIZ, env=env, check=True)
+
+
+def ficheiros(raiz):
+    """
+    Conteúdo dos ficheiros gerados no workspace `raiz`: os ttl
+    intermédios, os dumps e o conteúdo dos zips da ontologia final
+    (sem o timestamp dos nomes).
+    """
+    res = {}
+    for padrao in ["ontologia/*.ttl", "dump/*.json", "files/*.json"]:
+        for f in glob.glob(os.path.join(raiz, padrao)):
+            with open(f, "rb") as fi:
+                res[os.path.relpath(f, raiz)] = fi.read()
+    for formato in ["ttl", "nt"]:
+        with zipfile.ZipFile(os.path.join(raiz, "output", f"{formato}.zip")) as z:
+            for nome in z.namelist():
+                # CLAV_<timestamp>.ttl ou CLAV_<timestamp>/<shard>
+                partes = nome.split("/")
+                res["/".join([f"{formato}.zip"] + partes[1:])] = z.read(nome)
+    return res
+
+
+def test_migracao_independente_da_seed_do_hash(tmp_path):
+    # A mesma entrada tem de gerar os mesmos ficheiros, byte a byte,
+    # qualquer que seja a ordem dos sets e dicts de strings (PYTHONHASHSEED)
+    excel = str(tmp_path / "exemplo.xlsx")
+    geraExcel(excel)
+    migra(excel, str(tmp_path / "a"), 0)
+    migra(excel, str(tmp_path / "b"), 1)
+
+    a = ficheiros(str(tmp_path / "a"))
+    b = ficheiros(str(tmp_path / "b"))
+    assert any(k.startswith("ontologia/") for k in a)
+    assert "ttl.zip" in a and "nt.zip/manifest.json" in a
+    assert sorted(a) == sorted(b)
+    diferentes = [k for k in a if a[k] != b[k]]
+    assert diferentes == []
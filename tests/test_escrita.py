@@ -0,0 +1,150 @@
+import pytest
+from rdflib import Graph, Literal, Namespace, URIRef, RDF, RDFS, OWL, XSD
+from rdflib.compare import isomorphic
+from migrador.escrita import EscritorTurtle, MARCA, escapeLiteral, nomeLocal, ntriplos
+
+ns = Namespace("http://jcr.di.uminho.pt/m51-clav#")
+dc = Namespace("http://purl.org/dc/elements/1.1/")
+
+# Literais e nomes locais difíceis de escrever em Turtle
+LITERAIS = [
+    'Com "aspas" no meio',
+    "Com \\ barra e \\n que não é mudança de linha",
+    "Várias\nlinhas\r\ncom\ttabs",
+    "Carácter de controlo \x01 e \x1f",
+    "Não ASCII: ação, coração, 日本語, emoji 🎉",
+    "Termina em barra \\",
+    '"""',
+    "",
+]
+NOMES = ["c100.10.001", "ti_100.10.001_1", "nota-1", "termina.", "ação", "a/b", "a:b", "x(1)", "com%20espaço"]
+
+
+def triplos():
+    t = []
+    for i,texto in enumerate(LITERAIS):
+        s = ns[f"c100.10.{i:03d}"]
+        t.append((s, RDF.type, OWL.NamedIndividual))
+        t.append((s, ns.descricao, Literal(texto)))
+        t.append((s, RDFS.label, Literal(texto, lang="pt")))
+        t.append((s, dc.title, Literal(texto, datatype=XSD.string)))
+    for nome in NOMES:
+        t.append((ns[nome], ns.temRelProc, ns["c100.10.001"]))
+        t.append((ns["c100.10.001"], ns.codigo, Literal(nome)))
+    t.append((ns["c100.10.001"], ns.nivel, Literal(3)))
+    t.append((ns["c100.10.001"], ns.dataAtualizacao, Literal("2026-10-18", datatype=XSD.date)))
+    t.append((ns["c100.10.001"], ns.externo, URIRef("http://exemplo.pt/recurso?x=1&y=ação")))
+    return t
+
+
+def grafoRdflib(caminho):
+    """
+    Ficheiro escrito pelo caminho antigo: um Graph do rdflib
+    serializado em Turtle.
+    """
+    g = Graph()
+    g.bind("", ns)
+    g.bind("dc", dc)
+    for t in triplos():
+        g.add(t)
+    g.serialize(caminho, format="turtle")
+
+
+def grafoStreaming(caminho):
+    with EscritorTurtle(caminho, {"": ns, "dc": dc}) as e:
+        for t in triplos():
+            e.add(t)
+
+
+def lerTurtle(caminho):
+    g = Graph()
+    g.parse(caminho, format="turtle")
+    return g
+
+
+def lerNTriplos(caminho):
+    g = Graph()
+    g.parse(data="".join(ntriplos(caminho)), format="nt")
+    return g
+
+
+def test_round_trip_isomorfico(tmp_path):
+    antigo = tmp_path / "antigo.ttl"
+    novo = tmp_path / "novo.ttl"
+    grafoRdflib(antigo)
+    grafoStreaming(novo)
+
+    gAntigo = lerTurtle(antigo)
+    gNovo = lerTurtle(novo)
+    assert len(gNovo) == len(triplos())
+    assert isomorphic(gAntigo, gNovo)
+
+
+def test_um_triplo_por_linha(tmp_path):
+    novo = tmp_path / "novo.ttl"
+    grafoStreaming(novo)
+    linhas = novo.read_text(encoding="utf-8").splitlines()
+    assert linhas[0] + "\n" == MARCA
+    corpo = [l for l in linhas if l and not l.startswith("@prefix") and not l.startswith("#")]
+    assert len(corpo) == len(triplos())
+    assert all(l.endswith(" .") for l in corpo)
+
+
+def test_triplos_repetidos(tmp_path):
+    novo = tmp_path / "novo.ttl"
+    t = (ns["c100"], ns.descricao, Literal("x"))
+    with EscritorTurtle(novo, {"": ns}) as e:
+        e.add(t)
+        e.add(t)
+    assert len(lerTurtle(novo)) == 1
+
+
+@pytest.mark.parametrize("texto,esperado", [
+    ('a"b', 'a\\"b'),
+    ("a\\b", "a\\\\b"),
+    ("a\nb", "a\\nb"),
+    ("a\r\nb", "a\\r\\nb"),
+    ("a\tb", "a\\tb"),
+    ("a\x01b", "a\\u0001b"),
+    ("a\x1fb", "a\\u001Fb"),
+    ("ação 🎉", "ação 🎉"),
+])
+def test_escape_literal(texto, esperado):
+    assert texto.translate(escapeLiteral) == esperado
+
+
+@pytest.mark.parametrize("nome", ["c100.10.001", "ti_100.10.001_1", "nota-1", "a", "_x", "1"])
+def test_nome_local_valido(nome):
+    assert nomeLocal.fullmatch(nome)
+
+
+@pytest.mark.parametrize("nome", ["", "termina.", ".comeca", "com espaço", "ação", "a/b", "#x", "a:b"])
+def test_nome_local_invalido(nome):
+    assert not nomeLocal.fullmatch(nome)
+
+
+def test_termo(tmp_path):
+    with EscritorTurtle(tmp_path / "t.ttl", {"": ns}) as e:
+        assert e.termo(ns["c100.10.001"]) == ":c100.10.001"
+        assert e.termo(ns["termina."]) == f"<{ns}termina.>"
+        assert e.termo(RDF.type) == "rdf:type"
+        assert e.termo(Literal("x", lang="pt")) == '"x"@pt'
+        assert e.termo(Literal("1", datatype=XSD.integer)) == '"1"^^xsd:integer'
+        assert e.termo(Literal('a"b\n')) == '"a\\"b\\n"'
+
+
+def test_ntriplos_streaming(tmp_path):
+    novo = tmp_path / "novo.ttl"
+    grafoStreaming(novo)
+    linhas = list(ntriplos(novo))
+    assert len(linhas) == len(triplos())
+    assert all(l.endswith(" .\n") and l.startswith("<") for l in linhas)
+    assert isomorphic(lerNTriplos(novo), lerTurtle(novo))
+
+
+def test_ntriplos_rdflib(tmp_path):
+    # Ficheiros que não foram escritos pelo EscritorTurtle
+    # (a ontologia base) são lidos com o rdflib
+    antigo = tmp_path / "antigo.ttl"
+    grafoRdflib(antigo)
+    assert isomorphic(lerNTriplos(antigo), lerTurtle(antigo))
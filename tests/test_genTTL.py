@@ -0,0 +1,47 @@
+import hashlib
+import json
+import os
+import zipfile
+from rdflib import Graph, Literal, Namespace, RDF, OWL
+from migrador.escrita import EscritorTurtle
+from migrador.genTTL import shardsNT
+from utils.path_utils import ONTOLOGY_DIR
+
+ns = Namespace("http://jcr.di.uminho.pt/m51-clav#")
+
+
+def escreveClasse(caminho):
+    # Triplos repetidos, como os que o EscritorTurtle escreve
+    # para uma relação de um processo consigo próprio
+    with EscritorTurtle(caminho, {"": ns}) as e:
+        for i in range(3):
+            c = ns[f"c100.10.00{i}"]
+            e.add((c, RDF.type, OWL.NamedIndividual))
+            e.add((c, ns.temRelProc, c))
+            e.add((c, ns.temRelProc, c))
+            e.add((c, ns.temParticipante, ns.tip_TIPX))
+            e.add((c, ns.temParticipante, ns.tip_TIPX))
+            e.add((c, ns.codigo, Literal(f"100.10.00{i}")))
+
+
+def test_manifesto_conta_triplos_distintos(tmp_path):
+    classe = str(tmp_path / "100.ttl")
+    escreveClasse(classe)
+    base = os.path.join(ONTOLOGY_DIR, "clav-base-v5.ttl")
+    copia = str(tmp_path / "nt")
+
+    with zipfile.ZipFile(str(tmp_path / "clav.zip"), "w") as zipf:
+        manifesto = shardsNT(zipf, [classe, base], "CLAV", copia)
+
+    with open(os.path.join(copia, "manifest.json"), encoding="utf-8") as f:
+        assert json.load(f) == manifesto
+    assert [s["shard"] for s in manifesto["shards"]] == ["100", "clav-base-v5"]
+    for shard in manifesto["shards"]:
+        caminho = os.path.join(copia, shard["ficheiro"])
+        g = Graph().parse(caminho, format="nt")
+        assert shard["triplos"] == len(g)
+        with open(caminho, "rb") as f:
+            dados = f.read()
+        assert shard["bytes"] == len(dados)
+        assert shard["sha256"] == hashlib.sha256(dados).hexdigest()
+    assert manifesto["shards"][0]["triplos"] == 12
@@ -0,0 +1,57 @@
+from datetime import datetime
+import pandas as pd
+from openpyxl import Workbook
+from migrador.leitura import iterChunks, iterRows, anulaVazios
+
+COLS = ["inteiros", "inteirosVazios", "reais", "misto", "datas", "logicos", "vazia"]
+LINHAS = [
+    (1, 5, 1.5, "a", datetime(2020, 1, 1), True, None),
+    (2, 7, 2, 3, datetime(2021, 2, 3), False, None),
+    (3, 9, 2.5, "b", datetime(2022, 3, 4), True, None),
+    (4, None, 3, None, None, False, None),
+    (5, 11, 4.5, 4, datetime(2023, 4, 5), True, None),
+]
+
+
+def folha(linhas):
+    wb = Workbook()
+    ws = wb.active
+    ws.append(COLS)
+    for linha in linhas:
+        ws.append(linha)
+    return ws
+
+
+def test_blocos_iguais_a_folha_inteira():
+    # Lida por blocos, a folha tem de ficar igual à lida de uma só
+    # vez, mesmo quando as células vazias só aparecem num dos blocos
+    ws = folha(LINHAS)
+    esperado = pd.DataFrame(LINHAS, columns=COLS).astype(object)
+    blocos = list(iterChunks(ws, tamanho=2))
+    assert len(blocos) == 3
+    pd.testing.assert_frame_equal(pd.concat(blocos), esperado)
+
+
+def test_tipos_dos_valores():
+    ws = folha(LINHAS)
+    linhas = list(iterRows(ws))
+    # Uma coluna de inteiros com células vazias passa a float
+    assert [type(l["inteirosVazios"]) for l in linhas] == [float] * 5
+    assert linhas[0]["inteirosVazios"] == 5.0
+    assert pd.isna(linhas[3]["inteirosVazios"])
+    assert [type(l["inteiros"]) for l in linhas] == [int] * 5
+    assert [type(l["reais"]) for l in linhas] == [float] * 5
+    # Numa coluna com texto os valores ficam como vêm do Excel
+    assert [l["misto"] for l in linhas] == ["a", 3, "b", None, 4]
+    assert isinstance(linhas[0]["datas"], pd.Timestamp)
+    assert linhas[3]["datas"] is pd.NaT
+    assert [l["vazia"] for l in linhas] == [None] * 5
+
+
+def test_anula_vazios():
+    ws = folha(LINHAS)
+    linhas = list(iterRows(ws, anulaVazios))
+    assert linhas[3]["inteirosVazios"] is None
+    assert linhas[3]["datas"] is None
+    assert linhas[3]["misto"] is None
+    assert linhas[0]["inteirosVazios"] == 5.0
@@ -0,0 +1,16 @@
+from migrador.motor import invariantes, ordemRelatorio
+from migrador import checkInvariantes  # regista os invariantes
+
+
+def test_ordem_relatorio_unica():
+    # Cada invariante tem a sua posição no relatório
+    ordens = [inv.ordem for inv in invariantes.values()]
+    assert len(set(ordens)) == len(ordens)
+
+
+def test_ordem_relatorio():
+    nomes = ordemRelatorio()
+    assert sorted(nomes) == sorted(invariantes)
+    assert [invariantes[n].ordem for n in nomes] == sorted(inv.ordem for inv in invariantes.values())
+    # Só são devolvidos os invariantes registados, pela ordem do relatório
+    assert ordemRelatorio(["rel_6_inv_1", "rel_2_inv_3", "rel_9_inv_9"]) == ["rel_2_inv_3", "rel_6_inv_1"]
@@ -0,0 +1,50 @@
+import copy
+from migrador import queryfix as fix
+from migrador.report import ErroInv, FixStatus
+
+
+def classe(proRels,procRefs):
+    """
+    Classe de nível 3 sem filhos, com as relações `proRels`
+    ([(rel, cod)]) e um critério de utilidade com `procRefs`.
+    """
+    return {
+        "nivel": 3,
+        "proRel": [r for r,_ in proRels],
+        "processosRelacionados": [c for _,c in proRels],
+        "pca": {"justificacao": [{"tipo": "utilidade", "procRefs": procRefs}]}
+    }
+
+
+def test_rel_8_inv_7_falha_se_criar_relacao_simetrica():
+    # 100.10.001 vem antes de 200.10.001, por isso a relação mútua
+    # eSuplementoPara (rel_2_inv_7) só é registada em 100.10.001,
+    # que não é a classe da falha corrigida
+    allClasses = {
+        "100.10.001": classe([("eSuplementoPara","200.10.001")],["200.10.001"]),
+        "200.10.001": classe([],["100.10.001"]),
+    }
+    original = copy.deepcopy(allClasses)
+    err = ErroInv("rel_8_inv_7","200.10.001",{"proc": "100.10.001"},"")
+
+    fix.rel_8_inv_7_fix(allClasses,[err],{})
+
+    assert err.fixStatus == FixStatus.FAILED
+    assert "rel_2_inv_7" in err.fixMsg
+    assert allClasses == original
+
+
+def test_rel_8_inv_7_simulada():
+    allClasses = {
+        "100.10.001": classe([],[]),
+        "200.10.001": classe([],["100.10.001"]),
+    }
+    original = copy.deepcopy(allClasses)
+    err = ErroInv("rel_8_inv_7","200.10.001",{"proc": "100.10.001"},"")
+
+    fix.rel_8_inv_7_fix(allClasses,[err],{})
+
+    # A correção é válida, mas só é simulada
+    assert err.fixStatus == FixStatus.FIXED
+    assert allClasses == original
+
@@ -0,0 +1,23 @@
+import pickle
+from migrador.report import ErroInv
+
+
+def test_escape_memorizado():
+    err = ErroInv("rel_2_inv_1","100.10.001&x",{"proc": "<b>"},"a&b")
+    assert err.cod == "100.10.001&amp;x"
+    assert err.extra == "a&amp;b"
+    assert err.info == {"proc": "&lt;b&gt;"}
+    # O valor escapado é calculado uma vez e reutilizado
+    assert err.cod is err.cod
+    assert err.extra is err.extra
+    assert err.info is err.info
+    assert err.msg is err.msg
+
+
+def test_copia_e_pickle():
+    err = ErroInv("rel_2_inv_1","100.10.001&x",{},"a&b")
+    err.fail("falhou")
+    copia = err.copia()
+    assert copia.cod == err.cod and copia.fixMsg == ""
+    novo = pickle.loads(pickle.dumps(err,protocol=pickle.HIGHEST_PROTOCOL))
+    assert novo.dados() == err.dados()
@@ -0,0 +1,25 @@
+from migrador.motor import MotorInvariantes
+from migrador.report import Report
+from migrador.revalidacao import Alteracoes, revalidar
+from migrador import checkInvariantes  # regista os invariantes
+
+
+def test_revalidar_codigo_escapado():
+    # O código muda quando é escapado para html ("&" -> "&amp;"),
+    # a falha antiga tem de ser substituída na mesma
+    cod = "100.10.001&x"
+    allClasses = {
+        cod: {"nivel": 3, "proRel": ["eSuplementoPara"], "processosRelacionados": ["100.10.002"], "pca": {"valores": "5"}},
+    }
+    rep = Report()
+    motor = MotorInvariantes(allClasses)
+    motor.verificar(["rel_3_inv_1"],rep)
+    assert [err.codBruto for err in rep.globalErrors["erroInv"]["rel_3_inv_1"]] == [cod]
+
+    # Correção: justificação de utilidade no PCA
+    allClasses[cod]["pca"]["justificacao"] = [{"tipo": "utilidade", "procRefs": ["100.10.002"]}]
+    alteracoes = Alteracoes()
+    alteracoes.registar(cod,"pca")
+
+    repFix = revalidar(motor,["rel_3_inv_1"],rep,alteracoes)
+    assert repFix.globalErrors["erroInv"].get("rel_3_inv_1",[]) == []
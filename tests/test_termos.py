@@ -0,0 +1,39 @@
+from migrador.motor import MotorInvariantes
+from migrador.report import Report
+from migrador.termos import IndiceTermos
+from migrador import checkInvariantes  # regista os invariantes
+
+
+def test_indice():
+    indice = IndiceTermos([
+        {"codigo": "100.10.001", "termo": "a"},
+        {"codigo": "100.10.001", "termo": "b"},
+        {"codigo": "100.10.001.01", "termo": "a"},
+        {"codigo": "200.10.001", "termo": "a"},
+    ])
+    assert indice.termosDoCodigo("100.10.001") == ["a","b"]
+    assert indice.temTermo("100.10.001.01","a")
+    assert not indice.temTermo("100.10.001.01","b")
+    assert indice.codigosDe["a"] == {"100.10.001","100.10.001.01","200.10.001"}
+    assert indice.classes3De["a"] == {"100.10.001","200.10.001"}
+
+    indice.adicionar("100.10.001.01","b")
+    assert indice.termosDoCodigo("100.10.001.01") == ["a","b"]
+    assert len(indice) == 5
+
+
+def test_rel_2_inv_10_nao_partilha_o_indice():
+    indice = IndiceTermos([
+        {"codigo": "100.10.001", "termo": "a"},
+        {"codigo": "200.10.001", "termo": "a"},
+    ])
+    rep = Report()
+    MotorInvariantes({},termosIndice=indice).verificar(["rel_2_inv_10"],rep)
+    erros = rep.globalErrors["erroInv"]["rel_2_inv_10"]
+    assert len(erros) == 2
+
+    # Um termo acrescentado depois não muda as falhas já registadas
+    indice.adicionar("300.10.001","a")
+    for err in erros:
+        assert err.infoBruto["cods"] == ["100.10.001","200.10.001"]
+        assert "300.10.001" not in err.msg
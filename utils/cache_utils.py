@@ -0,0 +1,117 @@
+import os
+import pickle
+import tempfile
+import logging
+from utils.log_utils import PROC
+
+
+class DiskCache:
+    """
+    Cache persistente numa diretoria local. Cada entrada é guardada
+    num ficheiro próprio (`<chave>.pkl`), com o valor serializado
+    com `pickle`.
+
+    O tamanho total da diretoria é limitado a `maxBytes`. Quando o
+    limite é ultrapassado são removidas as entradas usadas há mais
+    tempo (LRU): cada leitura bem sucedida atualiza a data de
+    modificação do ficheiro, que é usada como data do último acesso.
+
+    As escritas são atómicas (ficheiro temporário + `os.replace`),
+    por isso vários processos podem partilhar a mesma diretoria.
+    """
+
+    def __init__(self, dir, maxBytes):
+        self.dir = dir
+        self.maxBytes = maxBytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(dir, exist_ok=True)
+
+
+    def path(self, chave):
+        return os.path.join(self.dir, f"{chave}.pkl")
+
+
+    def get(self, chave):
+        """
+        Devolve o valor guardado para `chave` ou None se a chave
+        não estiver na cache (ou se a entrada estiver corrompida).
+        """
+        path = self.path(chave)
+        try:
+            with open(path, "rb") as f:
+                valor = pickle.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception as e:
+            logging.getLogger(PROC).warning(f"Entrada da cache inválida, vai ser removida: {path} ({e})")
+            self.remove(chave)
+            self.misses += 1
+            return None
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return valor
+
+
+    def put(self, chave, valor, evict=True):
+        """
+        Guarda `valor` na cache e remove as entradas mais antigas
+        caso o tamanho máximo seja ultrapassado. Com `evict=False`
+        a remoção fica a cargo de quem chama (`evict`), o que evita
+        percorrer a diretoria a cada escrita de muitas entradas.
+        """
+        fd, tmp = tempfile.mkstemp(dir=self.dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(valor, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self.path(chave))
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        if evict:
+            self.evict()
+
+
+    def remove(self, chave):
+        try:
+            os.remove(self.path(chave))
+        except FileNotFoundError:
+            pass
+
+
+    def evict(self):
+        """
+        Remove as entradas usadas há mais tempo até o tamanho
+        total da cache ficar abaixo de `maxBytes`.
+        """
+        entradas = []
+        total = 0
+        with os.scandir(self.dir) as it:
+            for entry in it:
+                if not entry.name.endswith(".pkl"):
+                    continue
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entradas.append((st.st_mtime, st.st_size, entry.path))
+                total += st.st_size
+
+        if total <= self.maxBytes:
+            return
+
+        entradas.sort()
+        for _, tamanho, path in entradas:
+            if total <= self.maxBytes:
+                break
+            try:
+                os.remove(path)
+                total -= tamanho
+            except FileNotFoundError:
+                pass
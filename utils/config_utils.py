@@ -0,0 +1,77 @@
+import os
+
+# Número de processos usados na extração das folhas das classes.
+# Com o valor 1 as folhas são processadas em série, no próprio processo.
+EXTRACTION_WORKERS = int(os.environ.get("CLAV_EXTRACTION_WORKERS", os.cpu_count() or 1))
+
+# Número de processos usados na verificação dos invariantes. As classes são
+# divididas em blocos verificados em paralelo; com o valor 1 a verificação
+# é feita em série, no próprio processo. Por omissão é feita em série: nas
+# medições com `bench_invariantes.py` a verificação em paralelo foi mais lenta.
+INVARIANT_WORKERS = int(os.environ.get("CLAV_INVARIANT_WORKERS", 1))
+
+# Número de processos usados na geração dos ficheiros de ontologia (um por
+# classe de nível 1 e um por catálogo); com o valor 1 são gerados em série,
+# no próprio processo.
+GENERATION_WORKERS = int(os.environ.get("CLAV_GENERATION_WORKERS", os.cpu_count() or 1))
+
+# Identificadores determinísticos das notas, exemplos de notas de aplicação e
+# termos de índice: o sufixo é derivado do conteúdo e da posição, em vez de
+# ser aleatório, por isso a mesma entrada gera sempre a mesma ontologia.
+DETERMINISTIC_IDS = os.environ.get("CLAV_DETERMINISTIC_IDS", "1") == "1"
+
+# Nível de compressão (0 a 9) do zip da ontologia final.
+ZIP_LEVEL = int(os.environ.get("CLAV_ZIP_LEVEL", 6))
+
+# Formato da ontologia final: "ttl" (um só ficheiro Turtle) ou "nt" (um
+# ficheiro N-Triples por classe de nível 1 e por catálogo, com um manifesto).
+OUTPUT_FORMAT = os.environ.get("CLAV_OUTPUT_FORMAT", "ttl")
+
+# Escrita da ontologia final não comprimida (`CLAV_<timestamp>.ttl` ou a
+# diretoria `CLAV_<timestamp>/` dos ficheiros N-Triples) em OUTPUT_DIR,
+# além do zip.
+KEEP_FINAL_OUTPUT = os.environ.get("CLAV_KEEP_FINAL_OUTPUT", "0") == "1"
+
+# Escrita dos catálogos (entCatalog.json, tipCatalog.json, legCatalog.json)
+# em FILES_DIR. Só é útil para debug, a migração usa os catálogos em memória.
+DUMP_CATALOGS = os.environ.get("CLAV_DUMP_CATALOGS", "0") == "1"
+
+# Número de linhas de cada bloco lido das folhas do Excel. Cada bloco é
+# normalizado de uma só vez (operações vetorizadas do pandas), a memória
+# usada na leitura é proporcional a este valor.
+READ_CHUNK_ROWS = int(os.environ.get("CLAV_READ_CHUNK_ROWS", 1000))
+
+# Cache das folhas das classes já processadas (ver `excel2json`). As folhas
+# cujo conteúdo e catálogos não mudaram desde a última migração não são
+# processadas de novo.
+SHEET_CACHE = os.environ.get("CLAV_SHEET_CACHE", "1") == "1"
+
+# Cache dos fragmentos de ttl de cada classe (ver `genTTL.classeGenTTL`). Os
+# triplos das classes cujo registo e referências aos catálogos não mudaram
+# desde a última migração são copiados da cache em vez de serem gerados.
+TTL_CACHE = os.environ.get("CLAV_TTL_CACHE", "1") == "1"
+
+# Cache dos resultados das migrações da aplicação web (tabelas do report e zip
+# da ontologia final), indexada pelo hash do ficheiro carregado, do código,
+# de `invariantes.json` e da ontologia base. Um ficheiro já migrado é
+# respondido sem ser migrado de novo.
+RESULT_CACHE = os.environ.get("CLAV_RESULT_CACHE", "1") == "1"
+
+# Tamanho máximo (em MB) de cada uma das caches guardadas em CACHE_DIR.
+# Quando é ultrapassado são removidas as entradas usadas há mais tempo.
+CACHE_MAX_MB = int(os.environ.get("CLAV_CACHE_MAX_MB", 256))
+
+# Fila das migrações da aplicação web: número de migrações executadas em
+# simultâneo, número máximo de migrações à espera (os pedidos seguintes são
+# rejeitados), tempo máximo (em segundos) de cada migração e número de
+# migrações terminadas cujo estado e resultado são guardados.
+JOB_WORKERS = int(os.environ.get("CLAV_JOB_WORKERS", 1))
+JOB_QUEUE_SIZE = int(os.environ.get("CLAV_JOB_QUEUE_SIZE", 10))
+JOB_TIMEOUT = int(os.environ.get("CLAV_JOB_TIMEOUT", 3600))
+JOB_HISTORY = int(os.environ.get("CLAV_JOB_HISTORY", 50))
+
+# Workspaces das migrações da aplicação web (ver `workspace_utils`): número de
+# horas ao fim das quais um workspace é removido e manutenção dos ficheiros
+# intermédios (JSON e ttl) depois de cada migração, normalmente removidos.
+WORKSPACE_RETENTION = int(float(os.environ.get("CLAV_WORKSPACE_RETENTION", 24)) * 3600)
+KEEP_WORKSPACE_FILES = os.environ.get("CLAV_KEEP_WORKSPACE_FILES", "0") == "1"
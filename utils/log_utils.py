@@ -3,3 +3,4 @@ FIX = "FIX" # Correção automática
 GEN = "GEN" # Geração da ontologia
 PROC = "PROC" # Processamento inicial dos dados
 WEB = "WEB" # Web app
+PROG = "PROG" # Progresso da migração
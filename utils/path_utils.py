@@ -2,9 +2,18 @@ import os
 
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 
-UPLOAD_DIR = os.path.join(PROJECT_ROOT, 'uploads')
 OUTPUT_DIR = os.path.join(PROJECT_ROOT, 'output')
 FILES_DIR = os.path.join(PROJECT_ROOT, 'files')
 ONTOLOGY_DIR = os.path.join(PROJECT_ROOT, 'ontologia')
 DUMP_DIR = os.path.join(PROJECT_ROOT, 'dump')
 LOG_DIR = os.path.join(PROJECT_ROOT, "logs")
+CACHE_DIR = os.path.join(PROJECT_ROOT, 'cache')
+WORKSPACES_DIR = os.path.join(PROJECT_ROOT, 'workspaces')
+
+
+def criarDiretorias():
+    """
+    Criação das diretorias usadas pelo migrador, caso não existam.
+    """
+    for d in [DUMP_DIR, LOG_DIR, FILES_DIR, OUTPUT_DIR, ONTOLOGY_DIR]:
+        os.makedirs(d, exist_ok=True)
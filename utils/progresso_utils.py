@@ -0,0 +1,57 @@
+import logging
+import time
+from utils.log_utils import PROG
+
+logger = logging.getLogger(PROG)
+
+# Início da migração em curso, para o tempo decorrido dos eventos
+inicio = None
+
+
+def iniciar():
+    """
+    Marca o início de uma migração: o tempo decorrido
+    dos eventos seguintes é contado a partir daqui.
+    """
+    global inicio
+    inicio = time.perf_counter()
+
+
+class Etapa:
+    """
+    Uma etapa da migração com `total` passos (as folhas do Excel,
+    os invariantes, as correções, ...).
+
+    Cada passo concluído (`avancar`) é registado no logger PROG,
+    com um evento de progresso no atributo `progresso` do registo:
+    a etapa, o passo atual e o total, a mensagem, o tempo decorrido
+    desde o início da migração e o ritmo da etapa (passos por
+    segundo), mais os `dados` próprios do passo. Os eventos podem
+    assim ser encaminhados por um handler (ver `webapp.jobs`).
+    """
+
+    def __init__(self,nome,total):
+        global inicio
+        self.nome = nome
+        self.total = total
+        self.atual = 0
+        self.inicio = time.perf_counter()
+        if inicio is None:
+            inicio = self.inicio
+
+
+    def avancar(self,mensagem,**dados):
+        self.atual += 1
+        agora = time.perf_counter()
+        duracao = agora - self.inicio
+        evento = {
+            "etapa": self.nome,
+            "atual": self.atual,
+            "total": self.total,
+            "mensagem": mensagem,
+            "decorrido": round(agora - inicio, 3),
+            "ritmo": round(self.atual / duracao, 2) if duracao > 0 else None,
+            **dados
+        }
+        logger.info(f"[{self.nome} {self.atual}/{self.total}] {mensagem}", extra={"progresso": evento})
+        return evento
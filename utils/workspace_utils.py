@@ -0,0 +1,108 @@
+import glob
+import os
+import shutil
+import time
+import uuid
+import logging
+from utils.path_utils import FILES_DIR, DUMP_DIR, ONTOLOGY_DIR, OUTPUT_DIR, WORKSPACES_DIR
+from utils.log_utils import PROC
+
+# Ficheiros da ontologia base, que fazem parte de todas as ontologias finais
+BASE_ONTOLOGY = "clav-base*.ttl"
+
+
+class Workspace:
+    """
+    Diretorias de trabalho de uma migração: os ficheiros JSON
+    intermédios (`filesDir`), os dumps (`dumpDir`), os ficheiros ttl
+    intermédios (`ontologyDir`) e a ontologia final (`outputDir`).
+
+    O workspace por omissão (`raiz` None) usa as diretorias globais
+    de `path_utils`. Os restantes têm as suas diretorias dentro de
+    `raiz`, por isso várias migrações podem correr ao mesmo tempo
+    sem escreverem nos ficheiros umas das outras.
+    """
+
+    def __init__(self,raiz=None):
+        self.raiz = raiz
+        if raiz is None:
+            self.filesDir = FILES_DIR
+            self.dumpDir = DUMP_DIR
+            self.ontologyDir = ONTOLOGY_DIR
+            self.outputDir = OUTPUT_DIR
+        else:
+            self.filesDir = os.path.join(raiz, "files")
+            self.dumpDir = os.path.join(raiz, "dump")
+            self.ontologyDir = os.path.join(raiz, "ontologia")
+            self.outputDir = os.path.join(raiz, "output")
+
+
+    @property
+    def id(self):
+        return os.path.basename(self.raiz) if self.raiz else None
+
+
+    def criar(self):
+        """
+        Cria as diretorias do workspace, com uma cópia da
+        ontologia base na diretoria dos ficheiros ttl.
+        """
+        for d in [self.filesDir, self.dumpDir, self.ontologyDir, self.outputDir]:
+            os.makedirs(d, exist_ok=True)
+        if self.raiz is not None:
+            for base in glob.glob(os.path.join(ONTOLOGY_DIR, BASE_ONTOLOGY)):
+                shutil.copy2(base, self.ontologyDir)
+        return self
+
+
+    def limpar(self):
+        """
+        Remove os ficheiros intermédios (JSON e ttl), que só
+        são precisos durante a migração. Os dumps e a ontologia
+        final são mantidos.
+        """
+        if self.raiz is None:
+            return
+        for d in [self.filesDir, self.ontologyDir]:
+            shutil.rmtree(d, ignore_errors=True)
+
+
+    def remover(self):
+        if self.raiz is not None:
+            shutil.rmtree(self.raiz, ignore_errors=True)
+
+
+def novoWorkspace(id=None):
+    """
+    Workspace novo (e vazio) em WORKSPACES_DIR.
+    """
+    return Workspace(os.path.join(WORKSPACES_DIR, id or uuid.uuid4().hex)).criar()
+
+
+def limparWorkspaces(maxIdade,excluir=()):
+    """
+    Remove os workspaces de WORKSPACES_DIR que não são alterados
+    há mais de `maxIdade` segundos, exceto os de `excluir` (ids).
+    Devolve o número de workspaces removidos.
+    """
+    if not os.path.isdir(WORKSPACES_DIR):
+        return 0
+    limite = time.time() - maxIdade
+    removidos = 0
+    with os.scandir(WORKSPACES_DIR) as it:
+        for entry in it:
+            if not entry.is_dir() or entry.name in excluir:
+                continue
+            try:
+                if entry.stat().st_mtime < limite:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                    removidos += 1
+            except FileNotFoundError:
+                pass
+    if removidos:
+        logging.getLogger(PROC).info(f"Foram removidos {removidos} workspaces com mais de {maxIdade}s")
+    return removidos
+
+
+# Workspace por omissão, com as diretorias globais
+PADRAO = Workspace()
@@ -1,20 +1,44 @@
-from flask import Flask, render_template, request, jsonify, send_file, session
-from migrador.migrador import migra
-from migrador.genTTL import genFinalOntology
-from utils.path_utils import UPLOAD_DIR, OUTPUT_DIR
+from flask import Flask, Response, render_template, request, jsonify, send_file, session, url_for
+from migrador.genTTL import FORMATOS
+from migrador.relatorio import TIPOS_ERROS, TIPOS_WARNINGS, pagina
+from utils.workspace_utils import novoWorkspace
+from utils.cache_utils import DiskCache
+from utils.path_utils import CACHE_DIR
+from utils.config_utils import OUTPUT_FORMAT, JOB_WORKERS, JOB_QUEUE_SIZE, JOB_TIMEOUT, JOB_HISTORY, WORKSPACE_RETENTION, KEEP_WORKSPACE_FILES, RESULT_CACHE, CACHE_MAX_MB
+import json
 import os
+import threading
 import uuid
 from utils.log_utils import WEB
 import logging
-from migrador.genHTML import generate_classe_table_dict, generate_error_table, generate_warnings_table
-import threading
+from webapp.jobs import FilaJobs, FilaCheia, CONCLUIDO, FALHOU, EXPIROU
 
 
-lock = threading.Lock()
 logger = logging.getLogger(WEB)
+# Tamanho das páginas do relatório, por omissão e máximo
+TAMANHO_PAGINA = 50
+MAX_TAMANHO_PAGINA = 500
 app = Flask(__name__)
 app.secret_key = str(uuid.uuid4())
 
+# Fila das migrações, criada no primeiro pedido (ver `obterJobs`)
+jobs = None
+jobsLock = threading.Lock()
+
+
+def obterJobs():
+    """
+    Fila das migrações da aplicação. A fila (com as threads que
+    executam os jobs) e a cache dos resultados só são criadas no
+    primeiro uso, e não quando o módulo é importado.
+    """
+    global jobs
+    with jobsLock:
+        if jobs is None:
+            cache = DiskCache(os.path.join(CACHE_DIR, "resultados"), CACHE_MAX_MB * 1024 * 1024) if RESULT_CACHE else None
+            jobs = FilaJobs(JOB_WORKERS, JOB_QUEUE_SIZE, JOB_TIMEOUT, JOB_HISTORY, WORKSPACE_RETENTION, KEEP_WORKSPACE_FILES, cache)
+    return jobs
+
 
 @app.route('/')
 def index():
@@ -22,65 +46,237 @@ def index():
     return render_template('index.html')
 
 
+def submeterJob():
+    """
+    Valida o ficheiro e o formato do pedido e acrescenta a
+    migração à fila. Devolve o Job ou a resposta de erro.
+    """
+
+    if 'file' not in request.files:
+        logger.error("'file' não encontrado no request")
+        return None, (jsonify({'error': '\'file\' não encontrado no request'}), 400)
+
+    file = request.files['file']
+
+    if file.filename == '':
+        logger.error("Ficheiro não selecionado")
+        return None, (jsonify({'error': 'Ficheiro não selecionado'}), 400)
+
+    logger.info(f"Ficheiro recebido: {file.filename}")
+
+    formato = request.form.get('formato', OUTPUT_FORMAT)
+    if formato not in FORMATOS:
+        logger.error(f"Formato da ontologia desconhecido: {formato}")
+        return None, (jsonify({'error': f'Formato da ontologia desconhecido: {formato}'}), 400)
+
+    mimetype = file.mimetype
+    allowedMimetypes = [
+        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        "application/vnd.ms-excel"
+    ]
+    if mimetype not in allowedMimetypes:
+        return None, (jsonify({'error': 'Ficheiro não suportado'}), 415)
+
+    # Cada migração tem o seu próprio workspace, onde também
+    # é guardado o ficheiro carregado
+    ws = novoWorkspace()
+    filePath = os.path.join(ws.raiz, os.path.basename(file.filename))
+    file.save(filePath)
+
+    try:
+        return obterJobs().submeter(ws, filePath, formato), None
+    except FilaCheia:
+        ws.remover()
+        logger.error("Fila de migrações cheia, pedido rejeitado")
+        return None, (jsonify({'error': 'Existem demasiadas migrações em fila, tente mais tarde.'}), 429)
+
+
+def respostaResultado(job):
+    """
+    Resposta com o resultado de um job terminado.
+    """
+    if job.estado in (FALHOU, EXPIROU):
+        return jsonify({'error': 'Erro na migração dos dados', **job.info()}), 500
+
+    return jsonify({"ok": job.resultado["ok"], **job.relatorio().tabelasHTML()})
+
+
+def jobConcluido(id):
+    """
+    Job `id`, se estiver concluído, ou a resposta de erro.
+    """
+    job = obterJobs().obter(id)
+    if job is None:
+        return None, (jsonify({"error": "Job não encontrado"}), 404)
+    if not job.terminado.is_set():
+        return None, (jsonify(job.info()), 202)
+    if job.estado != CONCLUIDO:
+        return None, (jsonify({'error': 'Erro na migração dos dados', **job.info()}), 500)
+    return job, None
+
+
+def paginaPedida(linhas):
+    """
+    Página de `linhas` pedida com os parâmetros `pagina` e
+    `tamanho`. Levanta ValueError se forem inválidos.
+    """
+    numero = int(request.args.get("pagina", 1))
+    tamanho = int(request.args.get("tamanho", TAMANHO_PAGINA))
+    if numero < 1 or not 1 <= tamanho <= MAX_TAMANHO_PAGINA:
+        raise ValueError()
+    return pagina(linhas, numero, tamanho)
+
+
+@app.route('/jobs', methods=['POST'])
+def criar_job():
+    job, erro = submeterJob()
+    if erro:
+        return erro
+    info = job.info()
+    info["posicao"] = obterJobs().posicao(job)
+    return jsonify(info), 202, {"Location": url_for('estado_job', id=job.id)}
+
+
+@app.route('/jobs/<id>')
+def estado_job(id):
+    job = obterJobs().obter(id)
+    if job is None:
+        return jsonify({"error": "Job não encontrado"}), 404
+    info = job.info()
+    if job.estado == CONCLUIDO:
+        info["ok"] = job.resultado["ok"]
+    elif not job.terminado.is_set():
+        info["posicao"] = obterJobs().posicao(job)
+    return jsonify(info)
+
+
+@app.route('/jobs/<id>/eventos')
+def eventos_job(id):
+    """
+    Eventos de progresso do job, em Server-Sent Events: um evento
+    "progresso" por cada passo da migração (com o id do evento, para
+    que uma ligação interrompida possa continuar com Last-Event-ID)
+    e um evento "fim" com o estado final do job.
+    """
+
+    job = obterJobs().obter(id)
+    if job is None:
+        return jsonify({"error": "Job não encontrado"}), 404
+
+    try:
+        desde = int(request.headers.get("Last-Event-ID", -1)) + 1
+    except ValueError:
+        desde = 0
+
+    def stream():
+        i = desde
+        while True:
+            novos, terminado = job.esperarEventos(i, 15)
+            for evento in novos:
+                yield f"id: {i}\nevent: progresso\ndata: {json.dumps(evento, ensure_ascii=False)}\n\n"
+                i += 1
+            if terminado and len(novos) == 0:
+                yield f"event: fim\ndata: {json.dumps(job.info(), ensure_ascii=False)}\n\n"
+                return
+            if not novos:
+                # Comentário, para manter a ligação aberta
+                yield ": \n\n"
+
+    return Response(stream(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.route('/jobs/<id>/resultado')
+def resultado_job(id):
+    job = obterJobs().obter(id)
+    if job is None:
+        return jsonify({"error": "Job não encontrado"}), 404
+    if not job.terminado.is_set():
+        return jsonify(job.info()), 202
+    return respostaResultado(job)
+
+
+@app.route('/jobs/<id>/relatorio')
+def relatorio_job(id):
+    """
+    Resumo do relatório do job: número de erros por tipo, por
+    classe de nível 1 e por invariante, e de warnings por tipo.
+    """
+    job, erro = jobConcluido(id)
+    if erro:
+        return erro
+    return jsonify({"ok": job.resultado["ok"], **job.relatorio().resumo()})
+
+
+@app.route('/jobs/<id>/relatorio/erros')
+def erros_job(id):
+    """
+    Página dos erros do relatório do job, filtrados por `tipo`,
+    `subtipo`, `classe`, `cod` (início do código), `estado` da
+    correção e `q` (texto da mensagem).
+    """
+    job, erro = jobConcluido(id)
+    if erro:
+        return erro
+
+    args = request.args
+    tipo = args.get("tipo")
+    if tipo and tipo not in TIPOS_ERROS:
+        return jsonify({"error": f"Tipo de erro desconhecido: {tipo}"}), 400
+    erros = job.relatorio().filtrarErros(
+        tipo, args.get("subtipo"), args.get("classe"), args.get("cod"), args.get("estado"), args.get("q")
+    )
+    try:
+        return jsonify(paginaPedida(erros))
+    except ValueError:
+        return jsonify({"error": f"Página inválida, o tamanho tem de estar entre 1 e {MAX_TAMANHO_PAGINA}"}), 400
+
+
+@app.route('/jobs/<id>/relatorio/warnings')
+def warnings_job(id):
+    """
+    Página dos warnings do relatório do job, filtrados por
+    `tipo` e `q` (texto da mensagem).
+    """
+    job, erro = jobConcluido(id)
+    if erro:
+        return erro
+
+    tipo = request.args.get("tipo")
+    if tipo and tipo not in TIPOS_WARNINGS:
+        return jsonify({"error": f"Tipo de warning desconhecido: {tipo}"}), 400
+    warnings = job.relatorio().filtrarWarnings(tipo, request.args.get("q"))
+    try:
+        return jsonify(paginaPedida(warnings))
+    except ValueError:
+        return jsonify({"error": f"Página inválida, o tamanho tem de estar entre 1 e {MAX_TAMANHO_PAGINA}"}), 400
+
+
+@app.route('/jobs/<id>/download')
+def download_job(id):
+    job = obterJobs().obter(id)
+    if job is None:
+        return jsonify({"error": "Job não encontrado"}), 404
+    if job.estado != CONCLUIDO or not job.resultado["ok"]:
+        logger.error(f"Tentativa de download da ontologia do job {id} falhou. A migração não foi bem-sucedida")
+        return jsonify({"error": "Não é permitido fazer download. A migração não foi bem-sucedida."}), 422
+    return enviarOntologia(job)
+
+
 @app.route('/process', methods=['POST'])
 def process_file():
+    """
+    Versão síncrona de /jobs: a migração também passa pela fila,
+    mas a resposta só é enviada quando termina.
+    """
 
-    if not lock.acquire(blocking=False):
-        logger.error(f"Endpoint /process não pode ser utilizado até que o processamento dos dados acabe")
-        return jsonify({
-            "error": "Processo já está em execução no segundo plano."
-        }), 429
+    job, erro = submeterJob()
+    if erro:
+        return erro
 
-    try:
-        if 'file' not in request.files:
-            logger.error("'file' não encontrado no request")
-            return jsonify({'error': '\'file\' não encontrado no request'}), 400
-
-        file = request.files['file']
-
-        if file.filename == '':
-            logger.error("Ficheiro não selecionado")
-            return jsonify({'error': 'Ficheiro não selecionado'}), 400
-
-        logger.info(f"Ficheiro recebido: {file.filename}")
-
-        fileContent = file.read()
-        mimetype = file.mimetype
-        allowedMimetypes = [
-            "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            "application/vnd.ms-excel"
-        ]
-        if mimetype not in allowedMimetypes:
-            return jsonify({'error': 'Ficheiro não suportado'}), 415
-
-        filePath = os.path.join(UPLOAD_DIR, file.filename)
-        with open(filePath, "wb") as f:
-            f.write(fileContent)
-
-        rep, ok, invs = migra(filePath)
-        session['migration_ok'] = ok
-
-        if ok:
-            zipedOutputFile = genFinalOntology()
-            session['zipedOutputFile'] = zipedOutputFile
-
-        table_by_classe = generate_classe_table_dict(
-            rep.globalErrors, rep.classesN1, rep.inativos, rep.declaracoes, invs
-        )
-        table_all_errors = generate_error_table(rep.globalErrors, rep.inativos, invs)
-        warnings = generate_warnings_table(rep.warnings)
-
-        return jsonify({
-            "ok": ok,
-            "table_by_classe": table_by_classe,
-            "table_all_errors": table_all_errors,
-            "warnings": warnings
-        })
-    except Exception as e:
-        logger.exception(f"Exceção levantada na migração dos dados")
-        return jsonify({'error': 'Erro na migração dos dados'}), 500
-    finally:
-        lock.release()
+    job.terminado.wait()
+    session['migration_ok'] = job.estado == CONCLUIDO and job.resultado["ok"]
+    session['job'] = job.id
+    return respostaResultado(job)
 
 
 @app.route('/download')
@@ -90,8 +286,16 @@ def download_output():
         logger.error("Tentativa de download da ontologia falhou. A migração não foi bem-sucedida")
         return jsonify({"error": "Não é permitido fazer download. A migração não foi bem-sucedida."}), 422
 
-    zipedOutputFile = session['zipedOutputFile']
-    clav = os.path.join(OUTPUT_DIR, zipedOutputFile)
+    job = obterJobs().obter(session.get('job'))
+    if job is None:
+        logger.error("Tentativa de download da ontologia falhou. A migração já não está disponível")
+        return jsonify({"error": "A migração já não está disponível"}), 404
+    return enviarOntologia(job)
+
+
+def enviarOntologia(job):
+    zipedOutputFile = job.resultado["zipedOutputFile"]
+    clav = os.path.join(job.ws.outputDir, zipedOutputFile)
     if os.path.exists(clav):
         logger.info(f"Ficheiro selecionado: {clav}")
     else:
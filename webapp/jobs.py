@@ -0,0 +1,437 @@
+import glob
+import hashlib
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+from migrador.migrador import migra
+from migrador import genTTL
+from migrador.genTTL import genFinalOntology
+from migrador.relatorio import Relatorio, REPORT_FILE, guardaReport, carregaRelatorio
+from utils.cache_utils import DiskCache
+from utils.config_utils import DETERMINISTIC_IDS, ZIP_LEVEL
+from utils.log_utils import WEB, PROG
+from utils.path_utils import PROJECT_ROOT, ONTOLOGY_DIR
+from utils.workspace_utils import Workspace, BASE_ONTOLOGY, limparWorkspaces
+
+logger = logging.getLogger(WEB)
+
+# Estados de um job
+EM_FILA = "em fila"
+EM_EXECUCAO = "em execução"
+CONCLUIDO = "concluído"
+FALHOU = "falhou"
+EXPIROU = "expirou"
+
+
+class FilaCheia(Exception):
+    """
+    A fila de jobs atingiu o tamanho máximo.
+    """
+    pass
+
+
+class Job:
+    """
+    Uma migração pedida à aplicação web: o ficheiro Excel
+    carregado, o formato da ontologia final, o workspace onde
+    a migração é feita e o seu estado. Quando termina,
+    `resultado` tem o nome do zip da ontologia final (se for
+    gerada) e o Report fica guardado no workspace, de onde é
+    carregado por `relatorio` quando é consultado.
+
+    Os eventos de progresso da migração (ver `progresso_utils`)
+    são guardados em `eventos`, por ordem; `esperarEventos`
+    permite acompanhá-los à medida que chegam.
+    """
+
+    def __init__(self,ws: Workspace,filePath,formato):
+        self.id = ws.id
+        self.ws = ws
+        self.filePath = filePath
+        self.formato = formato
+        self.estado = EM_FILA
+        self.criado = time.time()
+        self.inicio = None
+        self.fim = None
+        self.resultado = None
+        self.erro = None
+        self.chave = None # Chave na cache dos resultados
+        self.cache = False # Resultado reposto a partir da cache
+        self.eventos = []
+        self.terminado = threading.Event()
+        self.mudanca = threading.Condition()
+        self.rel = None
+        self.lockRelatorio = threading.Lock()
+
+
+    def info(self):
+        """
+        Estado do job, para ser devolvido em JSON.
+        """
+        info = {
+            "id": self.id,
+            "ficheiro": os.path.basename(self.filePath),
+            "formato": self.formato,
+            "estado": self.estado,
+            "criado": self.criado,
+            "inicio": self.inicio,
+            "fim": self.fim,
+            "cache": self.cache
+        }
+        if self.erro:
+            info["error"] = self.erro
+        return info
+
+
+    def registaEvento(self,evento):
+        with self.mudanca:
+            self.eventos.append(evento)
+            self.mudanca.notify_all()
+
+
+    def terminar(self):
+        with self.mudanca:
+            self.fim = time.time()
+            self.terminado.set()
+            self.mudanca.notify_all()
+
+
+    def relatorio(self) -> Relatorio:
+        """
+        Relatorio do job concluído, carregado do workspace
+        na primeira consulta.
+        """
+        with self.lockRelatorio:
+            if self.rel is None:
+                self.rel = carregaRelatorio(self.ws)
+            return self.rel
+
+
+    def esperarEventos(self,desde,timeout):
+        """
+        Espera (no máximo `timeout` segundos) que haja eventos
+        a partir do índice `desde` ou que o job termine. Devolve
+        os eventos novos e se o job já terminou.
+        """
+        with self.mudanca:
+            self.mudanca.wait_for(lambda: len(self.eventos) > desde or self.terminado.is_set(),timeout)
+            return self.eventos[desde:], self.terminado.is_set()
+
+
+def versaoMigrador():
+    """
+    Hash do que, além do Excel, determina o resultado de uma
+    migração: o código do migrador, `invariantes.json` e a
+    ontologia base.
+    """
+    global versao
+    if versao is None:
+        h = hashlib.sha256()
+        ficheiros = sorted(glob.glob(os.path.join(PROJECT_ROOT,"migrador","*.py")))
+        ficheiros += sorted(glob.glob(os.path.join(PROJECT_ROOT,"utils","*.py")))
+        ficheiros.append(os.path.join(PROJECT_ROOT,"invariantes.json"))
+        ficheiros += sorted(glob.glob(os.path.join(ONTOLOGY_DIR,BASE_ONTOLOGY)))
+        for f in ficheiros:
+            h.update(os.path.relpath(f,PROJECT_ROOT).encode())
+            with open(f,"rb") as fin:
+                h.update(hashlib.sha256(fin.read()).digest())
+        versao = h.hexdigest()
+    return versao
+
+versao = None
+
+
+def chaveResultado(filePath,formato):
+    """
+    Chave do resultado da migração de `filePath` na cache: hash do
+    conteúdo do ficheiro, da `versaoMigrador` e das opções que mudam
+    o resultado (o formato, a compressão, o modo dos identificadores
+    e a data de atualização escrita na ontologia).
+    """
+    h = hashlib.sha256()
+    with open(filePath,"rb") as f:
+        while bloco := f.read(1024 * 1024):
+            h.update(bloco)
+    opcoes = f"{formato}|{ZIP_LEVEL}|{DETERMINISTIC_IDS}|{genTTL.dataAtualizacao}"
+    return hashlib.sha256(f"{h.hexdigest()}|{versaoMigrador()}|{opcoes}".encode()).hexdigest()
+
+
+def executaMigracao(filePath,formato,ws: Workspace):
+    """
+    Migração de `filePath` e geração da ontologia final, no
+    workspace `ws`. O Report é guardado no workspace, só o
+    resultado (se a ontologia foi gerada e o nome do zip) é
+    enviado para a aplicação web.
+    """
+
+    rep, ok, invs = migra(filePath,ws)
+    resultado = {"ok": ok, "zipedOutputFile": None}
+    if ok:
+        resultado["zipedOutputFile"] = genFinalOntology(formato,ws=ws)
+    guardaReport(rep,invs,ws)
+    return resultado
+
+
+class EnvioProgresso(logging.Handler):
+    """
+    Handler que envia os eventos de progresso registados no
+    logger PROG pela ligação `conn`, para o processo da web app.
+    """
+
+    def __init__(self,conn):
+        super().__init__()
+        self.conn = conn
+
+
+    def emit(self,record):
+        evento = getattr(record,"progresso",None)
+        if evento is None:
+            return
+        try:
+            self.conn.send(("progresso",evento))
+        except Exception:
+            self.handleError(record)
+
+
+def processoMigracao(conn,filePath,formato,ws: Workspace,manterFicheiros):
+    """
+    Corpo do processo de cada job. O processo é líder do seu
+    próprio grupo, para que os processos criados pela migração
+    também possam ser terminados se o job expirar.
+
+    Pela ligação `conn` são enviados os eventos de progresso
+    ("progresso", evento) e, no fim, o resultado ("resultado",
+    (ok, resultado ou mensagem de erro)).
+
+    Os ficheiros intermédios do workspace são removidos no fim,
+    exceto com `manterFicheiros`.
+    """
+    if hasattr(os,"setpgrp"):
+        os.setpgrp()
+    logging.getLogger(PROG).addHandler(EnvioProgresso(conn))
+    try:
+        conn.send(("resultado",(True,executaMigracao(filePath,formato,ws))))
+    except Exception as e:
+        logger.exception(f"Exceção levantada na migração dos dados")
+        conn.send(("resultado",(False,f"{type(e).__name__}: {e}")))
+    finally:
+        conn.close()
+        if not manterFicheiros:
+            ws.limpar()
+
+
+class FilaJobs:
+    """
+    Fila das migrações pedidas à aplicação web.
+
+    Os jobs são executados por `workers` threads, cada um num
+    processo próprio e no seu próprio workspace, para que um job
+    que ultrapasse `timeout` segundos possa ser terminado. A fila
+    tem no máximo `maxFila` jobs à espera.
+
+    Retenção: são guardados os últimos `historico` jobs terminados,
+    para que o seu estado e resultado possam ser consultados; os
+    workspaces dos restantes são removidos, tal como os workspaces
+    com mais de `retencao` segundos (de execuções anteriores da
+    aplicação). Com `manterFicheiros` os ficheiros intermédios de
+    cada workspace não são removidos no fim do job.
+
+    Com uma `cache` (DiskCache), o resultado de cada migração
+    concluída (o Report e o zip da ontologia final) é
+    guardado com a chave `chaveResultado`. Um ficheiro igual a um
+    já migrado, com o mesmo código e opções, é respondido a partir
+    da cache, sem passar pela fila.
+    """
+
+    def __init__(self,workers,maxFila,timeout,historico,retencao,manterFicheiros=False,cache: DiskCache = None):
+        self.fila = queue.Queue(maxsize=maxFila)
+        self.timeout = timeout
+        self.historico = historico
+        self.retencao = retencao
+        self.manterFicheiros = manterFicheiros
+        self.cache = cache
+        self.jobs = {} # {id: Job}, pela ordem de criação
+        self.lock = threading.Lock()
+        limparWorkspaces(retencao)
+        for i in range(workers):
+            threading.Thread(target=self.worker,name=f"job-worker-{i}",daemon=True).start()
+
+
+    def submeter(self,ws: Workspace,filePath,formato):
+        """
+        Acrescenta a migração de `filePath`, no workspace `ws`,
+        à fila e devolve o Job. Levanta FilaCheia se a fila
+        estiver cheia.
+        """
+        job = Job(ws,filePath,formato)
+        reposto = False
+        if self.cache:
+            try:
+                job.chave = chaveResultado(filePath,formato)
+                reposto = self.repor(job)
+            except Exception:
+                logger.exception(f"Falha na leitura da cache dos resultados, o job {job.id} vai ser executado")
+                job.estado = EM_FILA
+
+        with self.lock:
+            if not reposto:
+                try:
+                    self.fila.put_nowait(job)
+                except queue.Full:
+                    raise FilaCheia()
+            self.jobs[job.id] = job
+            self.limpar()
+            ativos = list(self.jobs)
+        limparWorkspaces(self.retencao,excluir=ativos)
+        if reposto:
+            logger.info(f"Job {job.id} concluído a partir da cache dos resultados ({os.path.basename(filePath)}, {self.cache.hits} acertos e {self.cache.misses} falhas)")
+        else:
+            logger.info(f"Job {job.id} em fila ({os.path.basename(filePath)})")
+        return job
+
+
+    def repor(self,job):
+        """
+        Conclui `job` com o resultado guardado na cache, se existir:
+        o Report e o zip da ontologia final são repostos no seu
+        workspace.
+        """
+        entrada = self.cache.get(job.chave)
+        if entrada is None:
+            return False
+        resultado = entrada["resultado"]
+        with open(os.path.join(job.ws.dumpDir,REPORT_FILE),"wb") as f:
+            f.write(entrada["report"])
+        if entrada["zip"] is not None:
+            with open(os.path.join(job.ws.outputDir,resultado["zipedOutputFile"]),"wb") as f:
+                f.write(entrada["zip"])
+        job.resultado = resultado
+        job.cache = True
+        job.estado = CONCLUIDO
+        job.inicio = time.time()
+        job.terminar()
+        return True
+
+
+    def guardar(self,job):
+        """
+        Guarda na cache o resultado de `job`, acabado de concluir.
+        """
+        resultado = job.resultado
+        zipBytes = None
+        try:
+            if resultado["zipedOutputFile"]:
+                with open(os.path.join(job.ws.outputDir,resultado["zipedOutputFile"]),"rb") as f:
+                    zipBytes = f.read()
+            with open(os.path.join(job.ws.dumpDir,REPORT_FILE),"rb") as f:
+                reportBytes = f.read()
+            self.cache.put(job.chave,{"resultado": resultado, "zip": zipBytes, "report": reportBytes})
+        except Exception:
+            logger.exception(f"Falha na escrita do resultado do job {job.id} na cache")
+
+
+    def obter(self,id):
+        with self.lock:
+            return self.jobs.get(id)
+
+
+    def posicao(self,job):
+        """
+        Número de jobs à frente de `job` na fila.
+        """
+        with self.lock:
+            return sum(1 for j in self.jobs.values() if j.estado == EM_FILA and j.criado < job.criado)
+
+
+    def limpar(self):
+        """
+        Remove os jobs terminados mais antigos além do `historico`,
+        e os respetivos workspaces.
+        """
+        terminados = [id for id,j in self.jobs.items() if j.terminado.is_set()]
+        for id in terminados[:max(0,len(terminados) - self.historico)]:
+            self.jobs.pop(id).ws.remover()
+
+
+    def worker(self):
+        while True:
+            job = self.fila.get()
+            try:
+                self.executar(job)
+            except Exception as e:
+                logger.exception(f"Falha na execução do job {job.id}")
+                job.estado = FALHOU
+                job.erro = str(e)
+            finally:
+                job.terminar()
+                self.fila.task_done()
+
+
+    def executar(self,job):
+        job.estado = EM_EXECUCAO
+        job.inicio = time.time()
+        logger.info(f"Início do job {job.id}")
+
+        recetor, emissor = multiprocessing.Pipe(duplex=False)
+        p = multiprocessing.Process(target=processoMigracao,args=(emissor,job.filePath,job.formato,job.ws,self.manterFicheiros))
+        p.start()
+        emissor.close()
+
+        # Os eventos e o resultado são lidos antes do join, para o
+        # processo não ficar bloqueado a escrever um resultado grande
+        limite = time.time() + self.timeout
+        ok, res = None, None
+        try:
+            while recetor.poll(max(0,limite - time.time())):
+                tipo, dados = recetor.recv()
+                if tipo == "progresso":
+                    job.registaEvento(dados)
+                else:
+                    ok, res = dados
+                    break
+        except EOFError:
+            ok, res = False, "O processo da migração terminou inesperadamente"
+        finally:
+            recetor.close()
+
+        if ok is None:
+            logger.error(f"O job {job.id} excedeu o tempo máximo de {self.timeout}s e foi terminado")
+            self.terminar(p)
+            if not self.manterFicheiros:
+                job.ws.limpar()
+            job.estado = EXPIROU
+            job.erro = f"A migração excedeu o tempo máximo de {self.timeout}s"
+            return
+
+        p.join()
+        if ok:
+            job.resultado = res
+            job.estado = CONCLUIDO
+            if self.cache and job.chave:
+                self.guardar(job)
+            logger.info(f"Job {job.id} concluído em {time.time() - job.inicio:.2f}s")
+        else:
+            job.estado = FALHOU
+            job.erro = res
+            logger.error(f"Job {job.id} falhou: {res}")
+
+
+    def terminar(self,p):
+        """
+        Termina o processo `p` e os processos que este criou.
+        """
+        try:
+            if hasattr(os,"killpg"):
+                os.killpg(p.pid,signal.SIGTERM)
+            else:
+                p.terminate()
+        except ProcessLookupError:
+            pass
+        p.join(5)
+        if p.is_alive():
+            p.kill()
+            p.join()
@@ -1,11 +1,7 @@
-let classeTables = {};
+// Report of the current job, loaded one page at a time
+const report = { jobId: null, errorsPage: 1, warningsPage: 1 };
 
 document.addEventListener('DOMContentLoaded', () => {
-    const reportByInvariant = document.getElementById('all-errors');
-    const classeReportContent = document.getElementById('classe-report-content');
-    const classeSelector = document.getElementById('classe-selector');
-    const warningsView = document.getElementById('warnings-view');
-
     const form = document.getElementById('upload-form');
     const fileInput = document.getElementById('file');
     const selectedFileText = document.getElementById('selected-file');
@@ -18,19 +14,8 @@ document.addEventListener('DOMContentLoaded', () => {
     const generalError = document.getElementById('general-error');
     const generalErrorMessage = document.getElementById('general-error-message');
 
-    const viewSelector = document.getElementById('view-selector');
     const submitButton = form.querySelector('button[type="submit"]');
 
-    // Restore classeTables if page was saved
-    const savedClasseData = document.getElementById('classe-data');
-    if (savedClasseData) {
-        try {
-            classeTables = JSON.parse(savedClasseData.textContent);
-        } catch (e) {
-            console.error('Erro ao restaurar dados de classe:', e);
-        }
-    }
-
 
     // Reset file input on page load
     window.addEventListener('load', () => {
@@ -61,6 +46,7 @@ document.addEventListener('DOMContentLoaded', () => {
     });
 
     setupMainTabs();
+    setupReportFilters();
 
     form.addEventListener('submit', async (event) => {
         event.preventDefault();
@@ -84,17 +70,22 @@ document.addEventListener('DOMContentLoaded', () => {
 
         const formData = new FormData();
         formData.append('file', fileInput.files[0]);
+        formData.append('formato', document.getElementById('formato').value);
 
         try {
-            const response = await fetch('/process', {
+            const response = await fetch('/jobs', {
                 method: 'POST',
                 body: formData,
             });
 
-            const result = await response.json();
-            if (result.error) throw new Error(`${result.error} (Erro HTTP ${response.status})`);
+            const job = await response.json();
+            if (job.error) throw new Error(`${job.error} (Erro HTTP ${response.status})`);
+
+            const result = await followJob(job.id, buttonText);
+            if (result.estado !== 'concluído') throw new Error(result.error || 'Erro ao processar o ficheiro.');
 
             if (result.ok) {
+                downloadBtn.href = `/jobs/${job.id}/download`;
                 downloadBtn.classList.remove('hidden');
                 downloadWarning.classList.add('hidden');
             } else {
@@ -102,38 +93,7 @@ document.addEventListener('DOMContentLoaded', () => {
                 downloadWarning.classList.remove('hidden');
             }
 
-            // Setup classe tables
-            if (result.table_by_classe && result.table_all_errors && result.warnings) {
-                reportByInvariant.innerHTML = result.table_all_errors;
-                warningsView.innerHTML = result.warnings;
-                classeTables = result.table_by_classe;
-
-                // Persist classeTables into DOM so "Save Page As" works
-                let dataScript = document.getElementById('classe-data');
-                if (!dataScript) {
-                    dataScript = document.createElement('script');
-                    dataScript.id = 'classe-data';
-                    dataScript.type = 'application/json';
-                    document.body.appendChild(dataScript);
-                }
-                dataScript.textContent = JSON.stringify(classeTables);
-
-                classeSelector.innerHTML = '';
-                Object.keys(classeTables).forEach(classe => {
-                    const option = document.createElement('option');
-                    option.value = classe;
-                    option.textContent = classe;
-                    classeSelector.appendChild(option);
-                });
-
-                // Show first classe by default
-                classeReportContent.innerHTML = classeTables[classeSelector.value];
-
-                document.querySelectorAll('.report-view').forEach(div => div.classList.add('hidden'));
-                document.getElementById(viewSelector.value).classList.remove('hidden');
-            } else {
-                throw new Error(result.error || 'Erro ao processar o ficheiro.');
-            }
+            await loadReport(job.id);
 
             reportContainer.classList.remove('hidden');
             reportContainer.scrollIntoView({ behavior: 'smooth' });
@@ -147,10 +107,11 @@ document.addEventListener('DOMContentLoaded', () => {
             generalError.classList.remove('hidden');
 
             // Reset report display data
+            document.getElementById('progress').classList.add('hidden');
             reportContainer.classList.add('hidden');
-            classeReportContent.innerHTML = '';
-            reportByInvariant.innerHTML = '';
-            classeTables = {};
+            report.jobId = null;
+            document.getElementById('errors-list').innerHTML = '';
+            document.getElementById('warnings-list').innerHTML = '';
 
             // Re-enable the button on error
             submitButton.disabled = false;
@@ -162,26 +123,253 @@ document.addEventListener('DOMContentLoaded', () => {
             fileInput.classList.remove('pointer-events-none', 'cursor-not-allowed');
         }
     });
+});
+
+const stageNames = {
+    'folhas': 'Leitura das folhas',
+    'invariantes': 'Verificação dos invariantes',
+    'correcoes': 'Correções automáticas',
+    'ontologias': 'Geração das ontologias',
+    'ontologia final': 'Compressão da ontologia final'
+};
+
+function renderProgress(event) {
+    document.getElementById('progress').classList.remove('hidden');
+    document.getElementById('progress-stage').textContent = stageNames[event.etapa] || event.etapa;
+    document.getElementById('progress-count').textContent = `${event.atual} de ${event.total}`;
+    document.getElementById('progress-bar').style.width = `${Math.round(100 * event.atual / event.total)}%`;
+    document.getElementById('progress-message').textContent = event.mensagem;
+    const rate = event.ritmo !== null ? ` · ${event.ritmo}/s` : '';
+    document.getElementById('progress-time').textContent = `${event.decorrido.toFixed(1)}s${rate}`;
+}
 
-    // Handle view switching
-    viewSelector.addEventListener('change', () => {
-        updateViewSelectorUI(viewSelector.value);
+// Follow the job's progress events until it finishes, then fetch its final status.
+// Falls back to polling if the event stream is not available.
+function followJob(jobId, statusText) {
+    return new Promise((resolve, reject) => {
+        const source = new EventSource(`/jobs/${jobId}/eventos`);
+        statusText.textContent = 'Em processamento...';
+        source.addEventListener('progresso', (e) => renderProgress(JSON.parse(e.data)));
+        source.addEventListener('fim', async () => {
+            source.close();
+            document.getElementById('progress').classList.add('hidden');
+            try {
+                const result = await fetch(`/jobs/${jobId}`);
+                resolve(await result.json());
+            } catch (error) {
+                reject(error);
+            }
+        });
+        source.onerror = () => {
+            source.close();
+            waitForJob(jobId, statusText).then(resolve, reject);
+        };
     });
-    updateViewSelectorUI(viewSelector.value);
+}
+
+// Poll the job status until it finishes, returning its final status
+async function waitForJob(jobId, statusText) {
+    while (true) {
+        const response = await fetch(`/jobs/${jobId}`);
+        const job = await response.json();
+        if (job.error && !job.estado) throw new Error(`${job.error} (Erro HTTP ${response.status})`);
+
+        if (job.estado === 'em fila') {
+            statusText.textContent = job.posicao > 0
+                ? `Em fila (${job.posicao} à frente)...`
+                : 'Em fila...';
+        } else if (job.estado === 'em execução') {
+            statusText.textContent = 'Em processamento...';
+        } else {
+            return job;
+        }
+        await new Promise(resolve => setTimeout(resolve, 2000));
+    }
+}
+
+const typeNames = {
+    'grave': '🟥 Grave',
+    'normal': '🟨 Genérico',
+    'catalogo': '🟧 Catálogo',
+    'invariante': '🟦 Invariante'
+};
+
+const subtypeNames = {
+    'declsRepetidas': 'Declaração repetida',
+    'relsInvalidas': 'Relação inválida',
+    'outro': 'Outro',
+    'leg': 'Legislação',
+    'tindice': 'Termos Índice',
+    'tipologia': 'Tipologia',
+    'entidade': 'Entidade'
+};
+
+const warningTypeNames = {
+    'normal': 'Warnings Genéricos',
+    'relHarmonizacao': 'Relações Envolvendo Processos em Harmonização',
+    'harmonizacao': 'Processos em Harmonização',
+    'inferencias': 'Inferências'
+};
+
+function escapeHtml(text) {
+    const div = document.createElement('div');
+    div.textContent = text;
+    return div.innerHTML;
+}
+
+function fillSelect(select, allLabel, options) {
+    select.innerHTML = '';
+    select.appendChild(new Option(allLabel, ''));
+    options.forEach(([value, label]) => select.appendChild(new Option(label, value)));
+}
+
+// Fetch the report summary of a finished job and show the first pages
+async function loadReport(jobId) {
+    const response = await fetch(`/jobs/${jobId}/relatorio`);
+    const summary = await response.json();
+    if (!response.ok) throw new Error(summary.error || `Erro HTTP ${response.status}`);
+
+    report.jobId = jobId;
+    fillSelect(document.getElementById('filter-classe'), `Todas (${summary.erros})`,
+        Object.entries(summary.classes).map(([cod, c]) => [cod, `${cod} (${c.erros}): ${c.titulo}`]));
+    fillSelect(document.getElementById('filter-invariante'), `Todos (${summary.tipos.invariante})`,
+        Object.entries(summary.invariantes).map(([inv, i]) => [inv, `${inv} (${i.erros}): ${i.desc}`]));
+    fillSelect(document.getElementById('warnings-tipo'), `Todos (${summary.warnings})`,
+        Object.entries(summary.tiposWarnings).map(([tipo, n]) => [tipo, `${warningTypeNames[tipo] || tipo} (${n})`]));
+    document.getElementById('filter-tipo').value = '';
+    document.getElementById('filter-q').value = '';
+
+    await Promise.all([loadErrors(1), loadWarnings(1)]);
+}
 
-    // Handle classe selection within classe view
-    classeSelector.addEventListener('change', () => {
-        const selectedClasse = classeSelector.value;
-        classeReportContent.innerHTML = classeTables[selectedClasse];
+function errorFilters() {
+    const params = new URLSearchParams();
+    const classe = document.getElementById('filter-classe').value;
+    const tipo = document.getElementById('filter-tipo').value;
+    const invariante = document.getElementById('filter-invariante').value;
+    const q = document.getElementById('filter-q').value.trim();
+    if (classe) params.set('classe', classe);
+    if (invariante) {
+        params.set('tipo', 'invariante');
+        params.set('subtipo', invariante);
+    } else if (tipo) {
+        params.set('tipo', tipo);
+    }
+    if (q) params.set('q', q);
+    return params;
+}
+
+async function fetchPage(path, params, page) {
+    params.set('pagina', page);
+    const response = await fetch(`/jobs/${report.jobId}/relatorio/${path}?${params}`);
+    const data = await response.json();
+    if (!response.ok) throw new Error(data.error || `Erro HTTP ${response.status}`);
+    return data;
+}
+
+function renderPager(pager, data) {
+    pager.querySelector('.pager-label').textContent = `Página ${data.pagina} de ${data.paginas}`;
+    pager.querySelector('[data-step="-1"]').disabled = data.pagina <= 1;
+    pager.querySelector('[data-step="1"]').disabled = data.pagina >= data.paginas;
+    pager.classList.toggle('hidden', data.paginas <= 1);
+}
+
+const noErrorsHtml = (message) => `
+    <div class="no-errors">
+        <svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 24 24">
+            <path fill="green" d="M12 2a10 10 0 1 0 10 10A10 10 0 0 0 12 2m-1 15.59-4.29-4.3
+            1.42-1.41L11 14.17l5.88-5.88 1.42 1.41Z" />
+        </svg>
+        <p>${message}</p>
+    </div>`;
+
+function errorMessageHtml(err) {
+    if (err.estado === 'corrigido') {
+        return `<details>
+            <summary class='error-fixed'>✅ ${err.mensagem} <b>(corrigido automaticamente)</b></summary>
+            <div class='correction-details'>${err.correcao || 'Correção efetuada com sucesso.'}</div>
+        </details>`;
+    }
+    if (err.estado === 'falhou') {
+        return `<details>
+            <summary class='error-failed'>❌ ${err.mensagem} <b>(correção automática falhou)</b></summary>
+            <div class='correction-details'>${err.correcao || 'A correção automática não foi possível.'}</div>
+        </details>`;
+    }
+    return err.mensagem;
+}
+
+async function loadErrors(page) {
+    const data = await fetchPage('erros', errorFilters(), page);
+    report.errorsPage = data.pagina;
+
+    document.getElementById('errors-summary').textContent = `${data.total} erros encontrados`;
+    const list = document.getElementById('errors-list');
+    if (data.total === 0) {
+        list.innerHTML = noErrorsHtml('Nenhum erro encontrado 🎉');
+    } else {
+        let html = '<table class="error-table"><tr><th>Código</th><th>Classe</th><th>Tipo</th><th>Mensagem</th></tr>';
+        data.linhas.forEach(err => {
+            let cod = err.cod ? escapeHtml(err.cod) : '';
+            if (err.inativo) cod += ' <b>(inativo)</b>';
+            if (err.tipo === 'grave') cod = `<span class='error-critical'>${cod}</span>`;
+            const subtype = subtypeNames[err.subtipo] || err.subtipo;
+            const type = subtype ? `${typeNames[err.tipo]}: ${escapeHtml(subtype)}` : typeNames[err.tipo];
+            html += `<tr><td>${cod}</td><td>${err.classe ? escapeHtml(err.classe) : ''}</td><td>${type}</td><td class='msg'>${errorMessageHtml(err)}</td></tr>`;
+        });
+        list.innerHTML = html + '</table>';
+    }
+    renderPager(document.getElementById('errors-pager'), data);
+}
+
+async function loadWarnings(page) {
+    const params = new URLSearchParams();
+    const tipo = document.getElementById('warnings-tipo').value;
+    if (tipo) params.set('tipo', tipo);
+    const data = await fetchPage('warnings', params, page);
+    report.warningsPage = data.pagina;
+
+    const list = document.getElementById('warnings-list');
+    if (data.total === 0) {
+        list.innerHTML = noErrorsHtml('Não foram registados warnings');
+    } else {
+        let html = '<table class="error-table"><tr><th>Tipo</th><th>Mensagem</th></tr>';
+        data.linhas.forEach(w => {
+            html += `<tr><td>${warningTypeNames[w.tipo] || w.tipo}</td><td class='msg'>${w.mensagem}</td></tr>`;
+        });
+        list.innerHTML = html + '</table>';
+    }
+    renderPager(document.getElementById('warnings-pager'), data);
+}
+
+function showReportError(error) {
+    console.error('Erro:', error);
+    document.getElementById('general-error-message').textContent = error.message || 'Erro inesperado';
+    document.getElementById('general-error').classList.remove('hidden');
+}
+
+// Reload the first page whenever a filter changes, and step through pages with the pagers
+function setupReportFilters() {
+    const reloadErrors = () => { if (report.jobId) loadErrors(1).catch(showReportError); };
+    ['filter-classe', 'filter-tipo', 'filter-invariante'].forEach(id =>
+        document.getElementById(id).addEventListener('change', reloadErrors));
+
+    let searchTimer = null;
+    document.getElementById('filter-q').addEventListener('input', () => {
+        clearTimeout(searchTimer);
+        searchTimer = setTimeout(reloadErrors, 300);
     });
-});
 
-function updateViewSelectorUI(selectedView) {
-    document.querySelectorAll('.report-view').forEach(div => div.classList.add('hidden'));
-    document.getElementById(selectedView).classList.remove('hidden');
+    document.getElementById('warnings-tipo').addEventListener('change', () => {
+        if (report.jobId) loadWarnings(1).catch(showReportError);
+    });
 
-    document.getElementById('classe-selector-wrapper')
-        .classList.toggle('hidden', selectedView !== 'by-classe');
+    document.querySelectorAll('#errors-pager button').forEach(btn => btn.addEventListener('click', () => {
+        loadErrors(report.errorsPage + Number(btn.dataset.step)).catch(showReportError);
+    }));
+    document.querySelectorAll('#warnings-pager button').forEach(btn => btn.addEventListener('click', () => {
+        loadWarnings(report.warningsPage + Number(btn.dataset.step)).catch(showReportError);
+    }));
 }
 
 function setupMainTabs() {